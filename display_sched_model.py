@@ -117,7 +117,7 @@ def display_system(system: System):
 
 
 if __name__ == "__main__":
-    system = System(np.array([6]))
+    system = System(np.array([6]), history_window=None)
 
     system.enqueue_job(Job(2, np.array([1])))
     system.enqueue_job(Job(3, np.array([1])))
@@ -142,3 +142,9 @@ if __name__ == "__main__":
         if not system.handle_events():
             break
 
+    print(
+        "Utilization: "
+        + ", ".join(
+            "R{}: {:.1%}".format(i, util) for i, util in enumerate(system.utilization())
+        )
+    )
@@ -1,9 +1,9 @@
 from functools import reduce
 import itertools
 import numpy as np
-from numpy.random import default_rng
+from numpy.random import Generator, default_rng
 import time
-from typing import List, Tuple, Dict
+from typing import List, Optional, Tuple, Dict
 
 import workflow
 from workflow import ExperimentJob
@@ -15,16 +15,25 @@ from sched_model import (
     conservative_backfill,
     hybrid_backfill,
 )
+from sched_model.batch import run_systems
+from sched_model.replication import ReplicationResult, replicate
+from sched_model.hierarchy import (
+    HierarchicalModel,
+    round_robin,
+    steal_from_longest_queue,
+)
 
 ats_jobs = list(workflow.read_ats_trace("./test-workflow-no40.txt"))
 rng = default_rng()
 
 
 class ModelSleepJob(Job):
-    def __init__(self, job: ExperimentJob):
+    def __init__(self, job: ExperimentJob, job_rng: Optional[Generator] = None):
+        """Model a sleep job, drawing runtime noise from `job_rng` (the
+        module-wide `rng` by default)."""
         super().__init__(job.timelimit, np.array([job.cores]))
         self.actual_runtime = 60 if job.cores > 1 else 10
-        self.actual_runtime += int(rng.normal(0, 2))
+        self.actual_runtime += int((rng if job_rng is None else job_rng).normal(0, 2))
 
         if self.actual_runtime < 0:
             self.actual_runtime = 0
@@ -34,7 +43,10 @@ class ModelSleepJob(Job):
 
 
 def setup_systems(
-    total_cores: int, topology: Tuple[int, ...], dist_method
+    total_cores: int,
+    topology: Tuple[int, ...],
+    dist_method,
+    job_rng: Optional[Generator] = None,
 ) -> Dict[str, System]:
     num_leaves = reduce(lambda x, y: x * y, topology, 1)
     leaf_cores, r = divmod(total_cores, num_leaves)
@@ -46,7 +58,7 @@ def setup_systems(
     for tree_id, job_list in leaves.items():
         system = System(np.array([leaf_cores]))
         for job in job_list:
-            system.enqueue_job(ModelSleepJob(job))
+            system.enqueue_job(ModelSleepJob(job, job_rng))
         system_models[tree_id] = system
 
     return system_models
@@ -58,28 +70,122 @@ def run_model(
     systems = setup_systems(total_cores, topology, dist_method)
     makespans = {}
 
-    total_jobs = len(ats_jobs)
     start_time = time.perf_counter()
 
-    prev_finished_count = 0
+    # Systems are run to completion in one go (rather than tick by tick) so
+    # that the specialized engines can be used where possible:
+    run_systems(list(systems.values()), policy)
     for tree_id, system in systems.items():
-        while system.tick(policy):
-            print(
-                "\r"
-                + name
-                + ": {:<6.1%}".format(
-                    (prev_finished_count + len(system.finished_jobs)) / total_jobs
-                ),
-                end="\r",
-            )
         makespans[tree_id] = system.cur_time
-        prev_finished_count += len(system.finished_jobs)
 
     end_time = time.perf_counter()
 
     return max(makespans.values()), end_time - start_time
 
 
+def run_hierarchy_model(
+    total_cores: int,
+    topology: Tuple[int, ...],
+    policy,
+    dist_method=None,
+    dispatch=round_robin,
+    steal=None,
+    steal_delay: int = 0,
+) -> Tuple[int, float]:
+    """Like `run_model`, but all leaves are simulated at once in a
+    `HierarchicalModel`.
+
+    Jobs are distributed to the leaves up front with `dist_method` if given,
+    and otherwise dispatched online by the interior nodes with `dispatch`. If
+    `steal` is given, idle leaves steal jobs from their siblings.
+    """
+    num_leaves = reduce(lambda x, y: x * y, topology, 1)
+    leaf_cores, r = divmod(total_cores, num_leaves)
+    assert r == 0, "cores not divisible by leaf count"
+
+    model = HierarchicalModel.from_topology(
+        topology,
+        lambda: System(np.array([leaf_cores])),
+        dispatch,
+        steal=steal,
+        steal_delay=steal_delay,
+    )
+    if dist_method is None:
+        for job in ats_jobs:
+            model.submit(ModelSleepJob(job), 0)
+    else:
+        for tree_id, job_list in dist_method(topology, ats_jobs).items():
+            for job in job_list:
+                model.submit(ModelSleepJob(job), 0, tree_id)
+
+    start_time = time.perf_counter()
+    model.run(policy)
+    end_time = time.perf_counter()
+
+    return model.makespan, end_time - start_time
+
+
+def print_steal_test(
+    name: str, total_cores: int, topology: Tuple[int, ...], dist_method, policy
+):
+    global rng
+
+    # Draw the same job runtimes for both runs:
+    seed = int(rng.integers(np.iinfo(np.int32).max))
+    rng = default_rng(seed)
+    makespan, _ = run_hierarchy_model(total_cores, topology, policy, dist_method)
+    rng = default_rng(seed)
+    stealing, rt = run_hierarchy_model(
+        total_cores, topology, policy, dist_method, steal=steal_from_longest_queue
+    )
+
+    print(
+        name
+        + ": {:4d}s -> {:4d}s with stealing (calc time: {:6.2f})".format(
+            makespan, stealing, rt
+        ),
+        flush=True,
+    )
+
+
+def replicate_model(
+    total_cores: int, topology: Tuple[int, ...], dist_method, policy, **kwargs
+) -> ReplicationResult:
+    """Run a model configuration under many seeds with `replicate`, until its
+    makespan and mean wait time are known precisely enough. Any keyword
+    arguments are passed to `replicate`."""
+
+    def run(job_rng: Generator) -> Dict[str, float]:
+        systems = setup_systems(total_cores, topology, dist_method, job_rng)
+        run_systems(list(systems.values()), policy)
+
+        jobs = [j for system in systems.values() for j in system.finished_jobs]
+        return {
+            "makespan": max(system.cur_time for system in systems.values()),
+            "mean_wait": np.mean([j.start_time - j.submit_time for j in jobs]),
+        }
+
+    return replicate(run, **kwargs)
+
+
+def print_replicated_test(
+    name: str, total_cores: int, topology: Tuple[int, ...], dist_method, policy
+):
+    start_time = time.perf_counter()
+    result = replicate_model(total_cores, topology, dist_method, policy, seed=0)
+    rt = time.perf_counter() - start_time
+
+    makespan = result.estimates["makespan"]
+    wait = result.estimates["mean_wait"]
+    print(
+        name
+        + ": {:7.1f}s +/- {:4.1f}".format(makespan.mean, makespan.half_width)
+        + " (wait {:6.1f}s +/- {:4.1f},".format(wait.mean, wait.half_width)
+        + " n={:3d}, calc time: {:6.2f})".format(result.n_replications, rt),
+        flush=True,
+    )
+
+
 def print_test(
     name: str, total_cores: int, topology: Tuple[int, ...], dist_method, policy
 ):
@@ -96,6 +202,7 @@ dist_methods = {
     "Round-Robin": workflow.distribute_rr,
     "Equal Groups": workflow.distribute_by_cores,
     "Prefix-Sum": workflow.distribute_by_utilization,
+    "Least-Loaded": workflow.distribute_least_loaded,
 }
 
 policies = {
@@ -137,3 +244,12 @@ if __name__ == "__main__":
         name = "{policy:12s} + {dist:12s}".format(dist=d[0], policy=p[0])
         print_test(name, 1280, (1, 32, 2), d[1], p[1])
 
+    print("\n1280 Cores, Topology 1x32x2, with work stealing:")
+    for p, d in itertools.product(policies.items(), dist_methods.items()):
+        name = "{policy:12s} + {dist:12s}".format(dist=d[0], policy=p[0])
+        print_steal_test(name, 1280, (1, 32, 2), d[1], p[1])
+
+    print("\n1280 Cores, Topology 1x32x2, replicated:")
+    for p, d in itertools.product(policies.items(), dist_methods.items()):
+        name = "{policy:12s} + {dist:12s}".format(dist=d[0], policy=p[0])
+        print_replicated_test(name, 1280, (1, 32, 2), d[1], p[1])
@@ -3,16 +3,28 @@ from . import job
 from . import system
 from . import policy
 from . import tree
+from . import dense
+from . import profile
+from . import checkpoint
+from . import fastsim
+from . import batch
+from . import hierarchy
+from . import replication
 
 from .resource import Resources
 from .job import Job
-from .system import System
+from .system import System, SchedPolicy
+from .dense import DenseTimeline
+from .profile import ProfileTimeline
 from .policy import fcfs, easy_backfill, conservative_backfill, hybrid_backfill
 
 __all__ = [
     "Resources",
     "Job",
     "System",
+    "SchedPolicy",
+    "DenseTimeline",
+    "ProfileTimeline",
     "fcfs",
     "easy_backfill",
     "conservative_backfill",
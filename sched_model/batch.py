@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from .job import Job
+from .policy import easy_backfill, fcfs
+from .system import System
+from .fastsim import can_bypass_timeline
+
+# Time of the next event for systems that have none:
+_NEVER = np.iinfo(np.int64).max
+
+
+def can_run_batch(
+    systems: Sequence[System], sched_policy: Optional[Callable[[System], None]]
+) -> bool:
+    """Check whether `run_batch` can run `systems` to completion in place of
+    calling `System.run(sched_policy)` on each of them.
+
+    The policy must be plain `fcfs` or `easy_backfill`, and every system must
+    satisfy `fastsim.can_bypass_timeline`.
+    """
+    return (sched_policy is fcfs or sched_policy is easy_backfill) and all(
+        can_bypass_timeline(system) for system in systems
+    )
+
+
+def run_batch(
+    systems: Sequence[System], sched_policy: Optional[Callable[[System], None]]
+):
+    """Run a batch of independent single-resource systems to completion with
+    the same policy (`fcfs` or `easy_backfill`), simulating all of them in
+    lockstep. See `can_run_batch` for when this can be used.
+
+    The free resources, queue heads, reservations and running jobs of every
+    system are held in arrays. Each step advances time to the next event of
+    any system, and handles the events and scheduling passes of every system
+    with an event at that time using vectorized operations, so the number of
+    steps is bounded by the number of distinct event times rather than the
+    total number of events.
+
+    Each system ends up in the same state as after `System.run`, with the same
+    start and end times for all of its jobs; see `fastsim.run_fcfs` for how
+    history is recorded. `compute_actual_runtime` is called in the same order
+    as by `System.run` within each system, but calls for different systems are
+    interleaved, and the systems' job queues are only updated once the run is
+    over.
+    """
+    if not can_run_batch(systems, sched_policy):
+        raise ValueError("systems cannot be run as a batch with this policy")
+
+    _LockstepRun(
+        [s for s in systems if len(s.pending_jobs) > 0],
+        sched_policy is easy_backfill,
+    ).run()
+
+
+class _LockstepRun(object):
+    def __init__(self, systems: List[System], easy: bool):
+        self.systems = systems
+        self.easy = easy
+
+        # Jobs of all systems, grouped by system in queue order. Each system's
+        # jobs are the range [lo, hi) of this list:
+        self.jobs: List[Job] = []
+        bounds = [0]
+        for system in systems:
+            self.jobs.extend(system.pending_jobs)
+            bounds.append(len(self.jobs))
+
+        n = len(systems)
+        self.lo = np.array(bounds[:-1], dtype=np.int64)
+        self.hi = np.array(bounds[1:], dtype=np.int64)
+        self.system_of = np.repeat(np.arange(n), self.hi - self.lo)
+
+        self.resources = np.array(
+            [int(j.resources.resources[0]) for j in self.jobs], dtype=np.int64
+        )
+        self.timelimits = np.array([j.timelimit for j in self.jobs], dtype=np.int64)
+        self.prefix = np.concatenate(([0], np.cumsum(self.resources)))
+        self.started = np.zeros(len(self.jobs), dtype=bool)
+        self.start_order: List[int] = []
+
+        # Per-system state. The head of each queue is the first job that
+        # hasn't been started; for EASY, that's also the reserved job, if any:
+        self.head = self.lo.copy()
+        self.free = np.array(
+            [int(s.total_resources.resources[0]) for s in systems], dtype=np.int64
+        )
+        self.reserved_time = np.full(n, _NEVER, dtype=np.int64)
+
+        # Running jobs, and jobs started during the current step:
+        self.running = np.empty(0, dtype=np.int64)
+        self.running_end = np.empty(0, dtype=np.int64)
+        self.running_deadline = np.empty(0, dtype=np.int64)
+        self.new_running: List[int] = []
+
+    def _start(self, i: int, t: int):
+        job = self.jobs[i]
+        system = self.systems[self.system_of[i]]
+        system.cur_time = t
+        job.start(system)
+        self.started[i] = True
+        self.start_order.append(i)
+        self.new_running.append(i)
+
+    def _flush_started(self):
+        if len(self.new_running) == 0:
+            return
+
+        jobs = [self.jobs[i] for i in self.new_running]
+        self.running = np.append(self.running, self.new_running)
+        self.running_end = np.append(self.running_end, [j.end_time for j in jobs])
+        self.running_deadline = np.append(
+            self.running_deadline, [j.deadline for j in jobs]
+        )
+        self.new_running = []
+
+    def run(self):
+        t = 0
+        active = np.arange(len(self.systems))
+        while True:
+            if self.easy:
+                self._easy_pass(active, t)
+            else:
+                self._fcfs_pass(active, t)
+            self._flush_started()
+
+            t = min(
+                int(self.running_end.min(initial=_NEVER)),
+                int(self.reserved_time.min(initial=_NEVER)),
+            )
+            if t == _NEVER:
+                break
+
+            # Reserved jobs start before jobs ending at the same time end:
+            reserved = np.flatnonzero(self.reserved_time == t)
+            for k in reserved.tolist():
+                i = int(self.head[k])
+                self._start(i, t)
+                self.free[k] -= self.resources[i]
+                self._advance_head(k)
+            self.reserved_time[reserved] = _NEVER
+            self._flush_started()
+
+            ended = self.running_end == t
+            ended_systems = self.system_of[self.running[ended]]
+            np.add.at(self.free, ended_systems, self.resources[self.running[ended]])
+
+            keep = ~ended
+            self.running = self.running[keep]
+            self.running_end = self.running_end[keep]
+            self.running_deadline = self.running_deadline[keep]
+
+            active = np.union1d(ended_systems, reserved)
+
+        self._finish()
+
+    def _advance_head(self, k: int):
+        head = int(self.head[k])
+        hi = int(self.hi[k])
+        while head < hi and self.started[head]:
+            head += 1
+        self.head[k] = head
+
+    def _fcfs_pass(self, active: np.ndarray, t: int):
+        # Start jobs from the head of each queue for as long as the running
+        # total of their resources fits into the free resources:
+        head = self.head[active]
+        last = np.searchsorted(
+            self.prefix, self.prefix[head] + self.free[active], "right"
+        )
+        last = np.minimum(last - 1, self.hi[active])
+
+        for first, end in zip(head.tolist(), last.tolist()):
+            for i in range(first, end):
+                self._start(i, t)
+
+        self.free[active] -= self.prefix[last] - self.prefix[head]
+        self.head[active] = last
+
+    def _easy_pass(self, active: np.ndarray, t: int):
+        # Reservations are redone on every pass:
+        self.reserved_time[active] = _NEVER
+
+        for k in active.tolist():
+            head, hi = int(self.head[k]), int(self.hi[k])
+            while head < hi and self.resources[head] <= self.free[k]:
+                self._start(head, t)
+                self.free[k] -= self.resources[head]
+                self._advance_head(k)
+                head = int(self.head[k])
+        self._flush_started()
+
+        waiting = active[self.head[active] < self.hi[active]]
+        if len(waiting) == 0:
+            return
+
+        shadow_time, extra = self._shadow(waiting)
+        self.reserved_time[waiting] = shadow_time
+
+        # Backfill jobs that either end before the shadow time, or fit into
+        # the resources left over at the shadow time. Both budgets only shrink,
+        # so once a job is skipped it stays skipped:
+        for k, shadow, spare in zip(
+            waiting.tolist(), shadow_time.tolist(), extra.tolist()
+        ):
+            free = int(self.free[k])
+            first = int(self.head[k]) + 1
+            resources = self.resources[first : self.hi[k]]
+            short = t + self.timelimits[first : self.hi[k]] <= shadow
+            fits = ~self.started[first : self.hi[k]]
+
+            pos = 0
+            while pos < len(fits):
+                fits[pos:] &= (resources[pos:] <= free) & (
+                    short[pos:] | (resources[pos:] <= spare)
+                )
+                pos += int(np.argmax(fits[pos:]))
+                if not fits[pos]:
+                    break
+
+                self._start(first + pos, t)
+                free -= int(resources[pos])
+                if not short[pos]:
+                    spare -= int(resources[pos])
+                pos += 1
+
+            self.free[k] = free
+
+    def _shadow(self, waiting: np.ndarray):
+        # For each waiting system, find the earliest time at which its head job
+        # fits, as running jobs reach their deadlines (the schedule can't
+        # count on them ending any earlier). Also find the resources that are
+        # left over at that time once the head job is started.
+        order = np.lexsort((self.running_deadline, self.system_of[self.running]))
+        systems = self.system_of[self.running[order]]
+        deadlines = self.running_deadline[order]
+        released = np.cumsum(self.resources[self.running[order]])
+
+        first = np.searchsorted(systems, waiting, "left")
+        before = np.where(first > 0, released[first - 1], 0)
+        head = self.head[waiting]
+        needed = self.resources[head] - self.free[waiting]
+        i = np.searchsorted(released, before + needed, "left")
+
+        # All jobs reaching their deadline at the shadow time release their
+        # resources then:
+        changes = np.flatnonzero(
+            np.append(
+                (systems[1:] != systems[:-1]) | (deadlines[1:] != deadlines[:-1]),
+                True,
+            )
+        )
+        last = changes[np.searchsorted(changes, i)]
+        extra = released[last] - before - needed
+        return deadlines[i], extra
+
+    def _finish(self):
+        order = np.array(self.start_order, dtype=np.int64)
+        order = order[np.argsort(self.system_of[order], kind="stable")]
+        bounds = np.searchsorted(
+            self.system_of[order], np.arange(len(self.systems) + 1)
+        ).tolist()
+
+        for k, system in enumerate(self.systems):
+            jobs = [self.jobs[i] for i in order[bounds[k] : bounds[k + 1]].tolist()]
+
+            # Jobs ending at the same time finish in the order a timeline
+            # holds them, which depends on the order they were started in:
+            ending: Dict[int, Set[Job]] = {}
+            for job in jobs:
+                ending.setdefault(job.end_time, set()).add(job)
+            for end_time in sorted(ending):
+                system.cur_time = end_time
+                for job in ending[end_time]:
+                    job.end(end_time)
+                    system.finished_jobs.append(job)
+
+            system.pending_jobs.clear()
+            system._should_run_sched_loop = False
+
+            times = np.array(
+                [j.start_time for j in jobs] + [j.end_time for j in jobs],
+                dtype=np.int64,
+            )
+            resources = self.resources[order[bounds[k] : bounds[k + 1]]]
+            times, inverse = np.unique(times, return_inverse=True)
+            used = np.zeros(len(times), dtype=np.int64)
+            np.add.at(used, inverse, np.concatenate((resources, -resources)))
+            system._timeline.record_history(
+                times, np.cumsum(used)[:, np.newaxis], system.cur_time
+            )
+
+
+def run_systems(
+    systems: Sequence[System], sched_policy: Optional[Callable[[System], None]]
+):
+    """Run independent systems to completion with the same policy, using the
+    fastest engine available.
+
+    `fcfs` runs go through `System.run` one system at a time (which uses
+    `fastsim.run_fcfs` where it can): its per-system heap beats stepping in
+    lockstep. Otherwise, systems are run as a batch with `run_batch` if
+    possible.
+    """
+    if sched_policy is not fcfs and can_run_batch(systems, sched_policy):
+        run_batch(systems, sched_policy)
+        return
+
+    for system in systems:
+        system.run(sched_policy)
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+from collections import deque
+import os
+from pathlib import Path
+import pickle
+import time
+from typing import Any, BinaryIO, Callable, Optional, Union
+
+import numpy as np
+
+from .system import JobHistory, System
+
+CHECKPOINT_VERSION = 1
+
+CheckpointFile = Union[str, os.PathLike, BinaryIO]
+
+
+def _pack(obj: Any) -> np.ndarray:
+    return np.frombuffer(pickle.dumps(obj, pickle.HIGHEST_PROTOCOL), dtype=np.uint8)
+
+
+def _unpack(arr: np.ndarray) -> Any:
+    return pickle.loads(arr.tobytes())
+
+
+def save_checkpoint(
+    system: System,
+    f: CheckpointFile,
+    rng: Optional[np.random.Generator] = None,
+    keep_finished: bool = False,
+):
+    """Save the state of a system to a file, so that it can be resumed later
+    with `load_checkpoint`.
+
+    Only live state is saved: jobs that are pending, reserved or running,
+    the order of the job queues, and the system's current time and counters.
+    The system's timeline is rebuilt from the reservations of these jobs when
+    loading, so history before the current time isn't restored. Finished jobs
+    are only saved if `keep_finished` is set (or if the timeline still holds
+    resources for them). If `rng` is given, its state is saved as well.
+
+    Jobs are pickled, so that any state added by `Job` subclasses is kept.
+    Attached policies are not saved.
+
+    If `f` is a path, the checkpoint is written to a temporary file first and
+    then moved into place, so an existing checkpoint at that path is never
+    left partially overwritten.
+    """
+    if not isinstance(f, (str, os.PathLike)):
+        _write_checkpoint(system, f, rng, keep_finished)
+        return
+
+    path = Path(f)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("wb") as tmp_f:
+        _write_checkpoint(system, tmp_f, rng, keep_finished)
+        tmp_f.flush()
+        os.fsync(tmp_f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _write_checkpoint(
+    system: System,
+    f: BinaryIO,
+    rng: Optional[np.random.Generator],
+    keep_finished: bool,
+):
+    # Timelines that divide time into buckets hold the resources of jobs that
+    # ended partway through the current bucket until the bucket ends, so those
+    # jobs are saved too. Jobs finish in order of end time, so only the end
+    # of the finished queue needs to be looked at:
+    quantum = getattr(system._timeline, "quantum", 1)
+    recent = []
+    for j in reversed(system.finished_jobs):
+        if j.end_time <= system.cur_time - quantum:
+            break
+        recent.append(j)
+    recent.reverse()
+
+    jobs = list(system.pending_jobs)
+    jobs.extend(system.reserved_jobs)
+    jobs.extend(sorted(system.running_jobs, key=lambda j: j.job_id))
+    jobs.extend(system.finished_jobs if keep_finished else recent)
+
+    state = np.array(
+        [
+            CHECKPOINT_VERSION,
+            system.cur_time,
+            system._jobs_enqueued,
+            system.should_run_sched_loop,
+            -1 if system.history_window is None else system.history_window,
+            len(system.pending_jobs),
+            len(system.reserved_jobs),
+            len(system.running_jobs),
+            keep_finished,
+        ],
+        dtype=np.int64,
+    )
+
+    # The timeline is rebuilt from the jobs, but the part of it from the
+    # current time on is saved too, so that loading can check that nothing
+    # was lost:
+    profile = system.export_profile(system.cur_time)
+
+    np.savez(
+        f,
+        state=state,
+        total_resources=system.total_resources.resources,
+        jobs=_pack(jobs),
+        replayed=np.array([j.job_id for j in recent], dtype=np.int64),
+        rng=_pack(None if rng is None else rng.bit_generator.state),
+        profile_times=profile.times,
+        profile_free=profile.free,
+    )
+
+
+def _free_at(
+    times: np.ndarray, free: np.ndarray, total: np.ndarray, at: np.ndarray
+) -> np.ndarray:
+    # Resources free at each of the times in `at`, given a timeline profile:
+    rows = np.tile(total, (len(at), 1))
+    idx = np.searchsorted(times, at, "right") - 1
+    rows[idx >= 0] = free[idx[idx >= 0]]
+    return rows
+
+
+def load_checkpoint(
+    f: CheckpointFile, rng: Optional[np.random.Generator] = None, **kwargs
+) -> System:
+    """Load a system from a checkpoint created by `save_checkpoint`.
+
+    If `rng` is given and the checkpoint has a saved RNG state, that state is
+    restored into `rng`. Any other keyword arguments are passed to the
+    `System` constructor (for instance, to choose its timeline); the history
+    window is restored from the checkpoint.
+
+    Checkpoints contain pickled jobs, so they should only be loaded from
+    trusted sources.
+    """
+    with np.load(f, allow_pickle=False) as data:
+        state = data["state"]
+        total_resources = data["total_resources"]
+        jobs = _unpack(data["jobs"])
+        replayed = set(data["replayed"].tolist())
+        rng_state = _unpack(data["rng"])
+        profile_times = data["profile_times"]
+        profile_free = data["profile_free"]
+
+    (
+        version,
+        cur_time,
+        jobs_enqueued,
+        should_run_sched_loop,
+        history_window,
+        n_pending,
+        n_reserved,
+        n_running,
+        keep_finished,
+    ) = state.tolist()
+    if version != CHECKPOINT_VERSION:
+        raise ValueError("unsupported checkpoint version: {}".format(version))
+
+    system = System(
+        total_resources,
+        history_window=None if history_window < 0 else history_window,
+        **kwargs,
+    )
+    system.cur_time = cur_time
+    system._jobs_enqueued = jobs_enqueued
+    system._should_run_sched_loop = bool(should_run_sched_loop)
+
+    n_live = n_pending + n_reserved + n_running
+    running = jobs[n_pending + n_reserved : n_live]
+    finished = jobs[n_live:]
+    system.pending_jobs = deque(jobs[:n_pending])
+    system.reserved_jobs = jobs[n_pending : n_pending + n_reserved]
+    system.running_jobs = set(running)
+    if keep_finished:
+        system.finished_jobs = JobHistory(finished)
+
+    # Rebuild the timeline by replaying reservations. Everything before the
+    # current time is history, so skip as much of it as possible:
+    timeline = system._timeline
+    if system.history_window is not None:
+        timeline.truncate_history(cur_time - system.history_window)
+
+    for job in finished:
+        if job.job_id in replayed:
+            timeline.add_job_reservation(job)
+            timeline.start_job_reservation(job)
+            timeline.end_job_reservation(job, job.end_time)
+    for job in running:
+        timeline.add_job_reservation(job)
+        timeline.start_job_reservation(job)
+    for job in system.reserved_jobs:
+        timeline.add_job_reservation(job)
+
+    if system.history_window is not None:
+        timeline.truncate_history(cur_time - system.history_window)
+
+    profile = system.export_profile()
+    at = np.union1d(profile_times, profile.times)
+    at = at[at >= cur_time]
+    if not np.array_equal(
+        _free_at(profile_times, profile_free, total_resources, at),
+        _free_at(profile.times, profile.free, total_resources, at),
+    ):
+        raise ValueError("restored timeline does not match checkpoint")
+
+    if rng is not None and rng_state is not None:
+        rng.bit_generator.state = rng_state
+
+    return system
+
+
+def run_with_checkpoints(
+    system: System,
+    path: Union[str, os.PathLike],
+    sched_policy: Optional[Callable[[System], None]] = None,
+    interval: float = 60.0,
+    rng: Optional[np.random.Generator] = None,
+    keep_finished: bool = True,
+):
+    """Run a system to completion like `System.run`, saving a checkpoint to
+    `path` at most once every `interval` seconds of wall-clock time, and once
+    more at the end.
+
+    To resume an interrupted run, load the checkpoint with `load_checkpoint`
+    and pass the loaded system back to this function. Checkpoints include
+    finished jobs unless `keep_finished` is unset (see `save_checkpoint`), so
+    that a resumed run ends up with all of them; unset it to keep checkpoints
+    proportional to the live state if finished jobs aren't needed.
+    """
+    last_save = time.monotonic()
+    while system.tick(sched_policy):
+        if time.monotonic() - last_save >= interval:
+            save_checkpoint(system, path, rng, keep_finished)
+            last_save = time.monotonic()
+
+    save_checkpoint(system, path, rng, keep_finished)
@@ -0,0 +1,431 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right, insort
+from copy import copy
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .resource import Resources
+from .job import Job
+from .system import (
+    StartRequest,
+    TimelineData,
+    TimelineProfile,
+    UsageLedger,
+    export_events,
+    profile_resource_time,
+)
+
+
+class DenseTimeline(object):
+    """A timeline that stores free resources in a dense array indexed by time.
+
+    Time is divided into buckets of `quantum` timesteps each, and the free
+    resources for every bucket from the current time up to the end of the
+    last reservation are kept in a ring buffer of `(n_buckets, n_resources)`
+    entries. Reserving or releasing resources over a range of time is a
+    single slice update, and finding the earliest time a job fits is a
+    vectorized scan over the buffer, instead of a walk over a tree of events.
+
+    This is only a good fit for workloads with bounded job time limits, since
+    the buffer must span the entire period covered by reservations. It has
+    the same interface as `Timeline`, and can be used in a `System` by passing
+    it (or a `functools.partial` of it) as the `timeline` argument.
+
+    With a quantum greater than 1, a job is treated as using its resources for
+    every bucket that its reservation overlaps. Scheduling is then
+    conservative: jobs that don't start at the current time are reserved to
+    start at a bucket boundary.
+    """
+
+    def __init__(
+        self, base_resources: Resources, quantum: int = 1, horizon: int = 1024
+    ):
+        """Create an empty timeline.
+
+        `horizon` is the number of timesteps initially covered by the buffer;
+        the buffer grows as needed to hold reservations further away.
+        """
+        if quantum < 1:
+            raise ValueError("time quantum must be positive")
+
+        self._total_resources: Resources = Resources(base_resources)
+        self.quantum: int = int(quantum)
+
+        n_buckets = max(-(-int(horizon) // self.quantum), 1)
+        self._free: np.ndarray = np.tile(
+            self._total_resources.resources, (n_buckets, 1)
+        )
+
+        # Bucket held in the buffer that starts at the earliest time, and the
+        # bucket just past the end of all reservations (all resources are free
+        # from that point on):
+        self._origin: int = 0
+        self._end: int = 0
+
+        # Events are looked up by their exact time:
+        self._events: Dict[int, TimelineData] = {}
+        self._event_times: List[int] = []
+
+        # Times at which a bucket is released after the job using it ended
+        # partway through. These have (possibly empty) events, so that the
+        # system gets a chance to schedule jobs into the released bucket.
+        self._wakeups: Set[int] = set()
+
+        # Resource usage over the truncated history:
+        self._ledger: UsageLedger = UsageLedger(
+            len(self._total_resources), self._total_resources.resources.dtype
+        )
+
+    def _bucket_span(self, start_time: int, end_time: int) -> Tuple[int, int]:
+        # Range of buckets overlapped by the time range [start_time, end_time):
+        return start_time // self.quantum, -(-end_time // self.quantum)
+
+    def _slices(self, b0: int, b1: int) -> List[slice]:
+        # Buffer slices holding buckets [b0, b1), which must be in the buffer:
+        n_buckets = len(self._free)
+        s0 = b0 % n_buckets
+        s1 = s0 + (b1 - b0)
+        if s1 <= n_buckets:
+            return [slice(s0, s1)]
+        return [slice(s0, n_buckets), slice(0, s1 - n_buckets)]
+
+    def _grow(self, b1: int):
+        # Make sure that buckets up to b1 fit in the buffer:
+        n_buckets = len(self._free)
+        if b1 - self._origin <= n_buckets:
+            return
+
+        new_n_buckets = n_buckets
+        while b1 - self._origin > new_n_buckets:
+            new_n_buckets *= 2
+
+        held = self._window(self._origin, self._origin + n_buckets)
+        self._free = np.tile(self._total_resources.resources, (new_n_buckets, 1))
+        self._free[(self._origin + np.arange(n_buckets)) % new_n_buckets] = held
+
+    def _window(self, b0: int, b1: int) -> np.ndarray:
+        """Get the free resources for buckets [b0, b1) as a single array.
+
+        Buckets before the start of the buffer are not kept, and are skipped;
+        buckets past the end of the buffer have all resources free.
+        """
+        b0 = max(b0, self._origin)
+        held_end = min(b1, self._origin + len(self._free))
+
+        parts = []
+        if b0 < held_end:
+            parts.extend(self._free[s] for s in self._slices(b0, held_end))
+        if b1 > max(b0, held_end):
+            parts.append(
+                np.tile(self._total_resources.resources, (b1 - max(b0, held_end), 1))
+            )
+
+        if len(parts) == 1:
+            return parts[0]
+        elif len(parts) == 0:
+            return self._free[:0]
+        return np.concatenate(parts)
+
+    def _update(self, b0: int, b1: int, delta: np.ndarray):
+        b0 = max(b0, self._origin)
+        if b1 <= b0:
+            return
+
+        self._grow(b1)
+        for s in self._slices(b0, b1):
+            self._free[s] += delta
+        self._end = max(self._end, b1)
+
+    def _get_data(self, t: int) -> TimelineData:
+        data = self._events.get(t)
+        if data is None:
+            data = self._events[t] = TimelineData(self._total_resources)
+            insort(self._event_times, t)
+        return data
+
+    def _cleanup_data(self, t: int):
+        data = self._events[t]
+        if (
+            len(data.end) == 0
+            and len(data.expired) == 0
+            and len(data.start) == 0
+            and t not in self._wakeups
+        ):
+            del self._events[t]
+            del self._event_times[bisect_left(self._event_times, t)]
+
+    def _refresh_data(self, t: int) -> TimelineData:
+        # Event data doesn't track resources as they change, so fill in the
+        # current value whenever it's looked at:
+        data = self._events[t]
+        b = t // self.quantum
+        if b >= self._origin:
+            data.resources = Resources(self._window(b, b + 1)[0])
+        return data
+
+    def add_job_reservation(self, job: Job):
+        self._get_data(job.start_time).start.add(job)
+        self._get_data(job.deadline).expired.add(job)
+        self._update(
+            *self._bucket_span(job.start_time, job.deadline), -job.resources.resources
+        )
+
+    def remove_job_reservation(self, job: Job):
+        self._get_data(job.start_time).start.remove(job)
+        self._cleanup_data(job.start_time)
+        self._get_data(job.deadline).expired.remove(job)
+        self._cleanup_data(job.deadline)
+        self._update(
+            *self._bucket_span(job.start_time, job.deadline), job.resources.resources
+        )
+
+    def start_job_reservation(self, job: Job):
+        self._get_data(job.end_time).end.add(job)
+
+    def end_job_reservation(self, job: Job, new_end_time: int):
+        prev_end_time = job.end_time
+        prev_deadline = job.deadline
+
+        assert new_end_time <= prev_deadline
+        assert new_end_time <= prev_end_time
+
+        if new_end_time < prev_end_time:
+            self._events[prev_end_time].end.remove(job)
+            self._cleanup_data(prev_end_time)
+            self._get_data(new_end_time).end.add(job)
+
+        # Buckets partially used before the job ended stay reserved:
+        release_b = -(-new_end_time // self.quantum)
+        if new_end_time < prev_deadline:
+            self._update(
+                release_b, -(-prev_deadline // self.quantum), job.resources.resources
+            )
+
+        if release_b * self.quantum > new_end_time:
+            self._wakeups.add(release_b * self.quantum)
+            self._get_data(release_b * self.quantum)
+
+        self._events[prev_deadline].expired.remove(job)
+        self._cleanup_data(prev_deadline)
+
+    def iter_resources(
+        self, start_time: int, end_time: Optional[int] = None, copy: bool = True
+    ) -> Iterator[Tuple[int, Resources]]:
+        b0 = start_time // self.quantum
+        if end_time is None:
+            # Include the first bucket past the end of all reservations:
+            b1 = max(self._end, b0) + 1
+        else:
+            b1 = max(-(-end_time // self.quantum), b0 + 1)
+
+        b0 = max(b0, self._origin)
+        window = self._window(b0, b1)
+        changes = np.flatnonzero((window[1:] != window[:-1]).any(axis=1)) + 1
+
+        yield (start_time, Resources(window[0]))
+        for i in changes:
+            yield ((b0 + int(i)) * self.quantum, Resources(window[i]))
+
+    def can_schedule(self, job: Job, start_time: int) -> bool:
+        b0, b1 = self._bucket_span(start_time, start_time + job.timelimit)
+        return bool((self._window(b0, b1) >= job.resources.resources).all())
+
+    def find_schedulable_time(
+        self, job: Job, start_time: int, reserve: bool
+    ) -> Optional[int]:
+        if self.can_schedule(job, start_time):
+            return start_time
+        elif not reserve:
+            return None
+
+        # Otherwise, the job starts at the earliest bucket boundary after
+        # `start_time` that is followed by enough buckets with free resources.
+        # All resources are free past the end of the reservations, so there
+        # is always such a bucket.
+        n = -(-job.timelimit // self.quantum)
+        b0 = start_time // self.quantum + 1
+        if b0 >= self._end:
+            return b0 * self.quantum
+
+        fits = (self._window(b0, self._end) >= job.resources.resources).all(axis=1)
+        fits = np.concatenate((fits, np.ones(n, dtype=bool)))
+
+        # n buckets starting at i all fit if no bucket in between doesn't:
+        misses = np.concatenate(([0], np.cumsum(~fits)))
+        first = int(np.argmax(misses[n:] == misses[:-n]))
+        return (b0 + first) * self.quantum
+
+    def find_earliest_start_times(
+        self, requests: Iterable[StartRequest], start_time: int
+    ) -> List[int]:
+        """Find the earliest time at or after `start_time` at which each of a
+        batch of `(resources, timelimit)` requests could start, without
+        reserving anything.
+
+        The buffer is read once, and then scanned for each request.
+        """
+        requests = list(requests)
+        b0 = start_time // self.quantum
+        window = self._window(b0, max(self._end, b0 + 1))
+
+        ret = []
+        for resources, timelimit in requests:
+            resources = Resources._resource_vec(resources)
+            fits = (window >= resources).all(axis=1)
+
+            # Buckets needed when starting at `start_time`, and when starting
+            # at a bucket boundary after it:
+            n_first = -(-(start_time + timelimit) // self.quantum) - b0
+            n = -(-timelimit // self.quantum)
+
+            fits = np.concatenate((fits, np.ones(max(n, n_first), dtype=bool)))
+            misses = np.concatenate(([0], np.cumsum(~fits)))
+            if misses[n_first] == 0:
+                ret.append(start_time)
+                continue
+
+            first = 1 + int(np.argmax(misses[1 + n :] == misses[1:-n]))
+            ret.append((b0 + first) * self.quantum)
+        return ret
+
+    def _used_profile(self, b0: int, b1: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Resource usage profile for buckets [b0, b1), with a breakpoint
+        # wherever the usage changes:
+        used = self._total_resources.resources - self._window(b0, b1)
+        changes = np.flatnonzero((used[1:] != used[:-1]).any(axis=1)) + 1
+        changes = np.concatenate(([0], changes))
+        return (b0 + changes) * self.quantum, used[changes]
+
+    def used_resource_time(self, start_time: int, end_time: int) -> np.ndarray:
+        """Get the total resource-time used over [start_time, end_time), for
+        each resource dimension, including truncated history.
+
+        Resources are counted as used for the entirety of every bucket that a
+        job overlaps.
+        """
+        if end_time <= start_time:
+            return np.zeros_like(self._total_resources.resources)
+
+        ret = self._ledger.resource_time(end_time) - self._ledger.resource_time(
+            start_time
+        )
+        start_time = max(start_time, self._origin * self.quantum)
+        if end_time <= start_time:
+            return ret
+
+        b0 = start_time // self.quantum
+        b1 = min(-(-end_time // self.quantum), max(self._end, b0 + 1))
+        times, used = self._used_profile(b0, b1)
+
+        # All resources are free after the last bucket:
+        times = np.append(times, b1 * self.quantum)
+        used = np.concatenate((used, np.zeros_like(used[:1])))
+        return ret + profile_resource_time(times, used, start_time, end_time)
+
+    def fork(self, jobs: Dict[Job, Job]) -> DenseTimeline:
+        """Create an independent copy of this timeline, replacing each job
+        found in `jobs` with its corresponding value.
+        """
+        ret = copy(self)
+        ret._free = self._free.copy()
+        ret._events = {t: data.fork(jobs) for t, data in self._events.items()}
+        ret._event_times = list(self._event_times)
+        ret._wakeups = set(self._wakeups)
+        ret._ledger = self._ledger.copy()
+        return ret
+
+    def export_profile(self, start_time: Optional[int] = None) -> TimelineProfile:
+        """Export the events in this timeline as arrays, from the last one at
+        or before `start_time` on if it's given (see `Timeline.export_profile`).
+
+        Resources free before the start of the buffer are not kept, and are
+        exported as the total resources.
+        """
+        first = 0
+        if start_time is not None:
+            first = max(bisect_right(self._event_times, start_time) - 1, 0)
+        event_times = self._event_times[first:]
+
+        buckets = np.array(event_times, dtype=np.int64) // self.quantum
+        free = np.tile(self._total_resources.resources, (len(buckets), 1))
+
+        held = buckets >= self._origin
+        if held.any():
+            window = self._window(self._origin, int(buckets.max()) + 1)
+            free[held] = window[buckets[held] - self._origin]
+
+        return export_events(event_times, [self._events[t] for t in event_times], free)
+
+    def truncate_history(self, t: int):
+        """Drop all events before time `t`, and advance the buffer so that it
+        starts at the bucket holding `t`. The resources used over the released
+        buckets are kept in a ledger.
+
+        As with `Timeline.truncate_history`, `t` must not be after the current
+        time of the system that owns this timeline.
+        """
+        n_dropped = bisect_left(self._event_times, t)
+        for event_t in self._event_times[:n_dropped]:
+            del self._events[event_t]
+            self._wakeups.discard(event_t)
+        del self._event_times[:n_dropped]
+
+        new_origin = t // self.quantum
+        if new_origin <= self._origin:
+            return
+
+        # Released buckets are reused for times past the end of the buffer, at
+        # which point all resources are free:
+        released_end = min(new_origin, self._origin + len(self._free))
+        times, used = self._used_profile(self._origin, released_end)
+        if released_end < new_origin:
+            times = np.append(times, released_end * self.quantum)
+            used = np.concatenate((used, np.zeros_like(used[:1])))
+        self._ledger.append(times, used, new_origin * self.quantum)
+
+        for s in self._slices(self._origin, released_end):
+            self._free[s] = self._total_resources.resources
+
+        self._origin = new_origin
+        self._end = max(self._end, new_origin)
+
+    def record_history(self, times: Sequence[int], used: Sequence, end: int):
+        """Record resource usage over time that was simulated without this
+        timeline, and advance the buffer to `end`; see
+        `Timeline.record_history`.
+
+        The timeline must not hold any events.
+        """
+        assert len(self._event_times) == 0
+        self._ledger.append(times, used, end)
+        self._origin = self._end = max(self._origin, end // self.quantum)
+
+    def iter(
+        self,
+        left_bound: Optional[int] = None,
+        right_bound: Optional[int] = None,
+        reverse: bool = False,
+    ) -> Iterator[Tuple[int, TimelineData]]:
+        lo = 0 if left_bound is None else bisect_left(self._event_times, left_bound)
+        hi = (
+            len(self._event_times)
+            if right_bound is None
+            else bisect_left(self._event_times, right_bound)
+        )
+
+        times = self._event_times[lo:hi]
+        if reverse:
+            times.reverse()
+
+        for t in times:
+            yield (t, self._refresh_data(t))
+
+    def next_event(self, after_time: int) -> Optional[Tuple[int, TimelineData]]:
+        i = bisect_right(self._event_times, after_time)
+        if i == len(self._event_times):
+            return None
+
+        t = self._event_times[i]
+        return (t, self._refresh_data(t))
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import heapq
+from typing import Callable, Dict, List, Optional, Set
+
+from .job import Job
+from .policy import fcfs
+from .system import System
+
+
+def can_bypass_timeline(system: System) -> bool:
+    """Check whether a system can be simulated without going through its
+    timeline, by one of the specialized engines.
+
+    This is the case when no policy is attached, resources are
+    one-dimensional, every job enqueued so far is still pending at time 0 (as
+    when a system is set up and then run), and the timeline doesn't divide
+    time into buckets and can record history without simulating it. History
+    must also be compacted as it goes (a `history_window` other than None),
+    since no timeline events are kept.
+    """
+    return (
+        system.policy is None
+        and len(system.total_resources) == 1
+        and system.cur_time == 0
+        and len(system.pending_jobs) == system._jobs_enqueued
+        and system.history_window is not None
+        and getattr(system._timeline, "quantum", 1) == 1
+        and hasattr(system._timeline, "record_history")
+    )
+
+
+def can_run_fcfs(
+    system: System, sched_policy: Optional[Callable[[System], None]]
+) -> bool:
+    """Check whether `run_fcfs` can run `system` to completion in place of
+    `System.run(sched_policy)`: the policy must be plain `fcfs`, and the
+    system must have pending jobs and satisfy `can_bypass_timeline`.
+    """
+    return (
+        sched_policy is fcfs
+        and len(system.pending_jobs) > 0
+        and can_bypass_timeline(system)
+    )
+
+
+def run_fcfs(system: System):
+    """Run a system to completion with the `fcfs` policy, without going
+    through its timeline. See `can_run_fcfs` for when this can be used.
+
+    Without reservations, the resources free over any range of time starting
+    now are just the resources free now, since running jobs only ever release
+    them. So FCFS only needs a count of the free resources, and a heap of the
+    times at which running jobs end: at each of those times, the jobs ending
+    then are ended, and jobs at the head of the queue are started for as long
+    as they fit.
+
+    Jobs are started, ended and moved between queues in the same order as by
+    `System.run`, with `cur_time` set accordingly, so `compute_actual_runtime`
+    is called in the same order and start and end times are identical. Jobs
+    ending at the same time also finish in the same order. The resource usage
+    over the run is recorded in the timeline's history (so that
+    `used_resource_time` and friends still work), but the timeline itself is
+    left without any events.
+    """
+    free = int(system.total_resources.resources[0])
+    total = free
+
+    pending = system.pending_jobs
+    running = system.running_jobs
+    finished = system.finished_jobs
+
+    # Jobs ending at each time, added in the order in which they were started
+    # so that they're iterated in the same order as a timeline's end events:
+    ending: Dict[int, Set[Job]] = {}
+    end_times: List[int] = []
+
+    # Resource usage profile over the run:
+    times: List[int] = []
+    used: List[List[int]] = []
+
+    t = system.cur_time
+    while True:
+        while len(pending) > 0:
+            job = pending[0]
+            n = int(job.resources.resources[0])
+            if n > free:
+                break
+
+            job.start(system)
+            running.add(job)
+            free -= n
+
+            end_time = job.end_time
+            jobs = ending.get(end_time)
+            if jobs is None:
+                jobs = ending[end_time] = set()
+                heapq.heappush(end_times, end_time)
+            jobs.add(job)
+
+            pending.popleft()
+
+        times.append(t)
+        used.append([total - free])
+
+        if len(end_times) == 0:
+            break
+
+        t = system.cur_time = heapq.heappop(end_times)
+        for job in ending.pop(t):
+            job.end(t)
+            running.remove(job)
+            finished.append(job)
+            free += int(job.resources.resources[0])
+
+    system._should_run_sched_loop = False
+    system._timeline.record_history(times, used, t)
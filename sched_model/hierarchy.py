@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+import heapq
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from .job import Job
+from .system import System
+
+# Order in which queued events at the same time are handled: jobs arrive
+# before systems handle their own events.
+_ARRIVAL = 0
+_SYSTEM_EVENT = 1
+
+DispatchPolicy = Callable[["SchedNode", Job], int]
+StealPolicy = Callable[[System, Sequence[System]], Optional[Tuple[System, Job]]]
+
+
+def round_robin(node: SchedNode, job: Job) -> int:
+    """Dispatch jobs to each of a node's children in turn."""
+    return node.n_dispatched % len(node.children)
+
+
+def steal_from_longest_queue(
+    thief: System, victims: Sequence[System]
+) -> Optional[Tuple[System, Job]]:
+    """Steal a pending job for an idle system from the victim with the longest
+    queue (trying the others in turn if that fails).
+
+    The stolen job is the one closest to the back of the victim's queue that
+    fits into the resources the thief has free. The job at the head of a
+    queue is never stolen, since it's next in line to start.
+    """
+    free = thief.total_resources.resources.copy()
+    for job in thief.running_jobs:
+        free -= job.resources.resources
+
+    for victim in sorted(victims, key=lambda v: len(v.pending_jobs), reverse=True):
+        if len(victim.pending_jobs) < 2:
+            break
+
+        for i in range(len(victim.pending_jobs) - 1, 0, -1):
+            job = victim.pending_jobs[i]
+            if (job.resources.resources <= free).all():
+                return (victim, job)
+
+    return None
+
+
+class SchedNode(object):
+    """An interior node of a scheduler hierarchy.
+
+    Interior nodes hold no resources of their own: they dispatch each job they
+    receive to one of their children, which are either other `SchedNode`s or
+    leaf `System`s. The child is chosen by `dispatch` when the job arrives,
+    and the job arrives at that child `delay` timesteps later.
+    """
+
+    def __init__(
+        self,
+        children: Sequence[Union[SchedNode, System]],
+        dispatch: DispatchPolicy = round_robin,
+        delay: int = 0,
+    ):
+        if len(children) == 0:
+            raise ValueError("scheduler nodes must have at least one child")
+        if delay < 0:
+            raise ValueError("dispatch delay must not be negative")
+
+        self.children: List[Union[SchedNode, System]] = list(children)
+        self.dispatch: DispatchPolicy = dispatch
+        self.delay: int = int(delay)
+
+        # Number of jobs dispatched to each child so far:
+        self.dispatched: List[int] = [0] * len(self.children)
+        self.n_dispatched: int = 0
+
+
+class HierarchicalModel(object):
+    """A hierarchy of schedulers, simulated as a whole.
+
+    Jobs are submitted to the root, and dispatched down through interior
+    `SchedNode`s to leaf `System`s as the simulation reaches their arrival
+    times, so dispatch decisions can depend on the state of the leaves at that
+    time. Every leaf is advanced from a single queue holding both job arrivals
+    and each leaf's next event, so picking the next thing to simulate takes
+    O(log L) time for L leaves, and all leaves share a clock.
+
+    If `steal` is given, leaves that run out of queued work steal pending jobs
+    from their sibling leaves (those with the same parent) whenever either
+    changes: `steal` is called with the idle leaf and its siblings, and
+    returns the sibling to steal from and the job to steal, or None. The job
+    is withdrawn from the sibling right away, and arrives at the thief
+    `steal_delay` timesteps later; a leaf doesn't steal again until then.
+    """
+
+    def __init__(
+        self,
+        root: Union[SchedNode, System],
+        steal: Optional[StealPolicy] = None,
+        steal_delay: int = 0,
+    ):
+        if steal_delay < 0:
+            raise ValueError("steal delay must not be negative")
+
+        self.root: Union[SchedNode, System] = root
+        self.cur_time: int = 0
+        self.steal: Optional[StealPolicy] = steal
+        self.steal_delay: int = int(steal_delay)
+        self.n_steals: int = 0
+
+        # Leaves by their ID (see `workflow.get_leaf_ids`), in order:
+        self.leaves: Dict[str, System] = {}
+        self._collect_leaves(root, "tree")
+        self._leaf_list: List[System] = list(self.leaves.values())
+        self._leaf_index: Dict[int, int] = {
+            id(leaf): i for i, leaf in enumerate(self._leaf_list)
+        }
+
+        # Indices of the leaves sharing a parent with each leaf:
+        self._siblings: List[List[int]] = [[] for _ in self._leaf_list]
+        self._collect_siblings(root)
+
+        # Number of stolen jobs on their way to each leaf, and the leaf each
+        # of those jobs is headed for:
+        self._in_flight: List[int] = [0] * len(self._leaf_list)
+        self._stolen: Dict[int, int] = {}
+
+        # Queued events, as (time, kind, sequence number, target, payload)
+        # tuples. Each leaf has at most one valid event queued at a time; the
+        # payload of a leaf event is the version of the leaf it's valid for.
+        self._events: List[tuple] = []
+        self._seq: int = 0
+        self._versions: List[int] = [0] * len(self._leaf_list)
+
+    @classmethod
+    def from_topology(
+        cls,
+        topology: Tuple[int, ...],
+        make_leaf: Callable[[], System],
+        dispatch: DispatchPolicy = round_robin,
+        delay: int = 0,
+        steal: Optional[StealPolicy] = None,
+        steal_delay: int = 0,
+    ) -> HierarchicalModel:
+        """Build a hierarchy with the given topology (as used by
+        `workflow.get_leaf_ids`), creating each leaf with `make_leaf`. All
+        interior nodes use the same dispatch policy and delay.
+        """
+
+        def build(level: int) -> Union[SchedNode, System]:
+            if level == len(topology):
+                return make_leaf()
+            return SchedNode(
+                [build(level + 1) for _ in range(topology[level])], dispatch, delay
+            )
+
+        return cls(build(0), steal, steal_delay)
+
+    def _collect_leaves(self, node: Union[SchedNode, System], node_id: str):
+        if isinstance(node, System):
+            self.leaves[node_id] = node
+            return
+
+        for i, child in enumerate(node.children):
+            self._collect_leaves(child, "{}.{}".format(node_id, i + 1))
+
+    def _collect_siblings(self, node: Union[SchedNode, System]):
+        if isinstance(node, System):
+            return
+
+        leaves = [
+            self._leaf_index[id(child)]
+            for child in node.children
+            if isinstance(child, System)
+        ]
+        for i in leaves:
+            self._siblings[i] = [k for k in leaves if k != i]
+        for child in node.children:
+            self._collect_siblings(child)
+
+    def _push(self, t: int, kind: int, target: Union[SchedNode, System], payload):
+        heapq.heappush(self._events, (t, kind, self._seq, target, payload))
+        self._seq += 1
+
+    def _schedule_leaf(self, leaf: System):
+        # Queue the leaf's next event, superseding any previously queued one:
+        i = self._leaf_index[id(leaf)]
+        self._versions[i] += 1
+        t = leaf.next_event_time()
+        if t is not None:
+            self._push(t, _SYSTEM_EVENT, leaf, self._versions[i])
+
+    def submit(self, job: Job, t: Optional[int] = None, leaf: Optional[str] = None):
+        """Submit a job to the root of the hierarchy at time `t` (by default,
+        the current time).
+
+        If a `leaf` ID is given, the job is submitted straight to that leaf
+        instead, bypassing dispatch (for instance, to model a static
+        distribution of jobs).
+        """
+        if t is None:
+            t = self.cur_time
+        if t < self.cur_time:
+            raise ValueError("cannot submit jobs in the past")
+
+        job.submit_time = t
+        self._push(t, _ARRIVAL, self.root if leaf is None else self.leaves[leaf], job)
+
+    def _arrive(
+        self,
+        node: Union[SchedNode, System],
+        job: Job,
+        t: int,
+        sched_policy: Callable[[System], None],
+        touched: Set[int],
+    ):
+        while isinstance(node, SchedNode):
+            i = node.dispatch(node, job)
+            node.dispatched[i] += 1
+            node.n_dispatched += 1
+            if node.delay > 0:
+                self._push(t + node.delay, _ARRIVAL, node.children[i], job)
+                return
+            node = node.children[i]
+
+        # Jobs arriving at a leaf at the same time are all scheduled together,
+        # once they've all arrived:
+        if node.cur_time < t:
+            node.advance_to(t, sched_policy)
+        node.enqueue_job(job)
+
+        i = self._leaf_index[id(node)]
+        if self._stolen.pop(id(job), None) is not None:
+            self._in_flight[i] -= 1
+        touched.add(i)
+
+    def step(self, sched_policy: Callable[[System], None]) -> bool:
+        """Handle everything that happens at the time of the next queued
+        event, in every leaf, then run scheduling passes on the leaves that
+        need one.
+
+        Returns whether there was anything left to simulate.
+        """
+        while len(self._events) > 0:
+            t, kind, _, target, payload = self._events[0]
+            if (
+                kind == _ARRIVAL
+                or payload == self._versions[self._leaf_index[id(target)]]
+            ):
+                break
+            # Discard leaf events that were superseded:
+            heapq.heappop(self._events)
+        else:
+            return False
+
+        self.cur_time = t
+        touched: Set[int] = set()
+        while len(self._events) > 0 and self._events[0][0] == t:
+            _, kind, _, target, payload = heapq.heappop(self._events)
+            if kind == _ARRIVAL:
+                self._arrive(target, payload, t, sched_policy, touched)
+            else:
+                i = self._leaf_index[id(target)]
+                if payload == self._versions[i]:
+                    target.advance_to(t, sched_policy)
+                    touched.add(i)
+
+        for i in sorted(touched):
+            leaf = self._leaf_list[i]
+            leaf.run_sched_loop(sched_policy)
+            self._schedule_leaf(leaf)
+
+        if self.steal is not None:
+            thieves = set(touched)
+            for i in touched:
+                thieves.update(self._siblings[i])
+            for i in sorted(thieves):
+                self._steal_for(i, t, sched_policy)
+        return True
+
+    def _steal_for(self, i: int, t: int, sched_policy: Callable[[System], None]):
+        thief = self._leaf_list[i]
+        siblings = [self._leaf_list[k] for k in self._siblings[i]]
+
+        while (
+            self._in_flight[i] == 0
+            and len(thief.pending_jobs) == 0
+            and len(thief.reserved_jobs) == 0
+        ):
+            stolen = self.steal(thief, siblings)
+            if stolen is None:
+                return
+
+            victim, job = stolen
+            victim.advance_to(t, sched_policy)
+            victim.withdraw_job(job)
+            victim.run_sched_loop(sched_policy)
+            self._schedule_leaf(victim)
+            self.n_steals += 1
+
+            if self.steal_delay > 0:
+                self._in_flight[i] += 1
+                self._stolen[id(job)] = i
+                self._push(t + self.steal_delay, _ARRIVAL, thief, job)
+                return
+
+            thief.advance_to(t, sched_policy)
+            thief.enqueue_job(job)
+            thief.run_sched_loop(sched_policy)
+            self._schedule_leaf(thief)
+
+    def run(self, sched_policy: Callable[[System], None]):
+        """Run the whole hierarchy until there is nothing left to simulate,
+        scheduling each leaf with `sched_policy`.
+
+        As with `System.run`, a stateful `SchedPolicy` is attached to every
+        leaf it's used with, so each leaf would need its own instance; use a
+        plain policy function here instead.
+        """
+        while self.step(sched_policy):
+            pass
+
+    @property
+    def makespan(self) -> int:
+        """The time at which the last job in any leaf finished."""
+        return max(
+            (j.end_time for leaf in self._leaf_list for j in leaf.finished_jobs),
+            default=0,
+        )
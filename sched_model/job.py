@@ -18,6 +18,7 @@ class Job(object):
         self.resources: Resources = Resources(resources)
 
         self._job_id: Optional[int] = None
+        self.submit_time: Optional[int] = None
         self.start_time: Optional[int] = None
         self.end_time: Optional[int] = None
         self.deadline: Optional[int] = None
@@ -37,6 +38,10 @@ class Job(object):
     def job_id(self) -> Optional[int]:
         return self._job_id
 
+    @property
+    def state(self) -> int:
+        return self._state
+
     @property
     def is_new(self) -> bool:
         return self._state == Job.NEW
@@ -74,6 +79,15 @@ class Job(object):
         self.deadline = None
         self._state = Job.PENDING
 
+    def withdraw(self):
+        """Move this job out of the PENDING or RESERVED state, and back into
+        the NEW state, so that it can be enqueued again.
+
+        The job keeps its ID until then."""
+        self.start_time = None
+        self.deadline = None
+        self._state = Job.NEW
+
     def start(self, system):
         """Move this job into the STARTED state."""
         self.start_time = system.cur_time
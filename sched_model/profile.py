@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+from copy import copy
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .resource import Resources
+from .job import Job
+from .system import (
+    StartRequest,
+    TimelineData,
+    TimelineProfile,
+    UsageLedger,
+    earliest_start_times,
+    export_events,
+    profile_resource_time,
+)
+
+
+class ProfileTimeline(object):
+    """A timeline that stores its resource profile as parallel arrays.
+
+    The profile is a sorted array of breakpoint times, alongside a
+    `(n_breakpoints, n_resources)` matrix holding the free resources from
+    each breakpoint up to the next. There is a breakpoint at the time of every
+    event, just as there is a node for every event in a `Timeline`, so both
+    produce the same schedules.
+
+    Checking whether a job fits over a range of time is then a `searchsorted`
+    for the range's bounds and a vectorized comparison over the rows between
+    them, and finding the earliest time a job fits checks every candidate
+    start time at once, instead of walking the profile in Python.
+
+    Both arrays have spare capacity at the front and back, and inserting or
+    removing a breakpoint shifts whichever side of it is shorter. Truncating
+    history only moves the front of the profile forward.
+
+    Breakpoint times are stored as 64-bit integers. This has the same
+    interface as `Timeline`, and can be used in a `System` by passing it as
+    the `timeline` argument.
+    """
+
+    def __init__(self, base_resources: Resources, capacity: int = 64):
+        self._total_resources: Resources = Resources(base_resources)
+
+        capacity = max(int(capacity), 2)
+        self._times: np.ndarray = np.empty(capacity, dtype=np.int64)
+        self._free: np.ndarray = np.empty(
+            (capacity, len(self._total_resources)),
+            dtype=self._total_resources.resources.dtype,
+        )
+
+        # The profile is held in [_lo, _hi) of both arrays:
+        self._lo: int = capacity // 2
+        self._hi: int = capacity // 2
+
+        # Event data for each breakpoint:
+        self._events: Dict[int, TimelineData] = {}
+
+        # Breakpoint holding the resource state at the point where history was
+        # last truncated, if any. This must be kept even once it holds no
+        # events.
+        self._base_time: Optional[int] = None
+
+        # Resource usage over the truncated history:
+        self._ledger: UsageLedger = UsageLedger(
+            len(self._total_resources), self._total_resources.resources.dtype
+        )
+
+    def _index(self, t: int, side: str = "left") -> int:
+        # Index in the arrays at which a breakpoint at `t` is (or would be):
+        return self._lo + int(
+            np.searchsorted(self._times[self._lo : self._hi], t, side)
+        )
+
+    def _grow(self):
+        n = self._hi - self._lo
+        capacity = 2 * len(self._times)
+        lo = (capacity - n) // 2
+
+        times = np.empty(capacity, dtype=self._times.dtype)
+        free = np.empty((capacity, self._free.shape[1]), dtype=self._free.dtype)
+        times[lo : lo + n] = self._times[self._lo : self._hi]
+        free[lo : lo + n] = self._free[self._lo : self._hi]
+
+        self._times = times
+        self._free = free
+        self._lo = lo
+        self._hi = lo + n
+
+    def _insert_breakpoint(self, t: int):
+        lo, hi = self._lo, self._hi
+        if lo == 0 and hi == len(self._times):
+            self._grow()
+            lo, hi = self._lo, self._hi
+
+        i = self._index(t)
+        if lo > 0 and (i - lo < hi - i or hi == len(self._times)):
+            self._times[lo - 1 : i - 1] = self._times[lo:i]
+            self._free[lo - 1 : i - 1] = self._free[lo:i]
+            self._lo = lo = lo - 1
+            i -= 1
+        else:
+            self._times[i + 1 : hi + 1] = self._times[i:hi]
+            self._free[i + 1 : hi + 1] = self._free[i:hi]
+            self._hi = hi + 1
+
+        # A new breakpoint starts out with the resources available just
+        # before it:
+        self._times[i] = t
+        if i > lo:
+            self._free[i] = self._free[i - 1]
+        else:
+            self._free[i] = self._total_resources.resources
+
+    def _remove_breakpoint(self, t: int):
+        lo, hi = self._lo, self._hi
+        i = self._index(t)
+        if i - lo < hi - i - 1:
+            self._times[lo + 1 : i + 1] = self._times[lo:i]
+            self._free[lo + 1 : i + 1] = self._free[lo:i]
+            self._lo = lo + 1
+        else:
+            self._times[i : hi - 1] = self._times[i + 1 : hi]
+            self._free[i : hi - 1] = self._free[i + 1 : hi]
+            self._hi = hi - 1
+
+    def _get_data(self, t: int) -> TimelineData:
+        data = self._events.get(t)
+        if data is None:
+            self._insert_breakpoint(t)
+            data = self._events[t] = TimelineData(self._total_resources)
+        return data
+
+    def _cleanup_data(self, t: int):
+        data = self._events[t]
+        if (
+            len(data.end) == 0
+            and len(data.expired) == 0
+            and len(data.start) == 0
+            and t != self._base_time
+        ):
+            del self._events[t]
+            self._remove_breakpoint(t)
+
+    def _refresh_data(self, i: int) -> Tuple[int, TimelineData]:
+        # Event data doesn't track resources as they change, so fill in the
+        # current value whenever it's looked at:
+        t = int(self._times[i])
+        data = self._events[t]
+        data.resources = Resources(self._free[i])
+        return (t, data)
+
+    def add_job_reservation(self, job: Job):
+        self._get_data(job.start_time).start.add(job)
+        self._get_data(job.deadline).expired.add(job)
+        self._free[
+            self._index(job.start_time) : self._index(job.deadline)
+        ] -= job.resources.resources
+
+    def remove_job_reservation(self, job: Job):
+        self._free[
+            self._index(job.start_time) : self._index(job.deadline)
+        ] += job.resources.resources
+
+        self._events[job.start_time].start.remove(job)
+        self._cleanup_data(job.start_time)
+        self._events[job.deadline].expired.remove(job)
+        self._cleanup_data(job.deadline)
+
+    def start_job_reservation(self, job: Job):
+        self._get_data(job.end_time).end.add(job)
+
+    def end_job_reservation(self, job: Job, new_end_time: int):
+        prev_end_time = job.end_time
+        prev_deadline = job.deadline
+
+        assert new_end_time <= prev_deadline
+        assert new_end_time <= prev_end_time
+
+        if new_end_time < prev_end_time:
+            self._events[prev_end_time].end.remove(job)
+            self._cleanup_data(prev_end_time)
+            self._get_data(new_end_time).end.add(job)
+
+        if new_end_time < prev_deadline:
+            self._free[
+                self._index(new_end_time) : self._index(prev_deadline)
+            ] += job.resources.resources
+
+        self._events[prev_deadline].expired.remove(job)
+        self._cleanup_data(prev_deadline)
+
+    def iter_resources(
+        self, start_time: int, end_time: Optional[int] = None, copy: bool = True
+    ) -> Iterator[Tuple[int, Resources]]:
+        if self._hi == self._lo:
+            yield (start_time, self._total_resources.clone())
+            return
+
+        first = max(self._index(start_time, "right") - 1, self._lo)
+        last = self._hi if end_time is None else self._index(end_time)
+        for i in range(first, last):
+            yield (max(start_time, int(self._times[i])), Resources(self._free[i]))
+
+    def can_schedule(self, job: Job, start_time: int) -> bool:
+        first = max(self._index(start_time, "right") - 1, self._lo)
+        last = self._index(start_time + job.timelimit)
+        return bool((self._free[first:last] >= job.resources.resources).all())
+
+    def find_schedulable_time(
+        self, job: Job, start_time: int, reserve: bool
+    ) -> Optional[int]:
+        if self._hi == self._lo:
+            return start_time
+
+        # Candidate start times are `start_time` itself, and every breakpoint
+        # after it:
+        first = max(self._index(start_time, "right") - 1, self._lo)
+        if not reserve:
+            if self._times[first] > start_time:
+                return None
+            return start_time if self.can_schedule(job, start_time) else None
+
+        times = self._times[first : self._hi]
+        starts = np.maximum(times, start_time)
+        ends = np.searchsorted(times, starts + job.timelimit)
+
+        # A candidate fits if no breakpoint between its start and end lacks
+        # the job's resources:
+        fits = (self._free[first : self._hi] >= job.resources.resources).all(axis=1)
+        misses = np.concatenate(([0], np.cumsum(~fits)))
+        fit = misses[ends] == misses[:-1]
+
+        i = int(np.argmax(fit))
+        if not fit[i]:
+            raise RuntimeError("could not find job scheduling time")
+        return int(starts[i])
+
+    def find_earliest_start_times(
+        self, requests: Iterable[StartRequest], start_time: int
+    ) -> List[int]:
+        """Find the earliest time at or after `start_time` at which each of a
+        batch of `(resources, timelimit)` requests could start, without
+        reserving anything.
+        """
+        first = max(self._index(start_time, "right") - 1, self._lo)
+        return earliest_start_times(
+            self._times[first : self._hi],
+            self._free[first : self._hi],
+            start_time,
+            list(requests),
+        )
+
+    def used_resource_time(self, start_time: int, end_time: int) -> np.ndarray:
+        """Get the total resource-time used over [start_time, end_time), for
+        each resource dimension, including truncated history.
+        """
+        if end_time <= start_time:
+            return np.zeros_like(self._total_resources.resources)
+
+        ret = self._ledger.resource_time(end_time) - self._ledger.resource_time(
+            start_time
+        )
+        if self._ledger.end is not None:
+            start_time = max(start_time, self._ledger.end)
+
+        first = max(self._index(start_time, "right") - 1, self._lo)
+        last = self._index(end_time)
+        return ret + profile_resource_time(
+            self._times[first:last],
+            self._total_resources.resources - self._free[first:last],
+            start_time,
+            end_time,
+        )
+
+    def fork(self, jobs: Dict[Job, Job]) -> ProfileTimeline:
+        """Create an independent copy of this timeline, replacing each job
+        found in `jobs` with its corresponding value.
+        """
+        ret = copy(self)
+        ret._times = self._times.copy()
+        ret._free = self._free.copy()
+        ret._events = {t: data.fork(jobs) for t, data in self._events.items()}
+        ret._ledger = self._ledger.copy()
+        return ret
+
+    def export_profile(self, start_time: Optional[int] = None) -> TimelineProfile:
+        """Export the breakpoints in this timeline as arrays, from the last one
+        at or before `start_time` on if it's given (see
+        `Timeline.export_profile`).
+
+        The times and free resources are copied straight out of the profile.
+        """
+        first = self._lo
+        if start_time is not None:
+            first = max(self._index(start_time, "right") - 1, self._lo)
+
+        times = self._times[first : self._hi].tolist()
+        return export_events(
+            times,
+            [self._events[t] for t in times],
+            self._free[first : self._hi].copy(),
+        )
+
+    def truncate_history(self, t: int):
+        """Drop all breakpoints before time `t`, folding them into a single
+        base breakpoint at `t` that holds the resources available from then
+        on. The resources used over the dropped history are kept in a ledger.
+
+        As with `Timeline.truncate_history`, `t` must not be after the current
+        time of the system that owns this timeline.
+        """
+        if self._hi == self._lo or not (self._times[self._lo] < t):
+            return
+
+        self._get_data(t)
+        self._base_time = t
+
+        first = self._index(t)
+        self._ledger.append(
+            self._times[self._lo : first],
+            self._total_resources.resources - self._free[self._lo : first],
+            t,
+        )
+        for event_t in self._times[self._lo : first].tolist():
+            del self._events[event_t]
+        self._lo = first
+
+    def record_history(self, times: Sequence[int], used: Sequence, end: int):
+        """Record resource usage over time that was simulated without this
+        timeline; see `Timeline.record_history`.
+
+        The timeline must not hold any events.
+        """
+        assert self._hi == self._lo
+        self._ledger.append(times, used, end)
+
+    def iter(
+        self,
+        left_bound: Optional[int] = None,
+        right_bound: Optional[int] = None,
+        reverse: bool = False,
+    ) -> Iterator[Tuple[int, TimelineData]]:
+        first = self._lo if left_bound is None else self._index(left_bound)
+        last = self._hi if right_bound is None else self._index(right_bound)
+
+        indices = range(first, last)
+        if reverse:
+            indices = reversed(indices)
+
+        for i in indices:
+            yield self._refresh_data(i)
+
+    def next_event(self, after_time: int) -> Optional[Tuple[int, TimelineData]]:
+        i = self._index(after_time, "right")
+        if i == self._hi:
+            return None
+        return self._refresh_data(i)
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import math
+from typing import Callable, Dict, List, Mapping, NamedTuple, Optional
+
+import numpy as np
+
+
+class Estimate(NamedTuple):
+    """The mean of a sample, and the half-width of its confidence interval."""
+
+    mean: float
+    half_width: float
+    n: int
+
+    @property
+    def low(self) -> float:
+        return self.mean - self.half_width
+
+    @property
+    def high(self) -> float:
+        return self.mean + self.half_width
+
+
+class ReplicationResult(NamedTuple):
+    """The results of `replicate`: an estimate for each metric, the samples it
+    was computed from, and whether every estimate reached the requested
+    precision (rather than running out of replications)."""
+
+    estimates: Dict[str, Estimate]
+    samples: Dict[str, np.ndarray]
+    converged: bool
+
+    @property
+    def n_replications(self) -> int:
+        return min((len(s) for s in self.samples.values()), default=0)
+
+
+def _t_two_sided(t: float, df: int) -> float:
+    # P(|T| <= t) for Student's t distribution with `df` degrees of freedom,
+    # using the finite series for integer degrees of freedom (Abramowitz and
+    # Stegun, 26.7.3 and 26.7.4):
+    theta = math.atan(t / math.sqrt(df))
+    sin, cos2 = math.sin(theta), math.cos(theta) ** 2
+
+    if df % 2 == 0:
+        term = total = 1.0
+        for k in range(2, df, 2):
+            term *= cos2 * (k - 1) / k
+            total += term
+        return sin * total
+
+    if df == 1:
+        return 2 * theta / math.pi
+
+    term = total = math.cos(theta)
+    for k in range(3, df, 2):
+        term *= cos2 * (k - 1) / k
+        total += term
+    return 2 * (theta + sin * total) / math.pi
+
+
+def t_critical(confidence: float, df: int) -> float:
+    """Get the critical value of Student's t distribution with `df` degrees of
+    freedom for a two-sided confidence interval at the given level."""
+    if not 0 < confidence < 1:
+        raise ValueError("confidence level must be between 0 and 1")
+    if df < 1:
+        raise ValueError("degrees of freedom must be positive")
+
+    lo, hi = 0.0, 1.0
+    while _t_two_sided(hi, df) < confidence:
+        hi *= 2
+    for _ in range(100):
+        mid = (lo + hi) / 2
+        if _t_two_sided(mid, df) < confidence:
+            lo = mid
+        else:
+            hi = mid
+    return hi
+
+
+def confidence_interval(samples: np.ndarray, confidence: float = 0.95) -> Estimate:
+    """Estimate the mean of a sample, with a Student's t confidence interval
+    at the given level. The interval is infinitely wide for fewer than two
+    samples."""
+    samples = np.asarray(samples, dtype=float)
+    n = len(samples)
+    if n == 0:
+        return Estimate(math.nan, math.inf, 0)
+    if n == 1:
+        return Estimate(float(samples[0]), math.inf, 1)
+
+    std_err = float(np.std(samples, ddof=1)) / math.sqrt(n)
+    return Estimate(float(np.mean(samples)), t_critical(confidence, n - 1) * std_err, n)
+
+
+def replicate(
+    run: Callable[[np.random.Generator], Mapping[str, float]],
+    confidence: float = 0.95,
+    rel_tol: float = 0.01,
+    abs_tol: float = 0.0,
+    min_replications: int = 5,
+    max_replications: int = 100,
+    seed: Optional[int] = None,
+) -> ReplicationResult:
+    """Run a stochastic experiment repeatedly, each time with an independent
+    random number generator, until the mean of every metric it reports is
+    known precisely enough.
+
+    `run` is called with a generator, and returns a mapping from metric names
+    to values (such as makespan and mean wait time). After at least
+    `min_replications` runs, replication stops as soon as the confidence
+    interval of every metric is within `rel_tol` of its mean, or within
+    `abs_tol`, whichever is larger; otherwise it stops after
+    `max_replications` runs.
+
+    Each run's generator is spawned from `seed`, so results are reproducible,
+    and the first N runs are the same no matter when replication stops.
+    """
+    if min_replications < 2:
+        raise ValueError("at least two replications are needed")
+    if max_replications < min_replications:
+        raise ValueError("max_replications must be at least min_replications")
+
+    seed_seq = np.random.SeedSequence(seed)
+    samples: Dict[str, List[float]] = {}
+    estimates: Dict[str, Estimate] = {}
+
+    for n in range(1, max_replications + 1):
+        metrics = run(np.random.default_rng(seed_seq.spawn(1)[0]))
+        if n == 1:
+            samples = {name: [] for name in metrics}
+        for name, values in samples.items():
+            values.append(float(metrics[name]))
+
+        if n < min_replications:
+            continue
+
+        estimates = {
+            name: confidence_interval(values, confidence)
+            for name, values in samples.items()
+        }
+        converged = all(
+            e.half_width <= max(rel_tol * abs(e.mean), abs_tol)
+            for e in estimates.values()
+        )
+        if converged:
+            break
+
+    return ReplicationResult(
+        estimates,
+        {name: np.array(values) for name, values in samples.items()},
+        converged,
+    )
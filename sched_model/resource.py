@@ -9,7 +9,10 @@ class Resources(object):
         self.resources: np.ndarray = self._resource_vec(v).astype(np.int)
 
     def clone(self) -> Resources:
-        return Resources(self.resources)
+        # The vector already has the right dtype, so skip the conversion:
+        ret = Resources.__new__(Resources)
+        ret.resources = self.resources.copy()
+        return ret
 
     def valid(self) -> bool:
         return (self.resources >= 0).all()
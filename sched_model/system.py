@@ -1,11 +1,31 @@
 from __future__ import annotations
 
+from abc import ABC, abstractmethod
 from collections import deque
-from typing import List, Deque, Optional, Dict, Callable, Iterator, Tuple, Set
+from collections.abc import Sequence as SequenceABC
+from copy import copy
+from itertools import chain, islice
+from typing import (
+    Any,
+    List,
+    Deque,
+    Optional,
+    Dict,
+    Callable,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Sequence,
+    Tuple,
+    Set,
+    Union,
+)
+
+import numpy as np
 
 from .resource import Resources, RscCompatible
 from .job import Job
-from .tree import RBTree
+from .tree import ArrayRBTree, AVLTree, RBTree, SortedChunkList
 from .tree.base import TreeNode
 
 
@@ -16,14 +36,371 @@ class TimelineData(object):
         self.expired: Set[Job] = set()
         self.resources: Resources = Resources(resources)
 
+    def fork(self, jobs: Dict[Job, Job]) -> TimelineData:
+        """Copy this event data, replacing each job found in `jobs` with its
+        corresponding value.
+        """
+        ret = TimelineData.__new__(TimelineData)
+        ret.resources = self.resources.clone()
+        ret.start = {jobs.get(j, j) for j in self.start}
+        ret.end = {jobs.get(j, j) for j in self.end}
+        ret.expired = {jobs.get(j, j) for j in self.expired}
+        return ret
+
+
+# Ordered map types that can store a Timeline's events. Any other type with
+# the same interface as `Tree` (node handles with `prev`/`value`, hinted
+# `get_or_insert_node`, `delete_node`, bounds and range iteration) also works.
+TIMELINE_BACKENDS: Dict[str, Callable[[], Any]] = {
+    "rb": RBTree,
+    "avl": AVLTree,
+    "chunked": SortedChunkList,
+    "array": ArrayRBTree,
+}
+
+TimelineBackend = Union[str, Callable[[], Any]]
+
+# Queue depth above which "auto" picks the chunked list over a red-black tree
+# (for every 4 resource dimensions):
+CHUNKED_QUEUE_DEPTH = 32
+
+
+def select_timeline_backend(expected_queue_depth: Optional[int], n_dims: int) -> str:
+    """Pick a Timeline backend name for a workload.
+
+    A Timeline holds roughly two events for every queued or running job, and
+    most Timeline operations start by searching for the bounds of a range of
+    events and then scan it. Once the queue is deep enough for those searches
+    to matter, the chunked list's bisection and contiguous scans beat
+    pointer-chasing through a tree. With more resource dimensions, the
+    per-event resource arithmetic takes up more of each scan, so a deeper
+    queue is needed before switching. Shallow (or unknown) queue depths keep
+    the default red-black tree.
+    """
+    if expected_queue_depth is None:
+        return "rb"
+    elif expected_queue_depth >= CHUNKED_QUEUE_DEPTH * max(n_dims // 4, 1):
+        return "chunked"
+    return "rb"
+
+
+def resolve_timeline_backend(
+    backend: TimelineBackend, expected_queue_depth: Optional[int], n_dims: int
+) -> Callable[[], Any]:
+    """Turn a backend name (or \"auto\") into an ordered map type.
+
+    Non-string backends are assumed to already be ordered map types, and are
+    returned as-is.
+    """
+    if not isinstance(backend, str):
+        return backend
+    elif backend == "auto":
+        backend = select_timeline_backend(expected_queue_depth, n_dims)
+
+    try:
+        return TIMELINE_BACKENDS[backend]
+    except KeyError:
+        raise ValueError("unknown timeline backend: " + repr(backend)) from None
+
+
+class TimelineProfile(NamedTuple):
+    """The breakpoints of a timeline, exported as arrays.
+
+    Row `i` of each array describes the `i`th breakpoint: its time, the
+    resources free from then until the next breakpoint, and the number of
+    start, end and expiration events at that time.
+    """
+
+    times: np.ndarray
+    free: np.ndarray
+    n_start: np.ndarray
+    n_end: np.ndarray
+    n_expired: np.ndarray
+
+
+class JobTable(NamedTuple):
+    """A table of jobs, exported as arrays, with one row per job.
+
+    Times that haven't been set yet (such as the start time of a pending job)
+    are -1.
+    """
+
+    job_id: np.ndarray
+    state: np.ndarray
+    start_time: np.ndarray
+    end_time: np.ndarray
+    deadline: np.ndarray
+    timelimit: np.ndarray
+    resources: np.ndarray
+
+
+def export_events(
+    times: List[int], events: List[TimelineData], free: np.ndarray
+) -> TimelineProfile:
+    """Build a `TimelineProfile` from a list of breakpoints and their events."""
+    counts = np.array(
+        [(len(data.start), len(data.end), len(data.expired)) for data in events],
+        dtype=np.int64,
+    ).reshape(len(events), 3)
+    times = np.array(times) if len(times) > 0 else np.empty(0, dtype=np.int64)
+    return TimelineProfile(times, free, counts[:, 0], counts[:, 1], counts[:, 2])
+
+
+# A job's resource requirements and time limit, for queries that don't need an
+# actual Job:
+StartRequest = Tuple[RscCompatible, int]
+
+
+def earliest_start_times(
+    times: np.ndarray,
+    free: np.ndarray,
+    start_time: int,
+    requests: List[StartRequest],
+) -> List[int]:
+    """Find the earliest start time for each of a batch of requests, given a
+    resource profile.
+
+    The profile is given as a sorted array of breakpoint times, and a
+    `(n_breakpoints, n_resources)` array of the resources that are free from
+    each breakpoint up to the next. It should start with the last breakpoint
+    at or before `start_time`, and its last breakpoint should have enough
+    free resources for every request.
+
+    Candidate start times are `start_time` and all breakpoints after it, and
+    all requests are checked against all candidates at once.
+    """
+    if len(requests) == 0:
+        return []
+    elif len(times) == 0:
+        return [start_time] * len(requests)
+
+    demand = np.array([Resources._resource_vec(r) for r, _ in requests])
+    timelimits = np.array([tl for _, tl in requests], dtype=times.dtype)
+
+    starts = np.maximum(times, start_time)
+    ends = np.searchsorted(times, starts[np.newaxis, :] + timelimits[:, np.newaxis])
+
+    # A request fits at a candidate if no breakpoint between the candidate and
+    # the request's end lacks the request's resources:
+    fits = (free[np.newaxis, :, :] >= demand[:, np.newaxis, :]).all(axis=2)
+    misses = np.zeros((len(requests), len(times) + 1), dtype=np.int64)
+    np.cumsum(~fits, axis=1, out=misses[:, 1:])
+    fit = np.take_along_axis(misses, ends, axis=1) == misses[:, :-1]
+
+    first = fit.argmax(axis=1)
+    if not fit[np.arange(len(requests)), first].all():
+        raise RuntimeError("could not find job scheduling time")
+    return starts[first].tolist()
+
+
+def profile_resource_time(
+    times: np.ndarray, used: np.ndarray, t0: int, t1: int
+) -> np.ndarray:
+    """Integrate a resource usage profile over the time range [t0, t1).
+
+    The profile is given as a sorted array of breakpoint times, and a
+    `(n_breakpoints, n_resources)` array of the resources in use from each
+    breakpoint up to the next; the last breakpoint's usage continues
+    indefinitely, and nothing is in use before the first breakpoint.
+    """
+    if len(times) == 0 or t1 <= t0:
+        return np.zeros(used.shape[1:], dtype=used.dtype)
+
+    starts = np.clip(times, t0, t1)
+    ends = np.clip(np.append(times[1:], t1), t0, t1)
+    return ((ends - starts)[:, np.newaxis] * used).sum(axis=0)
+
+
+class UsageLedger(object):
+    """Cumulative resource usage over timeline history that has been compacted
+    away.
+
+    History is appended as consecutive resource usage profiles. The total
+    usage before each breakpoint is kept alongside it, so that the usage over
+    any range of the recorded history takes a binary search to find.
+
+    Times and resource usage are stored with the given dtype. Use `object` to
+    record them as (unbounded) Python integers.
+    """
+
+    def __init__(self, n_dims: int, dtype: Any = np.int64):
+        self._times: np.ndarray = np.empty(16, dtype=dtype)
+        self._used: np.ndarray = np.empty((16, n_dims), dtype=dtype)
+        self._cumulative: np.ndarray = np.empty((16, n_dims), dtype=dtype)
+        self._len: int = 0
+
+        # End of the recorded history:
+        self.end: Optional[int] = None
+
+    def __len__(self) -> int:
+        return self._len
+
+    def copy(self) -> UsageLedger:
+        ret = copy(self)
+        ret._times = self._times.copy()
+        ret._used = self._used.copy()
+        ret._cumulative = self._cumulative.copy()
+        return ret
+
+    def append(self, times: np.ndarray, used: np.ndarray, end: int):
+        """Record history from `times[0]` up to `end`, given as a resource
+        usage profile (see `profile_resource_time`).
+
+        This must start where the previously recorded history ended.
+        """
+        times = np.asarray(times, dtype=self._times.dtype)
+        used = np.asarray(used, dtype=self._used.dtype)
+        n = len(times)
+        if n == 0:
+            return
+
+        while self._len + n > len(self._times):
+            capacity = 2 * len(self._times)
+            self._times = np.resize(self._times, capacity)
+            self._used = np.resize(self._used, (capacity, self._used.shape[1]))
+            self._cumulative = np.resize(
+                self._cumulative, (capacity, self._cumulative.shape[1])
+            )
+
+        durations = np.diff(times)[:, np.newaxis]
+        cumulative = self._cumulative[self._len : self._len + n]
+        cumulative[0] = self.resource_time(times[0])
+        np.cumsum(durations * used[:-1], axis=0, out=cumulative[1:])
+        cumulative[1:] += cumulative[0]
+
+        self._times[self._len : self._len + n] = times
+        self._used[self._len : self._len + n] = used
+        self._len += n
+        self.end = end
+
+    def resource_time(self, t: int) -> np.ndarray:
+        """Get the total resource usage over recorded history before `t`."""
+        i = int(np.searchsorted(self._times[: self._len], t, "right")) - 1
+        if i < 0:
+            return np.zeros(self._used.shape[1], dtype=self._used.dtype)
+
+        t = min(t, self.end)
+        return self._cumulative[i] + self._used[i] * (t - int(self._times[i]))
+
+    def truncate(self, t: int):
+        """Forget the recorded history from `t` on."""
+        if self.end is None or t >= self.end:
+            return
+
+        self._len = int(np.searchsorted(self._times[: self._len], t, "left"))
+        self.end = t if self._len > 0 else None
+
+
+class JobHistory(SequenceABC):
+    """An append-only sequence of finished jobs that can be forked in O(1)
+    time, for `System.finished_jobs`.
+
+    A fork shares the jobs of the history it was forked from, as they were at
+    the time of the fork, and keeps jobs appended to it afterwards in a list
+    of its own. Since nothing is ever removed, the shared jobs never change.
+    """
+
+    def __init__(self, jobs: Iterable[Job] = ()):
+        # Shared segments, as (list, number of leading jobs that belong to
+        # this history) pairs, followed by this history's own jobs:
+        self._base: Tuple[Tuple[List[Job], int], ...] = ()
+        self._base_len: int = 0
+        self._tail: List[Job] = list(jobs)
+
+    def fork(self) -> JobHistory:
+        ret = JobHistory()
+        ret._base = self._base
+        if len(self._tail) > 0:
+            ret._base += ((self._tail, len(self._tail)),)
+        ret._base_len = len(self)
+        return ret
+
+    def append(self, job: Job):
+        self._tail.append(job)
+
+    def __len__(self) -> int:
+        return self._base_len + len(self._tail)
+
+    def __iter__(self) -> Iterator[Job]:
+        for jobs, n in self._base:
+            yield from islice(jobs, n)
+        yield from self._tail
+
+    def __reversed__(self) -> Iterator[Job]:
+        yield from reversed(self._tail)
+        for jobs, n in reversed(self._base):
+            for i in range(n - 1, -1, -1):
+                yield jobs[i]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(self)[i]
+
+        n = len(self)
+        if i < 0:
+            i += n
+        if not (0 <= i < n):
+            raise IndexError("job history index out of range")
+
+        if i >= self._base_len:
+            return self._tail[i - self._base_len]
+        for jobs, n in self._base:
+            if i < n:
+                return jobs[i]
+            i -= n
+
+    def __repr__(self) -> str:
+        return "JobHistory({!r})".format(list(self))
+
 
 class Timeline(object):
-    def __init__(self, base_resources: Resources):
+    def __init__(
+        self,
+        base_resources: Resources,
+        backend: TimelineBackend = "rb",
+        expected_queue_depth: Optional[int] = None,
+    ):
+        """Create an empty timeline.
+
+        `backend` selects the ordered map used to store events: either a name
+        from `TIMELINE_BACKENDS`, an ordered map type, or \"auto\" to choose
+        based on `expected_queue_depth` and the number of resource dimensions
+        (see `select_timeline_backend`).
+        """
         self._total_resources: Resources = Resources(base_resources)
-        self._tree: RBTree[int, TimelineData] = RBTree()
-
-    def _get_data(self, t: int) -> TreeNode[int, TimelineData]:
-        insert, tree_node = self._tree.get_or_insert_node(t)
+        self._tree = resolve_timeline_backend(
+            backend, expected_queue_depth, len(self._total_resources)
+        )()
+
+        # Tree node handles stay valid until the node is deleted, and a node is
+        # only deleted once it holds no events, so we can cache the node for
+        # each outstanding job event instead of searching for it again later.
+        self._start_nodes: Dict[Job, TreeNode[int, TimelineData]] = {}
+        self._expire_nodes: Dict[Job, TreeNode[int, TimelineData]] = {}
+        self._end_nodes: Dict[Job, TreeNode[int, TimelineData]] = {}
+
+        # Most recently inserted node, used as a search hint for new
+        # reservations (which tend to cluster together):
+        self._last_node: Optional[TreeNode[int, TimelineData]] = None
+
+        # Node holding the resource state at the point where history was last
+        # truncated, if any. This must be kept even once it holds no events.
+        self._base_node: Optional[TreeNode[int, TimelineData]] = None
+
+        # Resource usage over the truncated history. Times in a Timeline are
+        # not limited to 64 bits, so neither are the totals in the ledger:
+        self._ledger: UsageLedger = UsageLedger(len(self._total_resources), object)
+
+        # Resource usage over the events still in the tree, read from the tree
+        # on demand by `used_resource_time`. Changing the reservations at some
+        # time only changes the usage from then on, so this is only cut back
+        # to that time, and events before it are never read again.
+        self._live_usage: UsageLedger = UsageLedger(len(self._total_resources), object)
+
+    def _get_data(
+        self, t: int, hint: Optional[TreeNode[int, TimelineData]] = None
+    ) -> TreeNode[int, TimelineData]:
+        insert, tree_node = self._tree.get_or_insert_node(t, hint)
         if insert:
             if tree_node.prev is not None:
                 prev_data: TimelineData = tree_node.prev.value
@@ -31,43 +408,56 @@ class Timeline(object):
             else:
                 prev_rsc = self._total_resources
             tree_node.value = TimelineData(prev_rsc)
+            self._last_node = tree_node
         return tree_node
 
     def _insert_start_event(self, t: int, job: Job):
-        node = self._get_data(t)
+        node = self._get_data(t, self._last_node)
         data: TimelineData = node.value
         data.start.add(job)
+        self._start_nodes[job] = node
 
     def _insert_expire_event(self, t: int, job: Job):
-        node = self._get_data(t)
+        # Expiration events are always close after the job's start event:
+        node = self._get_data(t, self._start_nodes.get(job))
         data: TimelineData = node.value
         data.expired.add(job)
+        self._expire_nodes[job] = node
 
     def _insert_end_event(self, t: int, job: Job):
-        node = self._get_data(t)
+        # End events are always at or shortly before the job's deadline:
+        node = self._get_data(t, self._expire_nodes.get(job))
         data: TimelineData = node.value
         data.end.add(job)
+        self._end_nodes[job] = node
 
     def _cleanup_node(self, node: TreeNode[int, TimelineData]):
-        k = node.key
         data: TimelineData = node.value
-        if len(data.end) == 0 and len(data.expired) == 0 and len(data.start) == 0:
-            del self._tree[k]
-
-    def _remove_start_event(self, t: int, job: Job):
-        node = self._get_data(t)
+        if (
+            len(data.end) == 0
+            and len(data.expired) == 0
+            and len(data.start) == 0
+            and node is not self._base_node
+        ):
+            if node is self._last_node:
+                self._last_node = None
+            self._live_usage.truncate(node.key)
+            self._tree.delete_node(node)
+
+    def _remove_start_event(self, job: Job):
+        node = self._start_nodes.pop(job)
         data: TimelineData = node.value
         data.start.remove(job)
         self._cleanup_node(node)
 
-    def _remove_expire_event(self, t: int, job: Job):
-        node = self._get_data(t)
+    def _remove_expire_event(self, job: Job):
+        node = self._expire_nodes.pop(job)
         data: TimelineData = node.value
         data.expired.remove(job)
         self._cleanup_node(node)
 
-    def _remove_end_event(self, t: int, job: Job):
-        node = self._get_data(t)
+    def _remove_end_event(self, job: Job):
+        node = self._end_nodes.pop(job)
         data: TimelineData = node.value
         data.end.remove(job)
         self._cleanup_node(node)
@@ -76,17 +466,21 @@ class Timeline(object):
         self._insert_start_event(job.start_time, job)
         self._insert_expire_event(job.deadline, job)
 
+        self._live_usage.truncate(job.start_time)
         for tl_node in self._tree.values(job.start_time, job.deadline):
             tl_node.resources -= job.resources
 
     def remove_job_reservation(self, job: Job):
-        self._remove_start_event(job.start_time, job)
-        self._remove_expire_event(job.deadline, job)
+        self._remove_start_event(job)
+        self._remove_expire_event(job)
 
+        self._live_usage.truncate(job.start_time)
         for tl_node in self._tree.values(job.start_time, job.deadline):
             tl_node.resources += job.resources
 
     def start_job_reservation(self, job: Job):
+        # Start events are never removed once a job is running:
+        self._start_nodes.pop(job, None)
         self._insert_end_event(job.end_time, job)
 
     def end_job_reservation(self, job: Job, new_end_time: int):
@@ -97,14 +491,17 @@ class Timeline(object):
         assert new_end_time <= prev_end_time
 
         if new_end_time < prev_end_time:
+            self._remove_end_event(job)
             self._insert_end_event(new_end_time, job)
-            self._remove_end_event(prev_end_time, job)
 
         if new_end_time < prev_deadline:
+            self._live_usage.truncate(new_end_time)
             for node_data in self._tree.values(new_end_time, prev_deadline):
                 node_data.resources += job.resources
 
-        self._remove_expire_event(prev_deadline, job)
+        # The end event is kept as history, but is never removed afterwards:
+        self._end_nodes.pop(job, None)
+        self._remove_expire_event(job)
 
     def iter_resources(
         self, start_time: int, end_time: Optional[int] = None, copy: bool = True
@@ -129,7 +526,9 @@ class Timeline(object):
 
         return all(
             rsc.all_geq(job.resources)
-            for _, rsc in self.iter_resources(start_time, start_time + job.timelimit)
+            for _, rsc in self.iter_resources(
+                start_time, start_time + job.timelimit, copy=False
+            )
         )
 
     def find_schedulable_time(
@@ -155,6 +554,175 @@ class Timeline(object):
         else:
             raise RuntimeError("could not find job scheduling time")
 
+    def find_earliest_start_times(
+        self, requests: Iterable[StartRequest], start_time: int
+    ) -> List[int]:
+        """Find the earliest time at or after `start_time` at which each of a
+        batch of `(resources, timelimit)` requests could start, without
+        reserving anything.
+
+        This gives the same results as calling `find_schedulable_time` for
+        each request in turn, but reads the timeline only once. Times must fit
+        in 64-bit integers.
+        """
+        requests = list(requests)
+        if len(self._tree) == 0:
+            return [start_time] * len(requests)
+
+        iter_start_key = self._tree.upper_bound(start_time + 1)
+        if iter_start_key is not None:
+            iter_start_key = iter_start_key[0]
+
+        times = self._tree.keys_array(iter_start_key, None, dtype=np.int64)
+        free = np.array(
+            [
+                data.resources.resources
+                for data in self._tree.values_list(iter_start_key, None)
+            ]
+        )
+        return earliest_start_times(times, free, start_time, requests)
+
+    def used_resource_time(self, start_time: int, end_time: int) -> np.ndarray:
+        """Get the total resource-time used over [start_time, end_time), for
+        each resource dimension.
+
+        Truncated history is included. Times after the current time of the
+        system that owns this timeline count the resources currently reserved
+        for them.
+        """
+        if end_time <= start_time:
+            return np.zeros_like(self._total_resources.resources)
+
+        ret = self._ledger.resource_time(end_time) - self._ledger.resource_time(
+            start_time
+        )
+        if self._ledger.end is not None:
+            start_time = max(start_time, self._ledger.end)
+        if len(self._tree) > 0 and end_time > start_time:
+            self._read_live_usage(end_time)
+            ret = ret + (
+                self._live_usage.resource_time(end_time)
+                - self._live_usage.resource_time(start_time)
+            )
+
+        # Use a fixed-size dtype again where the totals fit in one:
+        return np.array(ret.tolist())
+
+    def _read_live_usage(self, end_time: int):
+        # Read the resource usage over the events in the tree up to `end_time`
+        # into `_live_usage`, from where it was last read up to:
+        start_time = self._live_usage.end
+        if start_time is None:
+            start_time = self._tree.min()[0]
+        if start_time >= end_time:
+            return
+
+        resources = list(self.iter_resources(start_time, end_time, copy=False))
+        self._live_usage.append(
+            [t for t, _ in resources],
+            self._total_resources.resources
+            - np.array([rsc.resources for _, rsc in resources]).reshape(
+                len(resources), len(self._total_resources)
+            ),
+            end_time,
+        )
+
+    def fork(self, jobs: Dict[Job, Job]) -> Timeline:
+        """Create an independent copy of this timeline, replacing each job
+        found in `jobs` with its corresponding value.
+
+        The events are copied into a new ordered map in one pass.
+        """
+        ret = copy(self)
+        ret._tree = type(self._tree).from_sorted(
+            (t, data.fork(jobs)) for t, data in self._tree.items()
+        )
+
+        def node(old_node: TreeNode[int, TimelineData]) -> TreeNode[int, TimelineData]:
+            return ret._tree.get_or_insert_node(old_node.key)[1]
+
+        ret._start_nodes = {
+            jobs.get(j, j): node(n) for j, n in self._start_nodes.items()
+        }
+        ret._expire_nodes = {
+            jobs.get(j, j): node(n) for j, n in self._expire_nodes.items()
+        }
+        ret._end_nodes = {jobs.get(j, j): node(n) for j, n in self._end_nodes.items()}
+        ret._last_node = None
+        if self._base_node is not None:
+            ret._base_node = node(self._base_node)
+        ret._ledger = self._ledger.copy()
+        ret._live_usage = self._live_usage.copy()
+        return ret
+
+    def export_profile(self, start_time: Optional[int] = None) -> TimelineProfile:
+        """Export the events in this timeline as arrays, in one pass.
+
+        If `start_time` is given, events before the last one at or before that
+        time are left out, so only the part of the timeline from `start_time`
+        on is read.
+        """
+        iter_start_key = None
+        if start_time is not None:
+            iter_start_key = self._tree.upper_bound(start_time + 1)
+            if iter_start_key is not None:
+                iter_start_key = iter_start_key[0]
+
+        times = []
+        events = []
+        for t, data in self._tree.items(iter_start_key):
+            times.append(t)
+            events.append(data)
+
+        free = np.array(
+            [data.resources.resources for data in events],
+            dtype=self._total_resources.resources.dtype,
+        ).reshape(len(events), len(self._total_resources))
+        return export_events(times, events, free)
+
+    def truncate_history(self, t: int):
+        """Drop all events before time `t`, folding them into a single base
+        event at `t` that holds the resources available from then on.
+
+        `t` must not be after the current time of the system that owns this
+        timeline: events before then are only kept as history, and are never
+        looked up again by the system. The resources used over that history
+        are kept in a ledger, for `used_resource_time`.
+        """
+        if len(self._tree) == 0 or not (self._tree.min()[0] < t):
+            return
+
+        self._base_node = self._get_data(t)
+
+        start_key = self._tree.min()[0]
+        self._ledger.append(
+            self._tree.keys_array(start_key, t, dtype=object),
+            self._total_resources.resources
+            - np.array(
+                [
+                    data.resources.resources
+                    for data in self._tree.values_list(start_key, t)
+                ]
+            ),
+            t,
+        )
+        self._tree.delete_range(start_key, t)
+        if len(self._live_usage) > 0:
+            self._live_usage = UsageLedger(len(self._total_resources), object)
+
+        if self._last_node is not None and self._last_node.key < t:
+            self._last_node = None
+
+    def record_history(self, times: Sequence[int], used: Sequence, end: int):
+        """Record resource usage over time that was simulated without this
+        timeline, as if it had been truncated from history. The usage is given
+        as a profile up to `end` (see `profile_resource_time`).
+
+        The timeline must not hold any events.
+        """
+        assert len(self._tree) == 0
+        self._ledger.append(times, used, end)
+
     def iter(self, *args, **kwargs) -> Iterator[Tuple[int, TimelineData]]:
         return self._tree.items(*args, **kwargs)
 
@@ -162,36 +730,170 @@ class Timeline(object):
         return self._tree.lower_bound(after_time + 1)
 
 
+class SchedPolicy(ABC):
+    """Base class for stateful, event-driven scheduling policies.
+
+    Plain callables taking a `System` remain valid scheduling policies; this
+    class is an optional protocol for policies that want to keep their own
+    state across scheduling passes. Once attached to a `System` (either via
+    `System.attach_policy` or by being passed to `System.run_sched_loop`), the
+    system calls the `on_*` hooks below as the corresponding events happen.
+
+    Subclasses must implement `__call__`, which performs a scheduling pass just
+    like a plain callable policy would.
+    """
+
+    @abstractmethod
+    def __call__(self, system: System):
+        """Perform a scheduling pass on `system`."""
+
+    def on_attach(self, system: System):
+        """Called when this policy is attached to a system.
+
+        By default, this replays `on_enqueue` and `on_reserve` for all jobs
+        currently in the system's pending and reserved queues, so that policies
+        attached mid-simulation start out with consistent state.
+        """
+        for j in system.pending_jobs:
+            self.on_enqueue(system, j)
+
+        for j in system.reserved_jobs:
+            self.on_reserve(system, j)
+
+    def on_detach(self, system: System):
+        """Called when this policy is detached from a system."""
+
+    def on_enqueue(self, system: System, job: Job):
+        """Called after a job is pushed onto the pending job queue."""
+
+    def on_start(self, system: System, job: Job):
+        """Called after a job is started."""
+
+    def on_end(self, system: System, job: Job):
+        """Called after a running job ends."""
+
+    def on_reserve(self, system: System, job: Job):
+        """Called after a reservation is created for a pending job."""
+
+    def on_reserve_invalidated(self, system: System, job: Job):
+        """Called after a job's reservation is cleared.
+
+        The job will have been moved back onto the pending job queue.
+        """
+
+    def on_withdraw(self, system: System, job: Job):
+        """Called after a pending or reserved job is withdrawn from the system.
+
+        The job will already have been moved back into the `NEW` state.
+        """
+
+
 class System(object):
-    def __init__(self, resources: RscCompatible):
+    def __init__(
+        self,
+        resources: RscCompatible,
+        timeline_backend: Optional[TimelineBackend] = None,
+        expected_queue_depth: Optional[int] = None,
+        history_window: Optional[int] = 0,
+        timeline: Optional[Callable[[Resources], Any]] = None,
+    ):
+        """Create a new system with the given total resources.
+
+        `timeline_backend` (\"rb\" by default) and `expected_queue_depth`
+        select how the system's timeline stores its events; see `Timeline`.
+        Alternatively, `timeline` can be given to use another timeline type
+        (such as `DenseTimeline`): it is called with the system's total
+        resources to create the timeline, and can't be combined with
+        `timeline_backend` or `expected_queue_depth`.
+
+        As the simulation advances, timeline events more than `history_window`
+        timesteps in the past are compacted away, to keep the timeline from
+        growing with the total number of jobs. Set this to None to keep the
+        entire history (for instance, to display it).
+        """
+        if timeline is not None and (
+            timeline_backend is not None or expected_queue_depth is not None
+        ):
+            raise ValueError(
+                "timeline can't be given along with timeline_backend or "
+                "expected_queue_depth"
+            )
+
         self.total_resources: Resources = Resources(resources)
         self.cur_time: int = 0
+        self.history_window: Optional[int] = history_window
 
         self._jobs_enqueued: int = 0
         self._should_run_sched_loop: bool = False
 
         self.pending_jobs: Deque[Job] = deque()
-        self.finished_jobs: Deque[Job] = deque()
+        self.finished_jobs: JobHistory = JobHistory()
         self.reserved_jobs: List[Job] = []
-        self._timeline: Timeline = Timeline(self.total_resources)
+        self.running_jobs: Set[Job] = set()
+        if timeline is not None:
+            self._timeline = timeline(self.total_resources)
+        else:
+            if timeline_backend is None:
+                timeline_backend = "rb"
+            self._timeline: Timeline = Timeline(
+                self.total_resources, timeline_backend, expected_queue_depth
+            )
+        self._policy: Optional[SchedPolicy] = None
 
     @property
     def should_run_sched_loop(self) -> bool:
         return self._should_run_sched_loop
 
+    @property
+    def policy(self) -> Optional[SchedPolicy]:
+        """The stateful policy currently attached to this system, if any."""
+        return self._policy
+
+    def attach_policy(self, policy: SchedPolicy):
+        """Attach a stateful policy to this system, detaching any previously
+        attached policy.
+
+        The attached policy will receive event hooks, and will be used by
+        `run_sched_loop`, `tick` and `run` when they are not given a policy.
+        """
+        if self._policy is policy:
+            return
+
+        self.detach_policy()
+        self._policy = policy
+        policy.on_attach(self)
+
+    def detach_policy(self):
+        """Detach the currently attached stateful policy, if any."""
+        if self._policy is not None:
+            policy = self._policy
+            self._policy = None
+            policy.on_detach(self)
+
+    def _notify(self, hook: str, job: Job):
+        if self._policy is not None:
+            getattr(self._policy, hook)(self, job)
+
     def iter_timeline(self, *args, **kwargs) -> Iterator[Tuple[int, TimelineData]]:
         return self._timeline.iter(*args, **kwargs)
 
     def enqueue_job(self, job: Job):
-        """Push a `NEW` job onto the pending job queue."""
+        """Push a `NEW` job onto the pending job queue.
+
+        If the job's `submit_time` hasn't been set, it is set to the current
+        time.
+        """
         assert job.is_new
         if not self.total_resources.all_geq(job.resources):
             raise ValueError("Job resource requirements cannot be satisfied")
 
+        if job.submit_time is None:
+            job.submit_time = self.cur_time
         job.enqueued(self._jobs_enqueued)
         self._jobs_enqueued += 1
         self.pending_jobs.append(job)
         self._should_run_sched_loop = True
+        self._notify("on_enqueue", job)
 
     def _start_job(self, job: Job):
         """Start a `PENDING` or `RESERVED` job at the current system timestep.
@@ -210,11 +912,13 @@ class System(object):
             self.reserved_jobs.remove(job)
 
         job.start(self)
+        self.running_jobs.add(job)
         if not was_reserved:
             self._timeline.add_job_reservation(job)
         self._timeline.start_job_reservation(job)
 
         self._should_run_sched_loop = True
+        self._notify("on_start", job)
 
     def _end_job(self, job: Job):
         """End a `STARTED` job at the current system timestep.
@@ -228,8 +932,10 @@ class System(object):
 
         self._timeline.end_job_reservation(job, self.cur_time)
         job.end(self.cur_time)
+        self.running_jobs.remove(job)
         self.finished_jobs.append(job)
         self._should_run_sched_loop = True
+        self._notify("on_end", job)
 
     def _reserve_job(self, job: Job, t: int):
         """Insert a reservation for a `PENDING` job at the given timestep."""
@@ -239,6 +945,7 @@ class System(object):
         job.reserve(t)
         self._timeline.add_job_reservation(job)
         self.reserved_jobs.append(job)
+        self._notify("on_reserve", job)
 
     def unreserve_all_jobs(self):
         """Clear all job reservations.
@@ -254,12 +961,152 @@ class System(object):
             j.unreserve()
             self.pending_jobs.appendleft(j)
 
+        invalidated = self.reserved_jobs
         self.reserved_jobs = []
 
+        for j in reversed(invalidated):
+            self._notify("on_reserve_invalidated", j)
+
+    def withdraw_job(self, job: Job):
+        """Remove a `PENDING` or `RESERVED` job from this system, clearing its
+        reservation if it has one.
+
+        The job is moved back into the `NEW` state (keeping its
+        `submit_time`), so that it can be enqueued again, here or in another
+        system.
+        """
+        if job.is_reserved:
+            self._timeline.remove_job_reservation(job)
+            self.reserved_jobs.remove(job)
+        elif job.is_pending:
+            self.pending_jobs.remove(job)
+        else:
+            raise ValueError("Only pending or reserved jobs can be withdrawn")
+
+        job.withdraw()
+        self._should_run_sched_loop = True
+        self._notify("on_withdraw", job)
+
     def can_schedule(self, job: Job, start_time: int) -> bool:
         """Check whether a job can be started at a given time."""
         return self._timeline.can_schedule(job, start_time)
 
+    def used_resource_time(
+        self, start_time: int = 0, end_time: Optional[int] = None
+    ) -> np.ndarray:
+        """Get the total resource-time used over [start_time, end_time), for
+        each resource dimension.
+
+        `end_time` defaults to the current time. Times after the current time
+        count the resources that are currently reserved for them.
+        """
+        if end_time is None:
+            end_time = self.cur_time
+        return self._timeline.used_resource_time(start_time, end_time)
+
+    def free_resource_time(
+        self, start_time: int = 0, end_time: Optional[int] = None
+    ) -> np.ndarray:
+        """Get the total resource-time left free over [start_time, end_time),
+        for each resource dimension.
+
+        See `used_resource_time`.
+        """
+        if end_time is None:
+            end_time = self.cur_time
+        available = self.total_resources.resources * max(end_time - start_time, 0)
+        return available - self.used_resource_time(start_time, end_time)
+
+    def utilization(
+        self, start_time: int = 0, end_time: Optional[int] = None
+    ) -> np.ndarray:
+        """Get the average utilization of each resource dimension over
+        [start_time, end_time), as a fraction of the total resources.
+
+        See `used_resource_time`.
+        """
+        if end_time is None:
+            end_time = self.cur_time
+        if end_time <= start_time:
+            return np.zeros(len(self.total_resources))
+
+        available = self.total_resources.resources * (end_time - start_time)
+        return self.used_resource_time(start_time, end_time) / available
+
+    def fork(self) -> System:
+        """Create an independent copy of this system's current state, for
+        simulating ahead without affecting this system.
+
+        Jobs that haven't finished yet are shallow-copied, so the copies share
+        their resource requirements and any attributes added by subclasses;
+        finished jobs can no longer change, and are shared outright, along
+        with the history of finished jobs itself (see `JobHistory`). The
+        timeline is copied in one pass. The fork has no policy attached.
+        """
+        jobs = {
+            j: copy(j)
+            for j in chain(self.running_jobs, self.reserved_jobs, self.pending_jobs)
+        }
+
+        ret = copy(self)
+        ret.pending_jobs = deque(jobs[j] for j in self.pending_jobs)
+        ret.finished_jobs = self.finished_jobs.fork()
+        ret.reserved_jobs = [jobs[j] for j in self.reserved_jobs]
+        ret.running_jobs = {jobs[j] for j in self.running_jobs}
+        ret._timeline = self._timeline.fork(jobs)
+        ret._policy = None
+        return ret
+
+    def export_profile(self, start_time: Optional[int] = None) -> TimelineProfile:
+        """Export this system's timeline as arrays; see `TimelineProfile`. If
+        `start_time` is given, only the part of the timeline from then on is
+        exported.
+        """
+        return self._timeline.export_profile(start_time)
+
+    def export_jobs(self) -> JobTable:
+        """Export all jobs in this system, in order of job ID, as arrays; see
+        `JobTable`.
+        """
+        jobs = sorted(
+            chain(
+                self.finished_jobs,
+                self.running_jobs,
+                self.reserved_jobs,
+                self.pending_jobs,
+            ),
+            key=lambda j: j.job_id,
+        )
+
+        def times(attr: str) -> np.ndarray:
+            return np.array(
+                [-1 if getattr(j, attr) is None else getattr(j, attr) for j in jobs],
+                dtype=np.int64,
+            )
+
+        return JobTable(
+            np.array([j.job_id for j in jobs], dtype=np.int64),
+            np.array([j.state for j in jobs], dtype=np.int64),
+            times("start_time"),
+            times("end_time"),
+            times("deadline"),
+            np.array([j.timelimit for j in jobs], dtype=np.int64),
+            np.array([j.resources.resources for j in jobs]).reshape(
+                len(jobs), len(self.total_resources)
+            ),
+        )
+
+    def find_earliest_start_times(self, requests: Iterable[StartRequest]) -> List[int]:
+        """Find the earliest time at which each of a batch of
+        `(resources, timelimit)` requests could start, without reserving
+        anything.
+
+        For example, passing `(j.resources, j.timelimit)` for every pending job
+        `j` gives the time each job would be reserved for if it were scheduled
+        next.
+        """
+        return self._timeline.find_earliest_start_times(requests, self.cur_time)
+
     def start_or_reserve_job(self, job: Job, reserve: bool) -> int:
         """Try to start a job, optionally creating a reservation if not possible.
         
@@ -279,7 +1126,26 @@ class System(object):
         else:
             raise RuntimeError("Job was scheduled in the past?")
 
-    def run_sched_loop(self, sched_policy: Callable[[System], None]):
+    def _resolve_policy(
+        self, sched_policy: Optional[Callable[[System], None]]
+    ) -> Callable[[System], None]:
+        if sched_policy is None:
+            if self._policy is None:
+                raise ValueError("No scheduling policy given or attached")
+            return self._policy
+
+        if isinstance(sched_policy, SchedPolicy):
+            self.attach_policy(sched_policy)
+        return sched_policy
+
+    def run_sched_loop(self, sched_policy: Optional[Callable[[System], None]] = None):
+        """Run a scheduling pass, if any events have happened since the last
+        pass.
+
+        If `sched_policy` is a `SchedPolicy`, it will be attached to this system
+        first. If it is omitted, the currently attached policy is used.
+        """
+        sched_policy = self._resolve_policy(sched_policy)
         if self._should_run_sched_loop:
             sched_policy(self)
             self._should_run_sched_loop = False
@@ -303,10 +1169,41 @@ class System(object):
         for j in list(node.expired):
             self._end_job(j)
 
+        if self.history_window is not None:
+            self._timeline.truncate_history(self.cur_time - self.history_window)
+
         self._should_run_sched_loop = True
         return True
 
-    def tick(self, sched_policy: Callable[[System], None]):
+    def next_event_time(self) -> Optional[int]:
+        """Get the time of the next event after the current time, if any."""
+        event = self._timeline.next_event(self.cur_time)
+        return None if event is None else event[0]
+
+    def advance_to(
+        self, t: int, sched_policy: Optional[Callable[[System], None]] = None
+    ):
+        """Advance to time `t`, handling every event up to and including `t`
+        and running scheduling passes as necessary, just as `tick` does.
+
+        The current time is then set to `t` even if there was no event at that
+        time, so that jobs enqueued afterwards are scheduled from `t` on. This
+        allows a system to be driven by an external clock.
+        """
+        if t < self.cur_time:
+            raise ValueError("cannot advance to a time in the past")
+
+        self.run_sched_loop(sched_policy)
+        while True:
+            next_time = self.next_event_time()
+            if next_time is None or next_time > t:
+                break
+            self.handle_events()
+            self.run_sched_loop(sched_policy)
+
+        self.cur_time = t
+
+    def tick(self, sched_policy: Optional[Callable[[System], None]] = None):
         """Advance to the next timestep, handle job events, and run scheduler
         loop iterations as necessary.
         
@@ -318,6 +1215,18 @@ class System(object):
             self.run_sched_loop(sched_policy)
             return True
 
-    def run(self, sched_policy: Callable[[System], None]):
+    def run(self, sched_policy: Optional[Callable[[System], None]] = None):
+        """Run this system until there are no more events.
+
+        Systems running plain `fcfs` over one resource with all of their jobs
+        queued up front are simulated by a specialized engine instead, which
+        produces the same schedule; see `fastsim.run_fcfs`.
+        """
+        from .fastsim import can_run_fcfs, run_fcfs
+
+        if can_run_fcfs(self, sched_policy):
+            run_fcfs(self)
+            return
+
         while self.tick(sched_policy):
             pass
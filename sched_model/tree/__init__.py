@@ -1,4 +1,15 @@
+from .arraytree import ArrayRBTree
 from .avl import AVLTree
+from .base import Aggregate
+from .chunked import SortedChunkList
+from .persistent import PersistentTree
 from .rb import RBTree
 
-__all__ = ["AVLTree", "RBTree"]
+__all__ = [
+    "Aggregate",
+    "ArrayRBTree",
+    "AVLTree",
+    "PersistentTree",
+    "RBTree",
+    "SortedChunkList",
+]
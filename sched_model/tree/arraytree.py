@@ -0,0 +1,916 @@
+from __future__ import annotations
+
+from array import array
+from collections.abc import MutableMapping
+from typing import (
+    Any,
+    Generic,
+    TypeVar,
+    Optional,
+    Iterator,
+    Iterable,
+    List,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+# Index of the shared nil node. Its prev/next links thread back to the last and
+# first nodes in the tree, like a `SentinelNode`.
+NIL = 0
+
+# See `base._FINGER_STEPS`:
+_FINGER_STEPS = 4
+
+
+def _slots(typecode: Optional[str], n: int) -> Sequence:
+    # Storage for `n` keys or values: a typed array if a typecode is given,
+    # otherwise a list of objects:
+    if typecode is None:
+        return [None] * n
+    return array(typecode, bytes(n * array(typecode).itemsize))
+
+
+class ArrayNode(Generic[K, V]):
+    """A handle to a single node within an `ArrayRBTree`.
+
+    Handles stay valid (and keep referring to the same key) until their node is
+    deleted. The tree hands out at most one handle per node, so handles can be
+    compared by identity.
+    """
+
+    __slots__ = ("_tree", "_idx", "_key")
+
+    def __init__(self, tree: ArrayRBTree[K, V], idx: int):
+        self._tree: Optional[ArrayRBTree[K, V]] = tree
+        self._idx: int = idx
+        self._key: K = tree._keys[idx]
+
+    @property
+    def key(self) -> K:
+        """The key associated with this node.
+
+        This property is immutable.
+        """
+        return self._key
+
+    @property
+    def value(self) -> V:
+        return self._tree._vals[self._idx]
+
+    @value.setter
+    def value(self, val: V):
+        self._tree._vals[self._idx] = val
+
+    @property
+    def prev(self) -> Optional[ArrayNode[K, V]]:
+        """This node's predecessor in the tree, if any."""
+        idx = self._tree._prev[self._idx]
+        if idx != NIL:
+            return self._tree._handle(idx)
+
+    @property
+    def next(self) -> Optional[ArrayNode[K, V]]:
+        """This node's successor in the tree, if any."""
+        idx = self._tree._next[self._idx]
+        if idx != NIL:
+            return self._tree._handle(idx)
+
+
+class ArrayRBTree(Generic[K, V], MutableMapping):
+    """A red-black tree whose nodes are stored in parallel arrays.
+
+    Instead of one Python object per node, keys and values are kept in two
+    lists, and the parent, child and prev/next links of every node are kept as
+    integer indices in compact `array`s (with a bytearray for node colors).
+    Deleted slots are recycled through a free list, also kept in an array.
+    `copy()` snapshots the whole tree with a few array copies.
+
+    This takes about half the memory of `RBTree` per item: on 64-bit CPython,
+    around 70 bytes instead of 160, not counting the keys and values
+    themselves, most of it in the two lists and the spare capacity left by
+    growing. If keys or values are numbers that fit into an `array`, passing
+    its typecode as `key_typecode` or `value_typecode` stores them unboxed,
+    which also saves a Python object per key or value (28 bytes for an int):
+    with integer keys, that's around 70 bytes per item in total, against
+    about 100 for object keys and 190 for `RBTree`. Keys and values read
+    back from such trees are new objects each time.
+
+    This offers the same interface as `Tree` for lookups, node handles, bulk
+    construction, range iteration and `delete_range()`, but does not support
+    subtree aggregates, `select()`, `rank()`, `split()` or `join()`.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 16,
+        key_typecode: Optional[str] = None,
+        value_typecode: Optional[str] = None,
+    ):
+        capacity = max(capacity, 1) + 1
+        self._key_typecode: Optional[str] = key_typecode
+        self._value_typecode: Optional[str] = value_typecode
+        self._keys: Sequence[K] = _slots(key_typecode, capacity)
+        self._vals: Sequence[V] = _slots(value_typecode, capacity)
+        self._left = array("i", [NIL]) * capacity
+        self._right = array("i", [NIL]) * capacity
+        self._parent = array("i", [NIL]) * capacity
+        self._prev = array("i", [NIL]) * capacity
+        self._next = array("i", [NIL]) * capacity
+        self._red = bytearray(capacity)
+
+        # Handles handed out so far, by node index:
+        self._handles: List[Optional[ArrayNode[K, V]]] = [None] * capacity
+        # Unused node indices, excluding NIL:
+        self._free = array("i", range(capacity - 1, NIL, -1))
+
+        self._root: int = NIL
+        self._len: int = 0
+
+    def copy(self) -> ArrayRBTree[K, V]:
+        """Take a snapshot of this tree.
+
+        The tree structure is copied, but values are shared between both trees
+        (as with `dict.copy`). Handles from this tree are not valid for the
+        copy.
+        """
+        ret = self.__class__.__new__(self.__class__)
+        ret._key_typecode = self._key_typecode
+        ret._value_typecode = self._value_typecode
+        ret._keys = self._keys[:]
+        ret._vals = self._vals[:]
+        ret._left = self._left[:]
+        ret._right = self._right[:]
+        ret._parent = self._parent[:]
+        ret._prev = self._prev[:]
+        ret._next = self._next[:]
+        ret._red = self._red[:]
+        ret._handles = [None] * len(self._handles)
+        ret._free = self._free[:]
+        ret._root = self._root
+        ret._len = self._len
+        return ret
+
+    def __copy__(self) -> ArrayRBTree[K, V]:
+        return self.copy()
+
+    def _grow(self):
+        old_capacity = len(self._keys)
+        extra = old_capacity
+        self._keys.extend(_slots(self._key_typecode, extra))
+        self._vals.extend(_slots(self._value_typecode, extra))
+        self._handles.extend([None] * extra)
+        # Extend all arrays in place, so that local references to them in
+        # other methods stay valid:
+        nils = array("i", [NIL]) * extra
+        for links in (self._left, self._right, self._parent, self._prev, self._next):
+            links.extend(nils)
+        self._red.extend(bytes(extra))
+        self._free.extend(range(old_capacity + extra - 1, old_capacity - 1, -1))
+
+    def _alloc(self, key: K) -> int:
+        if len(self._free) == 0:
+            self._grow()
+        idx = self._free.pop()
+        self._keys[idx] = key
+        return idx
+
+    def _release(self, idx: int):
+        handle = self._handles[idx]
+        if handle is not None:
+            handle._tree = None
+            handle._idx = NIL
+            self._handles[idx] = None
+
+        self._keys[idx] = self._keys[NIL]
+        self._vals[idx] = self._vals[NIL]
+        self._left[idx] = NIL
+        self._right[idx] = NIL
+        self._parent[idx] = NIL
+        self._prev[idx] = NIL
+        self._next[idx] = NIL
+        self._red[idx] = 0
+        self._free.append(idx)
+
+    def _handle(self, idx: int) -> ArrayNode[K, V]:
+        handle = self._handles[idx]
+        if handle is None:
+            handle = ArrayNode(self, idx)
+            self._handles[idx] = handle
+        return handle
+
+    def _index_of(self, node: ArrayNode[K, V], what: str) -> int:
+        if node._tree is not self:
+            raise ValueError(what + " does not belong to this tree")
+        return node._idx
+
+    # Red-black tree primitives. These follow the CLRS formulation, using NIL
+    # as a shared sentinel leaf whose parent link may be written during
+    # deletion.
+
+    def _rotate_left(self, x: int):
+        left = self._left
+        right = self._right
+        parent = self._parent
+
+        y = right[x]
+        right[x] = left[y]
+        if left[y] != NIL:
+            parent[left[y]] = x
+
+        p = parent[x]
+        parent[y] = p
+        if p == NIL:
+            self._root = y
+        elif left[p] == x:
+            left[p] = y
+        else:
+            right[p] = y
+
+        left[y] = x
+        parent[x] = y
+
+    def _rotate_right(self, x: int):
+        left = self._left
+        right = self._right
+        parent = self._parent
+
+        y = left[x]
+        left[x] = right[y]
+        if right[y] != NIL:
+            parent[right[y]] = x
+
+        p = parent[x]
+        parent[y] = p
+        if p == NIL:
+            self._root = y
+        elif right[p] == x:
+            right[p] = y
+        else:
+            left[p] = y
+
+        right[y] = x
+        parent[x] = y
+
+    def _repair_insert(self, z: int):
+        left = self._left
+        parent = self._parent
+        red = self._red
+
+        while red[parent[z]]:
+            p = parent[z]
+            gp = parent[p]
+            if p == left[gp]:
+                uncle = self._right[gp]
+                if red[uncle]:
+                    red[p] = 0
+                    red[uncle] = 0
+                    red[gp] = 1
+                    z = gp
+                    continue
+                if z == self._right[p]:
+                    z = p
+                    self._rotate_left(z)
+                    p = parent[z]
+                red[p] = 0
+                red[gp] = 1
+                self._rotate_right(gp)
+            else:
+                uncle = left[gp]
+                if red[uncle]:
+                    red[p] = 0
+                    red[uncle] = 0
+                    red[gp] = 1
+                    z = gp
+                    continue
+                if z == left[p]:
+                    z = p
+                    self._rotate_right(z)
+                    p = parent[z]
+                red[p] = 0
+                red[gp] = 1
+                self._rotate_left(gp)
+
+        red[self._root] = 0
+
+    def _transplant(self, u: int, v: int):
+        p = self._parent[u]
+        if p == NIL:
+            self._root = v
+        elif u == self._left[p]:
+            self._left[p] = v
+        else:
+            self._right[p] = v
+        self._parent[v] = p
+
+    def _repair_delete(self, x: int):
+        left = self._left
+        right = self._right
+        parent = self._parent
+        red = self._red
+
+        while x != self._root and not red[x]:
+            p = parent[x]
+            if x == left[p]:
+                w = right[p]
+                if red[w]:
+                    red[w] = 0
+                    red[p] = 1
+                    self._rotate_left(p)
+                    w = right[p]
+                if not red[left[w]] and not red[right[w]]:
+                    red[w] = 1
+                    x = p
+                else:
+                    if not red[right[w]]:
+                        red[left[w]] = 0
+                        red[w] = 1
+                        self._rotate_right(w)
+                        w = right[p]
+                    red[w] = red[p]
+                    red[p] = 0
+                    red[right[w]] = 0
+                    self._rotate_left(p)
+                    x = self._root
+            else:
+                w = left[p]
+                if red[w]:
+                    red[w] = 0
+                    red[p] = 1
+                    self._rotate_right(p)
+                    w = left[p]
+                if not red[right[w]] and not red[left[w]]:
+                    red[w] = 1
+                    x = p
+                else:
+                    if not red[left[w]]:
+                        red[right[w]] = 0
+                        red[w] = 1
+                        self._rotate_left(w)
+                        w = left[p]
+                    red[w] = red[p]
+                    red[p] = 0
+                    red[left[w]] = 0
+                    self._rotate_right(p)
+                    x = self._root
+
+        red[x] = 0
+
+    def _delete_index(self, z: int):
+        """Remove node `z` from the tree.
+
+        Like `RBTree`, this relinks the successor node into z's position
+        instead of moving its key and value, so other node indices (and
+        handles) stay valid.
+        """
+        left = self._left
+        right = self._right
+        parent = self._parent
+        red = self._red
+
+        y_was_red = red[z]
+        if left[z] == NIL:
+            x = right[z]
+            self._transplant(z, x)
+        elif right[z] == NIL:
+            x = left[z]
+            self._transplant(z, x)
+        else:
+            y = self._next[z]
+            y_was_red = red[y]
+            x = right[y]
+            if parent[y] == z:
+                parent[x] = y
+            else:
+                self._transplant(y, x)
+                right[y] = right[z]
+                parent[right[y]] = y
+            self._transplant(z, y)
+            left[y] = left[z]
+            parent[left[y]] = y
+            red[y] = red[z]
+
+        if not y_was_red:
+            self._repair_delete(x)
+        parent[NIL] = NIL
+
+        p = self._prev[z]
+        n = self._next[z]
+        self._next[p] = n
+        self._prev[n] = p
+
+        self._release(z)
+        self._len -= 1
+
+    def _finger(self, h: int, key: K) -> int:
+        """Find a node to start searching for `key` from, near node `h`, or
+        the root if `key` isn't within a few nodes of it.
+
+        See `TreeNode._finger`.
+        """
+        keys = self._keys
+        node = h
+        if key > keys[node]:
+            for _ in range(_FINGER_STEPS):
+                n = self._next[node]
+                if n == NIL or key < keys[n]:
+                    return node if self._right[node] == NIL else n
+                elif key == keys[n]:
+                    return n
+                node = n
+            return self._root
+        elif key < keys[node]:
+            for _ in range(_FINGER_STEPS):
+                p = self._prev[node]
+                if p == NIL or key > keys[p]:
+                    return node if self._left[node] == NIL else p
+                elif key == keys[p]:
+                    return p
+                node = p
+            return self._root
+        return node
+
+    def _search_start(self, key: K, hint: Optional[ArrayNode[K, V]]) -> int:
+        if hint is None:
+            return self._root
+        return self._finger(self._index_of(hint, "hint node"), key)
+
+    def _find_index(self, key: K) -> int:
+        keys = self._keys
+        x = self._root
+        while x != NIL:
+            x_key = keys[x]
+            if key == x_key:
+                return x
+            elif key < x_key:
+                x = self._left[x]
+            else:
+                x = self._right[x]
+        return NIL
+
+    def _lower_index(self, bound: K, start: int) -> int:
+        """Find the index of the least key greater than or equal to `bound`,
+        searching from node `start`. Returns NIL if there is no such key.
+        """
+        keys = self._keys
+        x = start
+        while True:
+            x_key = keys[x]
+            if bound == x_key:
+                return x
+            elif bound < x_key:
+                if self._left[x] == NIL:
+                    return x
+                x = self._left[x]
+            else:
+                if self._right[x] == NIL:
+                    return self._next[x]
+                x = self._right[x]
+
+    def _upper_index(self, bound: K, start: int) -> int:
+        """Find the index of the greatest key strictly less than `bound`,
+        searching from node `start`. Returns NIL if there is no such key.
+        """
+        keys = self._keys
+        x = start
+        while True:
+            if bound <= keys[x]:
+                if self._left[x] == NIL:
+                    return self._prev[x]
+                x = self._left[x]
+            else:
+                if self._right[x] == NIL:
+                    return x
+                x = self._right[x]
+
+    def get_node(self, key: K) -> ArrayNode[K, V]:
+        """Directly retrieve a node within this tree.
+
+        Raises KeyError if the tree does not contain the given key.
+        """
+        idx = self._find_index(key)
+        if idx == NIL:
+            raise KeyError(key)
+        return self._handle(idx)
+
+    def _insert_index(self, key: K, start: int) -> Tuple[bool, int]:
+        keys = self._keys
+        if self._root == NIL:
+            z = self._alloc(key)
+            self._root = z
+            self._prev[z] = NIL
+            self._next[z] = NIL
+            self._next[NIL] = z
+            self._prev[NIL] = z
+            self._len = 1
+            return (True, z)
+
+        x = start
+        while True:
+            x_key = keys[x]
+            if key == x_key:
+                return (False, x)
+            elif key < x_key:
+                if self._left[x] == NIL:
+                    break
+                x = self._left[x]
+            else:
+                if self._right[x] == NIL:
+                    break
+                x = self._right[x]
+
+        z = self._alloc(key)
+        if key < keys[x]:
+            self._left[x] = z
+            p = self._prev[x]
+            n = x
+        else:
+            self._right[x] = z
+            p = x
+            n = self._next[x]
+
+        self._parent[z] = x
+        self._prev[z] = p
+        self._next[z] = n
+        self._next[p] = z
+        self._prev[n] = z
+        self._red[z] = 1
+        self._len += 1
+
+        self._repair_insert(z)
+        return (True, z)
+
+    def get_or_insert_node(
+        self, key: K, hint: Optional[ArrayNode[K, V]] = None
+    ) -> Tuple[bool, ArrayNode[K, V]]:
+        """Retrieve a node within this tree, inserting a new node if one does
+        not exist for the given key.
+
+        If `hint` is given, it should be a node in this tree close to `key`;
+        the search will start from there instead of from the root.
+
+        Returns a tuple containing:
+            - Whether a new node was inserted or not
+            - The (possibly newly-inserted) node for the given key
+        """
+        created, idx = self._insert_index(key, self._search_start(key, hint))
+        return (created, self._handle(idx))
+
+    def insert(self, key: K, val: V) -> Optional[V]:
+        _, idx = self._insert_index(key, self._root)
+        old_val = self._vals[idx]
+        self._vals[idx] = val
+        return old_val
+
+    def delete_node(self, node: ArrayNode[K, V]):
+        """Remove a node from this tree, given a handle to it.
+
+        Handles to all other nodes in the tree stay valid. Raises ValueError
+        if the node does not belong to this tree (including if it has already
+        been removed from its tree).
+        """
+        self._delete_index(self._index_of(node, "node"))
+
+    def delete_range(self, lo: K, hi: K) -> int:
+        """Remove all items with keys in the range [lo, hi).
+
+        This runs in O(k log n) time, where k is the number of removed items.
+        Returns the number of items removed.
+        """
+        if self._root == NIL or not (lo < hi):
+            return 0
+
+        n_removed = 0
+        idx = self._lower_index(lo, self._root)
+        while idx != NIL and self._keys[idx] < hi:
+            next_idx = self._next[idx]
+            self._delete_index(idx)
+            idx = next_idx
+            n_removed += 1
+        return n_removed
+
+    @classmethod
+    def from_sorted(cls, items: Iterable[Tuple[K, V]], **kwargs) -> ArrayRBTree[K, V]:
+        """Build a new tree from items with strictly increasing keys.
+
+        Any keyword arguments are passed to the tree constructor. This runs in
+        O(n) time.
+        """
+        items = list(items)
+        tree = cls(**kwargs)
+        while len(tree._free) < len(items):
+            tree._grow()
+
+        indices = []
+        for k, v in items:
+            if len(indices) > 0 and not (tree._keys[indices[-1]] < k):
+                raise ValueError("keys must be strictly increasing")
+            idx = tree._alloc(k)
+            tree._vals[idx] = v
+            indices.append(idx)
+
+        tree._build(indices)
+        return tree
+
+    def insert_many(self, items: Iterable[Tuple[K, V]]):
+        """Insert a batch of items with strictly increasing keys.
+
+        Existing keys have their values replaced, as with `insert`. Small
+        batches are inserted one at a time, with each search starting from
+        the previously-inserted node; large batches are merged with the
+        existing items and the tree is rebuilt in O(n) time. Handles to
+        existing nodes remain valid either way.
+        """
+        items = list(items)
+        for i in range(1, len(items)):
+            if not (items[i - 1][0] < items[i][0]):
+                raise ValueError("keys must be strictly increasing")
+
+        if len(items) == 0:
+            return
+        elif len(items) * 8 < len(self):
+            idx = self._root
+            for k, v in items:
+                _, idx = self._insert_index(k, self._finger(idx, k))
+                self._vals[idx] = v
+            return
+
+        merged = []
+        idx = self._next[NIL]
+        for k, v in items:
+            while idx != NIL and self._keys[idx] < k:
+                merged.append(idx)
+                idx = self._next[idx]
+
+            if idx != NIL and self._keys[idx] == k:
+                self._vals[idx] = v
+                merged.append(idx)
+                idx = self._next[idx]
+            else:
+                new_idx = self._alloc(k)
+                self._vals[new_idx] = v
+                merged.append(new_idx)
+
+        while idx != NIL:
+            merged.append(idx)
+            idx = self._next[idx]
+
+        self._build(merged)
+
+    def _build(self, indices: List[int]):
+        """Rebuild this tree as a perfectly balanced tree containing exactly
+        the given nodes, which must be in key order.
+        """
+        prev = NIL
+        for idx in indices:
+            self._prev[idx] = prev
+            self._next[prev] = idx
+            prev = idx
+        self._next[prev] = NIL
+        self._prev[NIL] = prev
+
+        # All nodes shallower than max_depth will have two children, so
+        # coloring only the deepest level red balances black heights:
+        max_depth = len(indices).bit_length() - 1
+        self._root = self._build_subtree(indices, 0, len(indices), 0, max_depth)
+        self._parent[self._root] = NIL
+        self._len = len(indices)
+
+    def _build_subtree(
+        self, indices: List[int], lo: int, hi: int, depth: int, max_depth: int
+    ) -> int:
+        if lo >= hi:
+            return NIL
+
+        mid = (lo + hi) // 2
+        idx = indices[mid]
+        left = self._build_subtree(indices, lo, mid, depth + 1, max_depth)
+        right = self._build_subtree(indices, mid + 1, hi, depth + 1, max_depth)
+
+        self._left[idx] = left
+        self._right[idx] = right
+        if left != NIL:
+            self._parent[left] = idx
+        if right != NIL:
+            self._parent[right] = idx
+        self._red[idx] = 1 if (depth == max_depth and depth > 0) else 0
+        return idx
+
+    def _first_index(self) -> int:
+        idx = self._next[NIL]
+        if idx == NIL:
+            raise IndexError("Tree is empty")
+        return idx
+
+    def _last_index(self) -> int:
+        idx = self._prev[NIL]
+        if idx == NIL:
+            raise IndexError("Tree is empty")
+        return idx
+
+    def min(self) -> Tuple[K, V]:
+        idx = self._first_index()
+        return (self._keys[idx], self._vals[idx])
+
+    def max(self) -> Tuple[K, V]:
+        idx = self._last_index()
+        return (self._keys[idx], self._vals[idx])
+
+    def pop_min(self) -> Tuple[K, V]:
+        idx = self._first_index()
+        r = (self._keys[idx], self._vals[idx])
+        self._delete_index(idx)
+        return r
+
+    def pop_max(self) -> Tuple[K, V]:
+        idx = self._last_index()
+        r = (self._keys[idx], self._vals[idx])
+        self._delete_index(idx)
+        return r
+
+    def pop(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        idx = self._find_index(key)
+        if idx != NIL:
+            val = self._vals[idx]
+            self._delete_index(idx)
+            return val
+
+        if default is not None:
+            return default
+        raise KeyError(key)
+
+    def upper_bound(
+        self, bound: K, hint: Optional[ArrayNode[K, V]] = None
+    ) -> Optional[Tuple[K, V]]:
+        """Find the item with the greatest key strictly less than `bound`.
+
+        If `hint` is given, the search will start from that node.
+        """
+        if self._root == NIL:
+            return None
+
+        idx = self._upper_index(bound, self._search_start(bound, hint))
+        if idx == NIL:
+            return None
+        return (self._keys[idx], self._vals[idx])
+
+    def lower_bound(
+        self, bound: K, hint: Optional[ArrayNode[K, V]] = None
+    ) -> Optional[Tuple[K, V]]:
+        """Find the item with the least key greater than or equal to `bound`.
+
+        If `hint` is given, the search will start from that node.
+        """
+        if self._root == NIL:
+            return None
+
+        idx = self._lower_index(bound, self._search_start(bound, hint))
+        if idx == NIL:
+            return None
+        return (self._keys[idx], self._vals[idx])
+
+    def _iter_indices(
+        self, left_bound: Optional[K], right_bound: Optional[K], reverse: bool
+    ) -> Iterator[int]:
+        if (
+            left_bound is not None
+            and right_bound is not None
+            and (left_bound > right_bound)
+        ):
+            left_bound, right_bound = right_bound, left_bound
+
+        if self._root == NIL:
+            return
+
+        if left_bound is not None:
+            first = self._lower_index(left_bound, self._root)
+        else:
+            first = self._next[NIL]
+
+        if right_bound is not None:
+            last = self._upper_index(right_bound, self._root)
+        else:
+            last = self._prev[NIL]
+
+        if first == NIL or last == NIL or self._keys[last] < self._keys[first]:
+            return
+
+        if reverse:
+            first, last = last, first
+            links = self._prev
+        else:
+            links = self._next
+
+        idx = first
+        while idx != last:
+            yield idx
+            idx = links[idx]
+        yield last
+
+    def items(
+        self,
+        left_bound: Optional[K] = None,
+        right_bound: Optional[K] = None,
+        reverse: bool = False,
+    ) -> Iterator[Tuple[K, V]]:
+        keys = self._keys
+        vals = self._vals
+        for idx in self._iter_indices(left_bound, right_bound, reverse):
+            yield (keys[idx], vals[idx])
+
+    def keys(
+        self,
+        left_bound: Optional[K] = None,
+        right_bound: Optional[K] = None,
+        reverse: bool = False,
+    ) -> Iterator[K]:
+        keys = self._keys
+        for idx in self._iter_indices(left_bound, right_bound, reverse):
+            yield keys[idx]
+
+    def values(
+        self,
+        left_bound: Optional[K] = None,
+        right_bound: Optional[K] = None,
+        reverse: bool = False,
+    ) -> Iterator[V]:
+        vals = self._vals
+        for idx in self._iter_indices(left_bound, right_bound, reverse):
+            yield vals[idx]
+
+    def keys_list(
+        self, left_bound: Optional[K] = None, right_bound: Optional[K] = None
+    ) -> List[K]:
+        """Retrieve all keys in the range [left_bound, right_bound) as a list."""
+        keys = self._keys
+        return [keys[idx] for idx in self._iter_indices(left_bound, right_bound, False)]
+
+    def values_list(
+        self, left_bound: Optional[K] = None, right_bound: Optional[K] = None
+    ) -> List[V]:
+        """Retrieve all values with keys in the range [left_bound, right_bound)
+        as a list.
+        """
+        vals = self._vals
+        return [vals[idx] for idx in self._iter_indices(left_bound, right_bound, False)]
+
+    def keys_array(
+        self,
+        left_bound: Optional[K] = None,
+        right_bound: Optional[K] = None,
+        dtype: Any = None,
+    ) -> np.ndarray:
+        """Retrieve all keys in the range [left_bound, right_bound) as a numpy
+        array, for vectorized processing.
+        """
+        return np.array(self.keys_list(left_bound, right_bound), dtype=dtype)
+
+    def _print_recursive(self, idx: int, level: int) -> str:
+        ret = ""
+        if self._left[idx] != NIL:
+            ret = self._print_recursive(self._left[idx], level + 1)
+
+        color = "R" if self._red[idx] else "B"
+        ret += ("    " * level) + "{} ({})\n".format(str(self._keys[idx]), color)
+
+        if self._right[idx] != NIL:
+            ret += self._print_recursive(self._right[idx], level + 1)
+
+        return ret
+
+    def print(self) -> str:
+        if self._root != NIL:
+            return self._print_recursive(self._root, 0)
+        else:
+            return "<empty tree>"
+
+    def __getitem__(self, key: K) -> V:
+        idx = self._find_index(key)
+        if idx == NIL:
+            raise KeyError(key)
+        return self._vals[idx]
+
+    def __setitem__(self, key: K, val: V):
+        self.insert(key, val)
+
+    def __delitem__(self, key: K):
+        idx = self._find_index(key)
+        if idx == NIL:
+            raise KeyError(key)
+        self._delete_index(idx)
+
+    def __contains__(self, key: K) -> bool:
+        return self._find_index(key) != NIL
+
+    def __iter__(self) -> Iterator[K]:
+        return self.keys()
+
+    def __reversed__(self) -> Iterator[K]:
+        return self.keys(reverse=True)
+
+    def __len__(self) -> int:
+        return self._len
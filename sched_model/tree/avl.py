@@ -1,16 +1,106 @@
 from __future__ import annotations
 
-from typing import TypeVar
+from typing import Any, TypeVar, Optional, Tuple
 
-from .base import Tree, TreeNode
+from .base import Aggregate, Tree, TreeNode
 
 K = TypeVar("K")
 V = TypeVar("V")
 
 
 class AVLTree(Tree):
-    def __init__(self):
-        super().__init__(AVLNode)
+    def __init__(
+        self,
+        aggregate: Optional[Aggregate[K, V, Any]] = None,
+        order_stats: bool = False,
+    ):
+        super().__init__(AVLNode, aggregate, order_stats)
+
+    # For AVL trees, the rank of a subtree is simply its height.
+
+    def _rank(self, node: Optional[AVLNode[K, V]]) -> int:
+        rank = 0
+        while node is not None:
+            rank += 1
+            if node._balance <= 0:
+                node = node._left
+            else:
+                node = node._right
+        return rank
+
+    def _child_rank(self, node: AVLNode[K, V], rank: int, left: bool) -> int:
+        if (left and node._balance <= 0) or ((not left) and node._balance >= 0):
+            return rank - 1
+        return rank - 2
+
+    def _init_built_node(
+        self,
+        node: AVLNode[K, V],
+        depth: int,
+        max_depth: int,
+        left_height: int,
+        right_height: int,
+    ):
+        node._balance = right_height - left_height
+
+    def _join3(
+        self,
+        left: Optional[AVLNode[K, V]],
+        left_rank: int,
+        mid: AVLNode[K, V],
+        right: Optional[AVLNode[K, V]],
+        right_rank: int,
+    ) -> Tuple[AVLNode[K, V], int]:
+        if abs(left_rank - right_rank) <= 1:
+            mid._balance = right_rank - left_rank
+            mid._set_left_child(left)
+            mid._set_right_child(right)
+            if mid._aug is not None:
+                mid._refresh()
+            return (mid, max(left_rank, right_rank) + 1)
+
+        # Attach the middle node to the taller tree, in place of the first node
+        # along its inner spine that is at most one level taller than the
+        # shorter tree. This grows that subtree's height by exactly one, which
+        # is then retraced just like an insertion:
+        if left_rank > right_rank:
+            root = left
+            parent = None
+            cur = left
+            cur_rank = left_rank
+            while cur_rank > right_rank + 1:
+                next_rank = self._child_rank(cur, cur_rank, False)
+                parent = cur
+                cur = cur._right
+                cur_rank = next_rank
+
+            mid._balance = right_rank - cur_rank
+            mid._set_left_child(cur)
+            mid._set_right_child(right)
+            parent._set_right_child(mid)
+        else:
+            root = right
+            parent = None
+            cur = right
+            cur_rank = right_rank
+            while cur_rank > left_rank + 1:
+                next_rank = self._child_rank(cur, cur_rank, True)
+                parent = cur
+                cur = cur._left
+                cur_rank = next_rank
+
+            mid._balance = cur_rank - left_rank
+            mid._set_left_child(left)
+            mid._set_right_child(cur)
+            parent._set_left_child(mid)
+
+        if mid._aug is not None:
+            mid._refresh_path()
+        grew = mid._repair_insert()
+        while root._parent is not None:
+            root = root._parent
+
+        return (root, max(left_rank, right_rank) + (1 if grew else 0))
 
 
 class AVLNode(TreeNode):
@@ -61,9 +151,13 @@ class AVLNode(TreeNode):
         child._rotate()
         return child
 
-    def _repair_insert(self):
+    def _repair_insert(self) -> bool:
+        """Retrace upwards after the height of this subtree increased by one.
+
+        Returns whether the height of the whole tree increased.
+        """
         if self._parent is None:
-            return
+            return True
 
         parent: AVLNode[K, V] = self._parent
         old_bal = parent._balance
@@ -72,19 +166,22 @@ class AVLNode(TreeNode):
             parent._balance -= 1
             if old_bal < 0:
                 parent._rebalance()
-                return
+                return False
             elif old_bal > 0:
-                return
+                return False
         else:
             parent._balance += 1
             if old_bal > 0:
                 parent._rebalance()
-                return
+                return False
             elif old_bal < 0:
-                return
+                return False
 
         return parent._repair_insert()
 
+    def _swap_balance(self, other: AVLNode[K, V]):
+        self._balance, other._balance = other._balance, self._balance
+
     def _repair_delete(self):
         parent: AVLNode[K, V] = self._parent
         if parent is None:
@@ -1,12 +1,75 @@
 from __future__ import annotations
 
 from collections.abc import MutableMapping
-from typing import Generic, TypeVar, Optional, Iterator, Tuple, Union, Type
+import copy
+import numpy as np
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    TypeVar,
+    Optional,
+    Iterator,
+    Iterable,
+    List,
+    Tuple,
+    Union,
+    Type,
+)
 
 from .iter import SentinelNode, TreeIter
 
 K = TypeVar("K")
 V = TypeVar("V")
+A = TypeVar("A")
+
+
+class Aggregate(Generic[K, V, A]):
+    """A monoid over some projection of tree items.
+
+    Trees constructed with an `Aggregate` keep the aggregate of every subtree
+    up to date, which allows aggregating over any key range in O(log n) time
+    (see `Tree.aggregate`).
+
+    `project` maps a key and value to an aggregate value, and `combine` must be
+    an associative operation on aggregate values with `identity` as its
+    identity element. Nodes whose value is None (such as freshly-inserted nodes
+    returned by `Tree.get_or_insert_node`) contribute `identity`.
+    """
+
+    def __init__(
+        self,
+        project: Optional[Callable[[K, V], A]],
+        combine: Optional[Callable[[A, A], A]],
+        identity: A,
+    ):
+        self.project = project
+        self.combine = combine
+        self.identity = identity
+
+    @classmethod
+    def sum(cls, project: Callable[[K, V], A], identity: A = 0) -> Aggregate[K, V, A]:
+        return cls(project, lambda a, b: a + b, identity)
+
+    @classmethod
+    def min(
+        cls, project: Callable[[K, V], A], identity: A = float("inf")
+    ) -> Aggregate[K, V, A]:
+        return cls(project, min, identity)
+
+    @classmethod
+    def max(
+        cls, project: Callable[[K, V], A], identity: A = float("-inf")
+    ) -> Aggregate[K, V, A]:
+        return cls(project, max, identity)
+
+
+# Number of neighbors of a hint node that hinted searches look through before
+# falling back to searching from the root:
+_FINGER_STEPS = 4
+
+# Used by trees that only maintain subtree sizes:
+_ORDER_STATS: Aggregate = Aggregate(None, None, None)
 
 
 class TreeNode(Generic[K, V]):
@@ -28,7 +91,16 @@ class TreeNode(Generic[K, V]):
         self._right: Optional[self_cls[K, V]] = None
         self._prev: Union[None, SentinelNode, self_cls[K, V]] = prev
         self._next: Union[None, SentinelNode, self_cls[K, V]] = next
-        self._tree: Tree[K, V] = tree
+
+        # Only guaranteed to be up to date on the root node: keeping this
+        # current on every node would make split() and join() linear-time.
+        self._tree: Optional[Tree[K, V]] = tree
+
+        # Subtree augmentation, if the tree maintains it:
+        self._aug: Optional[Aggregate] = tree._aug
+        if self._aug is not None:
+            self._size: int = 1
+            self._agg: Any = self._aug.identity
 
         prev._next = self
         next._prev = self
@@ -65,16 +137,19 @@ class TreeNode(Generic[K, V]):
         if child is not None:
             child._parent = self
 
+    def _owner(self) -> Optional[Tree[K, V]]:
+        """Find the tree containing this node, if any, in O(log n) time."""
+        node = self
+        while node._parent is not None:
+            node = node._parent
+        return node._tree
+
     def _is_left_child(self) -> bool:
         return (self._parent is not None) and (self._parent._left == self)
 
     def _is_right_child(self) -> bool:
         return (self._parent is not None) and (self._parent._right == self)
 
-    def _copy_data(self, other: TreeNode[K, V]):
-        self._key = other._key
-        self.value = other.value
-
     def _sibling(self) -> TreeNode[K, V]:
         parent = self._parent
         if parent is None:
@@ -105,11 +180,102 @@ class TreeNode(Generic[K, V]):
                 gp._set_right_child(self)
         else:
             self._parent = None
-            self._tree._root = self
+            self._tree = parent._tree
+            if self._tree is not None:
+                self._tree._root = self
+
+        if self._aug is not None:
+            parent._refresh()
+            self._refresh()
+
+    def _own_aggregate(self) -> Any:
+        if self.value is None:
+            return self._aug.identity
+        return self._aug.project(self._key, self.value)
+
+    def _refresh(self):
+        """Recompute this node's subtree augmentation from its children."""
+        aug = self._aug
+        left = self._left
+        right = self._right
+        size = 1
+
+        if aug.project is not None:
+            agg = self._own_aggregate()
+            if left is not None:
+                size += left._size
+                agg = aug.combine(left._agg, agg)
+            if right is not None:
+                size += right._size
+                agg = aug.combine(agg, right._agg)
+            self._agg = agg
+        else:
+            if left is not None:
+                size += left._size
+            if right is not None:
+                size += right._size
+
+        self._size = size
+
+    def _refresh_path(self):
+        """Recompute subtree augmentation from this node up to the root.
+
+        Callers must check that the tree is augmented first.
+        """
+        node = self
+        while node is not None:
+            node._refresh()
+            node = node._parent
+
+    def _swap_with_successor(self):
+        """Exchange the positions of this node and its in-order successor
+        within the tree structure.
+
+        Keys and values stay attached to their nodes, so outside references to
+        either node remain valid. This node must have two children; afterwards
+        it will have at most one (right) child.
+        """
+        succ: TreeNode[K, V] = self._next
+        parent: Optional[TreeNode[K, V]] = self._parent
+        was_left = self._is_left_child()
+        left = self._left
+        right = self._right
+        succ_right = succ._right
+
+        if succ is right:
+            self._set_right_child(succ_right)
+            succ._set_right_child(self)
+        else:
+            succ._parent._set_left_child(self)
+            self._set_right_child(succ_right)
+            succ._set_right_child(right)
 
-    def _unlink(self, replace_with: Optional[TreeNode[K, V]] = None):
+        self._left = None
+        succ._set_left_child(left)
+
+        if parent is not None:
+            if was_left:
+                parent._set_left_child(succ)
+            else:
+                parent._set_right_child(succ)
+        else:
+            succ._parent = None
+            succ._tree = self._tree
+            if succ._tree is not None:
+                succ._tree._root = succ
+
+        self._swap_balance(succ)
+
+    def _unlink(
+        self, replace_with: Optional[TreeNode[K, V]] = None
+    ) -> Optional[TreeNode[K, V]]:
+        """Remove this node from the tree, putting `replace_with` in its place.
+
+        Returns the former parent of this node.
+        """
         self._prev._next = self._next
         self._next._prev = self._prev
+        parent = self._parent
 
         if self._parent is not None:
             if self._is_left_child():
@@ -120,8 +286,14 @@ class TreeNode(Generic[K, V]):
             # this was the root node:
             if replace_with is not None:
                 replace_with._parent = None
-            self._tree._root = replace_with
+                replace_with._tree = self._tree
+            if self._tree is not None:
+                self._tree._root = replace_with
+
+        self._detach()
+        return parent
 
+    def _detach(self):
         self._tree = None
         self._parent = None
         self._left = None
@@ -141,35 +313,69 @@ class TreeNode(Generic[K, V]):
 
         raise KeyError(key)
 
-    def _insert_node(
-        self,
-        key: K,
-        prev: Union[SentinelNode, TreeNode[K, V]],
-        next: Union[SentinelNode, TreeNode[K, V]],
-    ) -> Tuple[bool, TreeNode[K, V]]:
-        if self.key == key:
-            return (False, self)
-
-        if key < self.key:
-            if self._left is not None:
-                return self._left._insert_node(key, prev, self)
+    def _insert_node(self, key: K, tree: Tree[K, V]) -> Tuple[bool, TreeNode[K, V]]:
+        node = self
+        while True:
+            node_key = node._key
+            if node_key == key:
+                return (False, node)
+            elif key < node_key:
+                if node._left is None:
+                    new_node = node.__class__(key, tree, node, node._prev, node)
+                    node._left = new_node
+                    break
+                node = node._left
             else:
-                new_node = self.__class__(key, self._tree, self, prev, self)
-                self._set_left_child(new_node)
-        else:
-            if self._right is not None:
-                return self._right._insert_node(key, self, next)
-            else:
-                new_node = self.__class__(key, self._tree, self, self, next)
-                self._set_right_child(new_node)
-
+                if node._right is None:
+                    new_node = node.__class__(key, tree, node, node, node._next)
+                    node._right = new_node
+                    break
+                node = node._right
+
+        if node._aug is not None:
+            node._refresh_path()
         new_node._repair_insert()
         return (True, new_node)
 
-    def _delete_node(self):
+    def _finger(self, key: K) -> Optional[TreeNode[K, V]]:
+        """Find a node to start searching for `key` from, near this node.
+
+        This walks at most `_FINGER_STEPS` nodes along the prev/next thread,
+        looking for a pair of neighbors with `key` between them. One of the two
+        always has a free child slot on the side facing the other, so a search
+        from it ends right away. Returns None if `key` is further away than
+        that, in which case searching from the root is cheaper than climbing
+        up from this node and back down again.
+        """
+        node = self
+        if key > node._key:
+            for _ in range(_FINGER_STEPS):
+                next_node = node._next
+                if not isinstance(next_node, TreeNode) or key < next_node._key:
+                    return node if node._right is None else next_node
+                elif key == next_node._key:
+                    return next_node
+                node = next_node
+            return None
+        elif key < node._key:
+            for _ in range(_FINGER_STEPS):
+                prev_node = node._prev
+                if not isinstance(prev_node, TreeNode) or key > prev_node._key:
+                    return node if node._left is None else prev_node
+                elif key == prev_node._key:
+                    return prev_node
+                node = prev_node
+            return None
+
+        return node
+
+    def _delete_node(self) -> Optional[TreeNode[K, V]]:
+        """Delete this node from the tree.
+
+        Returns the node that was the parent of the removed position, if any.
+        """
         if self._left is not None and self._right is not None:
-            self._copy_data(self._next)
-            return self._next._delete_node()
+            self._swap_with_successor()
         return self._delete_single_child()
 
     # inclusive lower bound
@@ -219,14 +425,14 @@ class TreeNode(Generic[K, V]):
 
     def _delete_single_child(self):
         if self._left is not None:
-            self._copy_data(self._left)
-            return self._left._delete_node()
-        elif self._right is not None:
-            self._copy_data(self._right)
-            return self._right._delete_node()
+            replace_with = self._left
         else:
-            self._repair_delete()
-            self._unlink()
+            replace_with = self._right
+        self._repair_delete()
+        return self._unlink(replace_with)
+
+    def _swap_balance(self, other: TreeNode[K, V]):
+        pass
 
     def _repair_delete(self):
         pass
@@ -236,12 +442,37 @@ class TreeNode(Generic[K, V]):
 
 
 class Tree(Generic[K, V], MutableMapping):
-    def __init__(self, node_class: Type[TreeNode] = TreeNode):
+    def __init__(
+        self,
+        node_class: Type[TreeNode] = TreeNode,
+        aggregate: Optional[Aggregate[K, V, Any]] = None,
+        order_stats: bool = False,
+    ):
+        """Create an empty tree.
+
+        If `aggregate` is given, the tree maintains that aggregate for every
+        subtree, for use with `aggregate()`. Trees with an aggregate or with
+        `order_stats` set also maintain subtree sizes, for use with `select()`
+        and `rank()`. Either option adds O(log n) work to every update.
+        """
         self._node_cls = node_class
+        if aggregate is not None:
+            self._aug: Optional[Aggregate[K, V, Any]] = aggregate
+        elif order_stats:
+            self._aug = _ORDER_STATS
+        else:
+            self._aug = None
+
         self._root: Optional[TreeNode[K, V]] = None
         self._sentinel = SentinelNode()
+
         self._len: int = 0
 
+        # Whether nodes have ever moved between this tree and another, through
+        # split() or join(). Until they do, a node whose `_tree` is this tree
+        # is known to belong to it without climbing to the root:
+        self._nodes_moved: bool = False
+
     def get_node(self, key: K) -> TreeNode[K, V]:
         """Directly retrieve a node within this tree.
         
@@ -251,10 +482,29 @@ class Tree(Generic[K, V], MutableMapping):
             raise KeyError(key)
         return self._root._find_node(key)
 
-    def get_or_insert_node(self, key: K) -> Tuple[bool, TreeNode[K, V]]:
+    def _owns(self, node: TreeNode[K, V]) -> bool:
+        if node._tree is self and not self._nodes_moved:
+            return True
+        return node._owner() is self
+
+    def _search_start(self, key: K, hint: Optional[TreeNode[K, V]]) -> TreeNode[K, V]:
+        if hint is None:
+            return self._root
+        elif not self._owns(hint):
+            raise ValueError("hint node does not belong to this tree")
+
+        start = hint._finger(key)
+        return self._root if start is None else start
+
+    def get_or_insert_node(
+        self, key: K, hint: Optional[TreeNode[K, V]] = None
+    ) -> Tuple[bool, TreeNode[K, V]]:
         """Retrieve a node within this tree, inserting a new node if one does
         not exist for the given key.
 
+        If `hint` is given, it should be a node in this tree close to `key`;
+        the search will start from there instead of from the root.
+
         Returns a tuple containing:
             - Whether a new node was inserted or not
             - The (possibly newly-inserted) node for the given key
@@ -264,8 +514,8 @@ class Tree(Generic[K, V], MutableMapping):
             self._len = 1
             return (True, self._root)
         else:
-            created_new, insert_node = self._root._insert_node(
-                key, self._sentinel, self._sentinel
+            created_new, insert_node = self._search_start(key, hint)._insert_node(
+                key, self
             )
             if created_new:
                 self._len += 1
@@ -275,8 +525,133 @@ class Tree(Generic[K, V], MutableMapping):
         _, insert_node = self.get_or_insert_node(key)
         old_val = insert_node.value
         insert_node.value = val
+        if self._aug is not None:
+            insert_node._refresh_path()
         return old_val
 
+    def refresh_node(self, node: TreeNode[K, V]):
+        """Update aggregates after the value of `node` was changed directly
+        (rather than through `insert` or item assignment).
+
+        This is a no-op for trees that do not maintain aggregates.
+        """
+        if self._aug is not None:
+            node._refresh_path()
+
+    @classmethod
+    def from_sorted(cls, items: Iterable[Tuple[K, V]], **kwargs) -> Tree[K, V]:
+        """Build a new tree from items with strictly increasing keys.
+
+        Any keyword arguments are passed to the tree constructor. This runs in
+        O(n) time, versus O(n log n) for inserting each item individually.
+        """
+        tree = cls(**kwargs)
+        nodes = []
+        for k, v in items:
+            if len(nodes) > 0 and not (nodes[-1].key < k):
+                raise ValueError("keys must be strictly increasing")
+            node = tree._node_cls(k, tree, None, tree._sentinel, tree._sentinel)
+            node.value = v
+            nodes.append(node)
+
+        tree._build(nodes)
+        return tree
+
+    def insert_many(self, items: Iterable[Tuple[K, V]]):
+        """Insert a batch of items with strictly increasing keys.
+
+        Existing keys have their values replaced, as with `insert`. Small
+        batches are inserted one at a time, with each search starting from
+        the previously-inserted node; large batches are merged with the
+        existing items and the tree is rebuilt in O(n) time. Handles to
+        existing nodes remain valid either way.
+        """
+        items = list(items)
+        for i in range(1, len(items)):
+            if not (items[i - 1][0] < items[i][0]):
+                raise ValueError("keys must be strictly increasing")
+
+        if len(items) == 0:
+            return
+        elif len(items) * 8 < len(self):
+            hint = None
+            for k, v in items:
+                _, hint = self.get_or_insert_node(k, hint)
+                hint.value = v
+                if self._aug is not None:
+                    hint._refresh_path()
+            return
+
+        merged = []
+        node = self._sentinel._next
+        for k, v in items:
+            while node is not self._sentinel and node.key < k:
+                merged.append(node)
+                node = node._next
+
+            if node is not self._sentinel and node.key == k:
+                node.value = v
+                merged.append(node)
+                node = node._next
+            else:
+                new_node = self._node_cls(k, self, None, self._sentinel, self._sentinel)
+                new_node.value = v
+                merged.append(new_node)
+
+        while node is not self._sentinel:
+            merged.append(node)
+            node = node._next
+
+        self._build(merged)
+
+    def _build(self, nodes: List[TreeNode[K, V]]):
+        """Rebuild this tree as a perfectly balanced tree containing exactly
+        the given nodes, which must be in key order.
+        """
+        prev = self._sentinel
+        for node in nodes:
+            node._prev = prev
+            prev._next = node
+            prev = node
+        prev._next = self._sentinel
+        self._sentinel._prev = prev
+
+        # All nodes shallower than max_depth will have two children:
+        max_depth = len(nodes).bit_length() - 1
+        root, _ = self._build_subtree(nodes, 0, len(nodes), 0, max_depth)
+        self._set_root(root)
+        self._len = len(nodes)
+
+    def _build_subtree(
+        self, nodes: List[TreeNode[K, V]], lo: int, hi: int, depth: int, max_depth: int
+    ) -> Tuple[Optional[TreeNode[K, V]], int]:
+        if lo >= hi:
+            return (None, 0)
+
+        mid = (lo + hi) // 2
+        node = nodes[mid]
+        left, left_height = self._build_subtree(nodes, lo, mid, depth + 1, max_depth)
+        right, right_height = self._build_subtree(
+            nodes, mid + 1, hi, depth + 1, max_depth
+        )
+        node._set_left_child(left)
+        node._set_right_child(right)
+        self._init_built_node(node, depth, max_depth, left_height, right_height)
+        if node._aug is not None:
+            node._refresh()
+
+        return (node, max(left_height, right_height) + 1)
+
+    def _init_built_node(
+        self,
+        node: TreeNode[K, V],
+        depth: int,
+        max_depth: int,
+        left_height: int,
+        right_height: int,
+    ):
+        """Initialize balancing information for a node placed by `_build`."""
+
     def _first_node(self) -> TreeNode[K, V]:
         node = self._sentinel._next
         if node == self._sentinel:
@@ -289,6 +664,23 @@ class Tree(Generic[K, V], MutableMapping):
             raise IndexError("Tree is empty")
         return node
 
+    def delete_node(self, node: TreeNode[K, V]):
+        """Remove a node from this tree, given a handle to it.
+
+        Deletion never moves keys or values between nodes, so handles to all
+        other nodes in the tree stay valid. Once deleted, `node` is detached
+        and must not be passed to this tree again.
+
+        Raises ValueError if the node does not belong to this tree (including
+        if it has already been removed from its tree).
+        """
+        if not self._owns(node):
+            raise ValueError("node does not belong to this tree")
+        parent = node._delete_node()
+        if parent is not None and self._aug is not None:
+            parent._refresh_path()
+        self._len -= 1
+
     def min(self) -> Tuple[K, V]:
         # pylint: disable=no-member
         node = self._first_node()
@@ -303,16 +695,14 @@ class Tree(Generic[K, V], MutableMapping):
         # pylint: disable=no-member
         node = self._first_node()
         r = (node.key, node.value)
-        node._delete_node()
-        self._len -= 1
+        self.delete_node(node)
         return r
 
     def pop_max(self) -> Tuple[K, V]:
         # pylint: disable=no-member
         node = self._last_node()
         r = (node.key, node.value)
-        node._delete_node()
-        self._len -= 1
+        self.delete_node(node)
         return r
 
     def pop(self, key: K, default: Optional[V] = None) -> Optional[V]:
@@ -320,8 +710,7 @@ class Tree(Generic[K, V], MutableMapping):
             try:
                 removed = self._root._find_node(key)
                 val = removed.value
-                removed._delete_node()
-                self._len -= 1
+                self.delete_node(removed)
                 return val
             except KeyError:
                 pass
@@ -330,26 +719,373 @@ class Tree(Generic[K, V], MutableMapping):
             return default
         raise KeyError(key)
 
-    def upper_bound(self, bound: K) -> Optional[Tuple[K, V]]:
+    def upper_bound(
+        self, bound: K, hint: Optional[TreeNode[K, V]] = None
+    ) -> Optional[Tuple[K, V]]:
+        """Find the item with the greatest key strictly less than `bound`.
+
+        If `hint` is given, the search will start from that node.
+        """
         if self._root is None:
             return None
 
-        node = self._root._upper_bound(bound)
+        node = self._search_start(bound, hint)._upper_bound(bound)
 
         if isinstance(node, SentinelNode):
             return None
         return (node.key, node.value)
 
-    def lower_bound(self, bound: K) -> Optional[Tuple[K, V]]:
+    def lower_bound(
+        self, bound: K, hint: Optional[TreeNode[K, V]] = None
+    ) -> Optional[Tuple[K, V]]:
+        """Find the item with the least key greater than or equal to `bound`.
+
+        If `hint` is given, the search will start from that node.
+        """
         if self._root is None:
             return None
 
-        node = self._root._lower_bound(bound)
+        node = self._search_start(bound, hint)._lower_bound(bound)
 
         if isinstance(node, SentinelNode):
             return None
         return (node.key, node.value)
 
+    def _empty_like(self) -> Tree[K, V]:
+        ret = copy.copy(self)
+        ret._root = None
+        ret._sentinel = SentinelNode()
+        ret._len = 0
+        return ret
+
+    def _set_root(self, node: Optional[TreeNode[K, V]]):
+        self._root = node
+        if node is not None:
+            node._parent = None
+            node._tree = self
+
+    def _split_subtree(
+        self, node: Optional[TreeNode[K, V]], rank: int, key: K
+    ) -> Tuple[Optional[TreeNode[K, V]], int, Optional[TreeNode[K, V]], int]:
+        """Split the subtree rooted at `node` into subtrees containing keys less
+        than and greater than or equal to `key`, respectively.
+
+        Returns the roots and ranks of both subtrees. This only touches tree
+        structure; the prev/next thread is left as-is.
+        """
+        if node is None:
+            return (None, 0, None, 0)
+
+        left = node._left
+        right = node._right
+        left_rank = self._child_rank(node, rank, True)
+        right_rank = self._child_rank(node, rank, False)
+
+        # Reuse this node as the middle node for joining the pieces back up:
+        node._tree = None
+        node._parent = None
+        node._left = None
+        node._right = None
+        for child in (left, right):
+            if child is not None:
+                child._tree = None
+                child._parent = None
+
+        if key <= node.key:
+            l, l_rank, r, r_rank = self._split_subtree(left, left_rank, key)
+            root, root_rank = self._join3(r, r_rank, node, right, right_rank)
+            return (l, l_rank, root, root_rank)
+        else:
+            l, l_rank, r, r_rank = self._split_subtree(right, right_rank, key)
+            root, root_rank = self._join3(left, left_rank, node, l, l_rank)
+            return (root, root_rank, r, r_rank)
+
+    def split(self, key: K) -> Tree[K, V]:
+        """Split this tree in two.
+
+        Keys less than `key` are kept in this tree, while keys greater than or
+        equal to `key` are moved into a new tree of the same type, which is
+        returned. Node handles remain valid and move along with their nodes.
+
+        Restructuring the trees takes O(log n) time. Keeping both lengths
+        exact takes an additional O(min(k, n - k)) time, where k is the number
+        of keys moved into the new tree, unless this tree maintains subtree
+        sizes (see `order_stats`).
+        """
+        ret = self._split(key)
+        if ret._root is None:
+            return ret
+
+        self._nodes_moved = ret._nodes_moved = True
+
+        old_len = self._len
+        if self._aug is not None:
+            self._len = self._root._size if self._root is not None else 0
+        else:
+            # Count from both ends at once, stopping at the shorter side:
+            n = 0
+            lower = self._sentinel._next
+            upper = ret._sentinel._prev
+            while lower is not self._sentinel and upper is not ret._sentinel:
+                lower = lower._next
+                upper = upper._prev
+                n += 1
+
+            if lower is self._sentinel:
+                self._len = n
+            else:
+                self._len = old_len - n
+
+        ret._len = old_len - self._len
+        return ret
+
+    def _split(self, key: K) -> Tree[K, V]:
+        """Split this tree as in `split`, without updating either length."""
+        ret = self._empty_like()
+        if self._root is None:
+            return ret
+
+        boundary = self._root._lower_bound(key)
+        if isinstance(boundary, SentinelNode):
+            return ret
+
+        left, _, right, _ = self._split_subtree(self._root, self._rank(self._root), key)
+        self._set_root(left)
+        ret._set_root(right)
+
+        last = self._sentinel._prev
+        before = boundary._prev
+
+        before._next = self._sentinel
+        self._sentinel._prev = before
+        boundary._prev = ret._sentinel
+        ret._sentinel._next = boundary
+        last._next = ret._sentinel
+        ret._sentinel._prev = last
+        return ret
+
+    def join(self, other: Tree[K, V]):
+        """Move all items from `other` into this tree.
+
+        All keys in `other` must be greater than all keys in this tree; `other`
+        must also be of the same type as this tree. Afterwards, `other` will be
+        empty. Node handles from `other` remain valid and now refer to nodes
+        within this tree.
+
+        This runs in O(log n) time.
+        """
+        if other._root is not None:
+            self._nodes_moved = other._nodes_moved = True
+        self._join(other)
+
+    def _join(self, other: Tree[K, V]):
+        """Join `other` into this tree as in `join`, for when no node that
+        moves can still have its `_tree` pointing at `other`."""
+        if other is self or type(other) is not type(self):
+            raise ValueError("can only join distinct trees of the same type")
+        elif other._aug is not self._aug:
+            raise ValueError("can only join trees with the same aggregate")
+        elif other._root is None:
+            return
+        elif self._root is None:
+            self._set_root(other._root)
+            self._sentinel._next = other._sentinel._next
+            self._sentinel._next._prev = self._sentinel
+            self._sentinel._prev = other._sentinel._prev
+            self._sentinel._prev._next = self._sentinel
+            self._len = other._len
+            other._set_root(None)
+            other._sentinel = SentinelNode()
+            other._len = 0
+            return
+
+        last = self._sentinel._prev
+        mid = other._sentinel._next
+        if not (last.key < mid.key):
+            raise ValueError("keys in joined tree must be greater than all keys")
+
+        new_len = self._len + other._len
+        other.delete_node(mid)
+        left = self._root
+        right = other._root
+        left_rank = self._rank(left)
+        right_rank = self._rank(right)
+
+        left._tree = None
+        if right is not None:
+            right._tree = None
+        root, _ = self._join3(left, left_rank, mid, right, right_rank)
+        self._set_root(root)
+
+        last._next = mid
+        mid._prev = last
+        if right is not None:
+            mid._next = other._sentinel._next
+            mid._next._prev = mid
+            self._sentinel._prev = other._sentinel._prev
+        else:
+            self._sentinel._prev = mid
+        self._sentinel._prev._next = self._sentinel
+        self._len = new_len
+
+        other._set_root(None)
+        other._sentinel = SentinelNode()
+        other._len = 0
+
+    def delete_range(self, lo: K, hi: K) -> int:
+        """Remove all items with keys in the range [lo, hi).
+
+        This runs in O(k + log n) time, where k is the number of removed items.
+        Returns the number of items removed.
+        """
+        if self._root is None or not (lo < hi):
+            return 0
+
+        old_len = self._len
+        removed = self._split(lo)
+        # Nodes that are kept either never left this tree, or come from a
+        # temporary tree, so this doesn't count as nodes moving between trees:
+        self._join(removed._split(hi))
+
+        n_removed = 0
+        node = removed._sentinel._next
+        while node is not removed._sentinel:
+            next_node = node._next
+            node._detach()
+            node = next_node
+            n_removed += 1
+
+        self._len = old_len - n_removed
+        return n_removed
+
+    # Balanced tree types override these methods to support split() and join().
+    # A node's "rank" is whatever measure of subtree height the balancing
+    # scheme needs to join trees.
+
+    def _rank(self, node: Optional[TreeNode[K, V]]) -> int:
+        return 0
+
+    def _child_rank(self, node: TreeNode[K, V], rank: int, left: bool) -> int:
+        return 0
+
+    def _join3(
+        self,
+        left: Optional[TreeNode[K, V]],
+        left_rank: int,
+        mid: TreeNode[K, V],
+        right: Optional[TreeNode[K, V]],
+        right_rank: int,
+    ) -> Tuple[TreeNode[K, V], int]:
+        """Join two detached subtrees using a detached middle node, whose key
+        lies between the keys of both subtrees.
+
+        Returns the root and rank of the joined subtree.
+        """
+        mid._set_left_child(left)
+        mid._set_right_child(right)
+        if mid._aug is not None:
+            mid._refresh()
+        return (mid, 0)
+
+    def _require_aug(self, need_aggregate: bool):
+        if self._aug is None or (need_aggregate and self._aug.project is None):
+            raise ValueError(
+                "tree does not maintain "
+                + ("aggregates" if need_aggregate else "order statistics")
+            )
+
+    def aggregate(self, lo: Optional[K] = None, hi: Optional[K] = None) -> Any:
+        """Aggregate over all items with keys in the range [lo, hi).
+
+        Either bound may be omitted to leave that side of the range unbounded.
+        This runs in O(log n) time.
+        """
+        self._require_aug(True)
+        aug = self._aug
+
+        # Find the topmost node within the range:
+        node = self._root
+        while node is not None:
+            if lo is not None and node.key < lo:
+                node = node._right
+            elif hi is not None and not (node.key < hi):
+                node = node._left
+            else:
+                break
+
+        if node is None:
+            return aug.identity
+
+        # Everything in its left subtree is below hi, and everything in its
+        # right subtree is at or above lo:
+        left_agg = aug.identity
+        cur = node._left
+        while cur is not None:
+            if lo is None or not (cur.key < lo):
+                right_part = cur._own_aggregate()
+                if cur._right is not None:
+                    right_part = aug.combine(right_part, cur._right._agg)
+                left_agg = aug.combine(right_part, left_agg)
+                cur = cur._left
+            else:
+                cur = cur._right
+
+        right_agg = aug.identity
+        cur = node._right
+        while cur is not None:
+            if hi is None or cur.key < hi:
+                left_part = cur._own_aggregate()
+                if cur._left is not None:
+                    left_part = aug.combine(cur._left._agg, left_part)
+                right_agg = aug.combine(right_agg, left_part)
+                cur = cur._right
+            else:
+                cur = cur._left
+
+        return aug.combine(aug.combine(left_agg, node._own_aggregate()), right_agg)
+
+    def select(self, index: int) -> Tuple[K, V]:
+        """Retrieve the item at the given position in key order.
+
+        Negative indices count from the end of the tree, as with lists. This
+        runs in O(log n) time.
+        """
+        self._require_aug(False)
+        n = len(self)
+        if index < 0:
+            index += n
+        if not (0 <= index < n):
+            raise IndexError("tree index out of range")
+
+        node = self._root
+        while True:
+            left_size = node._left._size if node._left is not None else 0
+            if index < left_size:
+                node = node._left
+            elif index == left_size:
+                return (node.key, node.value)
+            else:
+                index -= left_size + 1
+                node = node._right
+
+    def rank(self, key: K) -> int:
+        """Count the items with keys strictly less than `key`.
+
+        This runs in O(log n) time.
+        """
+        self._require_aug(False)
+        ret = 0
+        node = self._root
+        while node is not None:
+            if node.key < key:
+                ret += 1
+                if node._left is not None:
+                    ret += node._left._size
+                node = node._right
+            else:
+                node = node._left
+        return ret
+
     def _do_iter(
         self,
         mode: int,
@@ -408,6 +1144,55 @@ class Tree(Generic[K, V], MutableMapping):
     ) -> Iterator[TreeNode[K, V]]:
         return TreeIter(TreeIter.NODES, start_node, end_node, reverse)
 
+    def keys_list(
+        self, left_bound: Optional[K] = None, right_bound: Optional[K] = None
+    ) -> List[K]:
+        """Retrieve all keys in the range [left_bound, right_bound) as a list.
+
+        This is faster than building a list from `keys()` when the whole range
+        is needed at once.
+        """
+        it = self._do_iter(TreeIter.NODES, left_bound, right_bound)
+        node = it._cur
+        end = it._end
+        ret = []
+        if node is not None:
+            append = ret.append
+            while node is not end:
+                append(node._key)
+                node = node._next
+            append(end._key)
+        return ret
+
+    def values_list(
+        self, left_bound: Optional[K] = None, right_bound: Optional[K] = None
+    ) -> List[V]:
+        """Retrieve all values with keys in the range [left_bound, right_bound)
+        as a list.
+        """
+        it = self._do_iter(TreeIter.NODES, left_bound, right_bound)
+        node = it._cur
+        end = it._end
+        ret = []
+        if node is not None:
+            append = ret.append
+            while node is not end:
+                append(node.value)
+                node = node._next
+            append(end.value)
+        return ret
+
+    def keys_array(
+        self,
+        left_bound: Optional[K] = None,
+        right_bound: Optional[K] = None,
+        dtype: Any = None,
+    ) -> np.ndarray:
+        """Retrieve all keys in the range [left_bound, right_bound) as a numpy
+        array, for vectorized processing.
+        """
+        return np.array(self.keys_list(left_bound, right_bound), dtype=dtype)
+
     def print(self) -> str:
         if self._root is not None:
             return self._root._print_recursive(0)
@@ -421,8 +1206,7 @@ class Tree(Generic[K, V], MutableMapping):
         self.insert(key, val)
 
     def __delitem__(self, key: K):
-        self.get_node(key)._delete_node()
-        self._len -= 1
+        self.delete_node(self.get_node(key))
 
     def __contains__(self, key: K) -> bool:
         try:
@@ -0,0 +1,615 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import MutableMapping
+import numpy as np
+from typing import Any, Generic, TypeVar, Optional, Iterator, Iterable, List, Tuple
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class ChunkNode(Generic[K, V]):
+    """A handle to a single item within a `SortedChunkList`.
+
+    Like `TreeNode`s, these handles stay valid (and keep referring to the same
+    key) until the item they refer to is deleted.
+    """
+
+    __slots__ = ("_key", "value", "_chunk")
+
+    def __init__(self, key: K, value: V = None):
+        self._key: K = key
+        self.value: V = value
+        self._chunk: Optional[_Chunk[K, V]] = None
+
+    @property
+    def key(self) -> K:
+        """The key associated with this node.
+
+        This property is immutable.
+        """
+        return self._key
+
+    @property
+    def prev(self) -> Optional[ChunkNode[K, V]]:
+        """This node's predecessor in the list, if any."""
+        chunk = self._chunk
+        i = bisect_left(chunk.keys, self._key)
+        if i > 0:
+            return chunk.nodes[i - 1]
+        elif chunk.prev is not None:
+            return chunk.prev.nodes[-1]
+
+    @property
+    def next(self) -> Optional[ChunkNode[K, V]]:
+        """This node's successor in the list, if any."""
+        chunk = self._chunk
+        i = bisect_left(chunk.keys, self._key) + 1
+        if i < len(chunk.keys):
+            return chunk.nodes[i]
+        elif chunk.next is not None:
+            return chunk.next.nodes[0]
+
+
+class _Chunk(Generic[K, V]):
+    __slots__ = ("owner", "keys", "nodes", "prev", "next")
+
+    def __init__(
+        self,
+        owner: SortedChunkList[K, V],
+        keys: List[K],
+        nodes: List[ChunkNode[K, V]],
+    ):
+        self.owner: SortedChunkList[K, V] = owner
+        self.keys: List[K] = keys
+        self.nodes: List[ChunkNode[K, V]] = nodes
+        self.prev: Optional[_Chunk[K, V]] = None
+        self.next: Optional[_Chunk[K, V]] = None
+
+        for node in nodes:
+            node._chunk = self
+
+
+class SortedChunkList(Generic[K, V], MutableMapping):
+    """An ordered map that stores its keys in a list of sorted chunks.
+
+    This offers the same interface as `Tree` for ordered lookups, node handles
+    and range iteration, but keeps keys in contiguous Python lists searched
+    with `bisect`. Compared to a balanced tree, this uses much less memory per
+    item and makes range scans much faster, at the cost of O(load) time
+    list insertions and deletions.
+
+    `load` controls the chunk size: chunks are split when they grow past twice
+    this size, and merged with a neighbor when they shrink below half of it.
+    """
+
+    def __init__(self, load: int = 512):
+        self._load: int = load
+        self._chunks: List[_Chunk[K, V]] = []
+        self._maxes: List[K] = []
+        self._len: int = 0
+
+    def _chunk_index(self, chunk: _Chunk[K, V]) -> int:
+        return bisect_left(self._maxes, chunk.keys[-1])
+
+    def _find_chunk(
+        self, key: K, hint: Optional[ChunkNode[K, V]] = None
+    ) -> Optional[_Chunk[K, V]]:
+        """Find the first chunk containing keys greater than or equal to `key`,
+        if any.
+        """
+        if hint is not None:
+            chunk = hint._chunk
+            if chunk is None or chunk.owner is not self:
+                raise ValueError("hint node does not belong to this list")
+            elif (not (chunk.keys[-1] < key)) and (
+                chunk.prev is None or chunk.prev.keys[-1] < key
+            ):
+                return chunk
+
+        ci = bisect_left(self._maxes, key)
+        if ci == len(self._chunks):
+            return None
+        return self._chunks[ci]
+
+    def _insert_chunk(self, ci: int, chunk: _Chunk[K, V]):
+        if ci > 0:
+            chunk.prev = self._chunks[ci - 1]
+            chunk.prev.next = chunk
+        if ci < len(self._chunks):
+            chunk.next = self._chunks[ci]
+            chunk.next.prev = chunk
+
+        self._chunks.insert(ci, chunk)
+        self._maxes.insert(ci, chunk.keys[-1])
+
+    def _remove_chunk(self, ci: int):
+        chunk = self._chunks.pop(ci)
+        del self._maxes[ci]
+
+        if chunk.prev is not None:
+            chunk.prev.next = chunk.next
+        if chunk.next is not None:
+            chunk.next.prev = chunk.prev
+
+    def _split_chunk(self, chunk: _Chunk[K, V]):
+        half = len(chunk.keys) // 2
+        new_chunk = _Chunk(self, chunk.keys[half:], chunk.nodes[half:])
+        del chunk.keys[half:]
+        del chunk.nodes[half:]
+
+        ci = bisect_left(self._maxes, new_chunk.keys[-1])
+        self._maxes[ci] = chunk.keys[-1]
+        self._insert_chunk(ci + 1, new_chunk)
+
+    def _merge_chunk(self, ci: int):
+        """Merge an undersized chunk with one of its neighbors, if possible."""
+        chunk = self._chunks[ci]
+        max_size = self._load * 2
+
+        if chunk.next is not None and (
+            len(chunk.keys) + len(chunk.next.keys) <= max_size
+        ):
+            into = chunk
+            ci += 1
+        elif chunk.prev is not None and (
+            len(chunk.keys) + len(chunk.prev.keys) <= max_size
+        ):
+            into = chunk.prev
+        else:
+            return
+
+        merged = self._chunks[ci]
+        for node in merged.nodes:
+            node._chunk = into
+        into.keys.extend(merged.keys)
+        into.nodes.extend(merged.nodes)
+        self._maxes[ci - 1] = into.keys[-1]
+        self._remove_chunk(ci)
+
+    def get_node(self, key: K) -> ChunkNode[K, V]:
+        """Directly retrieve a node within this list.
+
+        Raises KeyError if the list does not contain the given key.
+        """
+        chunk = self._find_chunk(key)
+        if chunk is not None:
+            i = bisect_left(chunk.keys, key)
+            if chunk.keys[i] == key:
+                return chunk.nodes[i]
+        raise KeyError(key)
+
+    def get_or_insert_node(
+        self, key: K, hint: Optional[ChunkNode[K, V]] = None
+    ) -> Tuple[bool, ChunkNode[K, V]]:
+        """Retrieve a node within this list, inserting a new node if one does
+        not exist for the given key.
+
+        If `hint` is given, it should be a node in this list close to `key`.
+
+        Returns a tuple containing:
+            - Whether a new node was inserted or not
+            - The (possibly newly-inserted) node for the given key
+        """
+        if len(self._chunks) == 0:
+            node = ChunkNode(key)
+            self._insert_chunk(0, _Chunk(self, [key], [node]))
+            self._len = 1
+            return (True, node)
+
+        chunk = self._find_chunk(key, hint)
+        if chunk is None:
+            # New maximum key:
+            node = ChunkNode(key)
+            chunk = self._chunks[-1]
+            chunk.keys.append(key)
+            chunk.nodes.append(node)
+            self._maxes[-1] = key
+        else:
+            i = bisect_left(chunk.keys, key)
+            if chunk.keys[i] == key:
+                return (False, chunk.nodes[i])
+            node = ChunkNode(key)
+            chunk.keys.insert(i, key)
+            chunk.nodes.insert(i, node)
+
+        node._chunk = chunk
+        self._len += 1
+        if len(chunk.keys) > self._load * 2:
+            self._split_chunk(chunk)
+        return (True, node)
+
+    def insert(self, key: K, val: V) -> Optional[V]:
+        _, insert_node = self.get_or_insert_node(key)
+        old_val = insert_node.value
+        insert_node.value = val
+        return old_val
+
+    def delete_node(self, node: ChunkNode[K, V]):
+        """Remove a node from this list, given a handle to it.
+
+        Handles to all other nodes in the list stay valid. Raises ValueError
+        if the node does not belong to this list (including if it has already
+        been removed from its list).
+        """
+        chunk = node._chunk
+        if chunk is None or chunk.owner is not self:
+            raise ValueError("node does not belong to this list")
+
+        ci = self._chunk_index(chunk)
+        i = bisect_left(chunk.keys, node._key)
+        del chunk.keys[i]
+        del chunk.nodes[i]
+        node._chunk = None
+        self._len -= 1
+
+        if len(chunk.keys) == 0:
+            self._remove_chunk(ci)
+            return
+        elif i == len(chunk.keys):
+            self._maxes[ci] = chunk.keys[-1]
+
+        if len(chunk.keys) < self._load // 2:
+            self._merge_chunk(ci)
+
+    def delete_range(self, lo: K, hi: K) -> int:
+        """Remove all items with keys in the range [lo, hi).
+
+        Returns the number of items removed.
+        """
+        if not (lo < hi):
+            return 0
+
+        n_removed = 0
+        ci = first_ci = bisect_left(self._maxes, lo)
+        while ci < len(self._chunks):
+            chunk = self._chunks[ci]
+            a = bisect_left(chunk.keys, lo)
+            b = bisect_left(chunk.keys, hi)
+            end_reached = b < len(chunk.keys)
+
+            for node in chunk.nodes[a:b]:
+                node._chunk = None
+            del chunk.keys[a:b]
+            del chunk.nodes[a:b]
+            n_removed += b - a
+
+            if len(chunk.keys) == 0:
+                self._remove_chunk(ci)
+            else:
+                self._maxes[ci] = chunk.keys[-1]
+                ci += 1
+
+            if end_reached:
+                break
+
+        # At most two partially-trimmed chunks are left, now adjacent at
+        # first_ci and first_ci + 1. Merge them (with each other or with their
+        # neighbors) if they are undersized:
+        for ci in (first_ci + 1, first_ci):
+            if ci < len(self._chunks) and (
+                len(self._chunks[ci].keys) < self._load // 2
+            ):
+                self._merge_chunk(ci)
+
+        self._len -= n_removed
+        return n_removed
+
+    @classmethod
+    def from_sorted(cls, items: Iterable[Tuple[K, V]], **kwargs) -> SortedChunkList:
+        """Build a new list from items with strictly increasing keys.
+
+        Any keyword arguments are passed to the list constructor.
+        """
+        ret = cls(**kwargs)
+        nodes = []
+        for k, v in items:
+            if len(nodes) > 0 and not (nodes[-1].key < k):
+                raise ValueError("keys must be strictly increasing")
+            nodes.append(ChunkNode(k, v))
+
+        ret._build(nodes)
+        return ret
+
+    def insert_many(self, items: Iterable[Tuple[K, V]]):
+        """Insert a batch of items with strictly increasing keys.
+
+        Existing keys have their values replaced, as with `insert`. Handles to
+        existing nodes remain valid.
+        """
+        items = list(items)
+        for i in range(1, len(items)):
+            if not (items[i - 1][0] < items[i][0]):
+                raise ValueError("keys must be strictly increasing")
+
+        if len(items) * 8 < len(self):
+            hint = None
+            for k, v in items:
+                _, hint = self.get_or_insert_node(k, hint)
+                hint.value = v
+            return
+
+        merged = []
+        existing = iter(self._iter_nodes())
+        node = next(existing, None)
+        for k, v in items:
+            while node is not None and node.key < k:
+                merged.append(node)
+                node = next(existing, None)
+
+            if node is not None and node.key == k:
+                node.value = v
+                merged.append(node)
+                node = next(existing, None)
+            else:
+                merged.append(ChunkNode(k, v))
+
+        while node is not None:
+            merged.append(node)
+            node = next(existing, None)
+
+        self._build(merged)
+
+    def _build(self, nodes: List[ChunkNode[K, V]]):
+        self._chunks = []
+        self._maxes = []
+        for i in range(0, len(nodes), self._load):
+            part = nodes[i : i + self._load]
+            self._insert_chunk(
+                len(self._chunks), _Chunk(self, [n.key for n in part], part)
+            )
+        self._len = len(nodes)
+
+    def _iter_nodes(self) -> Iterator[ChunkNode[K, V]]:
+        for chunk in self._chunks:
+            yield from chunk.nodes
+
+    def _first_node(self) -> ChunkNode[K, V]:
+        if len(self._chunks) == 0:
+            raise IndexError("List is empty")
+        return self._chunks[0].nodes[0]
+
+    def _last_node(self) -> ChunkNode[K, V]:
+        if len(self._chunks) == 0:
+            raise IndexError("List is empty")
+        return self._chunks[-1].nodes[-1]
+
+    def min(self) -> Tuple[K, V]:
+        node = self._first_node()
+        return (node.key, node.value)
+
+    def max(self) -> Tuple[K, V]:
+        node = self._last_node()
+        return (node.key, node.value)
+
+    def pop_min(self) -> Tuple[K, V]:
+        node = self._first_node()
+        r = (node.key, node.value)
+        self.delete_node(node)
+        return r
+
+    def pop_max(self) -> Tuple[K, V]:
+        node = self._last_node()
+        r = (node.key, node.value)
+        self.delete_node(node)
+        return r
+
+    def pop(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        try:
+            removed = self.get_node(key)
+            val = removed.value
+            self.delete_node(removed)
+            return val
+        except KeyError:
+            pass
+
+        if default is not None:
+            return default
+        raise KeyError(key)
+
+    def _lower_pos(
+        self, bound: K, hint: Optional[ChunkNode[K, V]] = None
+    ) -> Tuple[Optional[_Chunk[K, V]], int]:
+        """Find the position of the first key greater than or equal to `bound`.
+
+        Returns (None, 0) if there is no such key.
+        """
+        chunk = self._find_chunk(bound, hint)
+        if chunk is None:
+            return (None, 0)
+        return (chunk, bisect_left(chunk.keys, bound))
+
+    def _upper_pos(
+        self, bound: K, hint: Optional[ChunkNode[K, V]] = None
+    ) -> Tuple[Optional[_Chunk[K, V]], int]:
+        """Find the position of the last key strictly less than `bound`.
+
+        Returns (None, 0) if there is no such key.
+        """
+        chunk, i = self._lower_pos(bound, hint)
+        if chunk is None:
+            if len(self._chunks) == 0:
+                return (None, 0)
+            chunk = self._chunks[-1]
+            return (chunk, len(chunk.keys) - 1)
+        elif i > 0:
+            return (chunk, i - 1)
+        elif chunk.prev is not None:
+            return (chunk.prev, len(chunk.prev.keys) - 1)
+        return (None, 0)
+
+    def upper_bound(
+        self, bound: K, hint: Optional[ChunkNode[K, V]] = None
+    ) -> Optional[Tuple[K, V]]:
+        """Find the item with the greatest key strictly less than `bound`."""
+        chunk, i = self._upper_pos(bound, hint)
+        if chunk is None:
+            return None
+        return (chunk.keys[i], chunk.nodes[i].value)
+
+    def lower_bound(
+        self, bound: K, hint: Optional[ChunkNode[K, V]] = None
+    ) -> Optional[Tuple[K, V]]:
+        """Find the item with the least key greater than or equal to `bound`."""
+        chunk, i = self._lower_pos(bound, hint)
+        if chunk is None:
+            return None
+        return (chunk.keys[i], chunk.nodes[i].value)
+
+    def _iter_slices(
+        self, left_bound: Optional[K], right_bound: Optional[K], reverse: bool
+    ) -> Iterator[Tuple[_Chunk[K, V], int, int]]:
+        """Yield (chunk, start, end) slices covering the range
+        [left_bound, right_bound), in order.
+        """
+        if (
+            left_bound is not None
+            and right_bound is not None
+            and (left_bound > right_bound)
+        ):
+            left_bound, right_bound = right_bound, left_bound
+
+        if len(self._chunks) == 0:
+            return
+
+        if left_bound is not None:
+            first, first_i = self._lower_pos(left_bound)
+            if first is None:
+                return
+        else:
+            first, first_i = (self._chunks[0], 0)
+
+        if right_bound is not None:
+            last, last_i = self._upper_pos(right_bound)
+            if last is None:
+                return
+        else:
+            last = self._chunks[-1]
+            last_i = len(last.keys) - 1
+
+        if first is last and first_i > last_i:
+            return
+        elif first is not last and last.keys[last_i] < first.keys[first_i]:
+            return
+
+        if not reverse:
+            chunk = first
+            while chunk is not last:
+                yield (chunk, first_i, len(chunk.keys))
+                first_i = 0
+                chunk = chunk.next
+            yield (chunk, first_i, last_i + 1)
+        else:
+            chunk = last
+            while chunk is not first:
+                yield (chunk, 0, last_i + 1)
+                chunk = chunk.prev
+                last_i = len(chunk.keys) - 1
+            yield (chunk, first_i, last_i + 1)
+
+    def items(
+        self,
+        left_bound: Optional[K] = None,
+        right_bound: Optional[K] = None,
+        reverse: bool = False,
+    ) -> Iterator[Tuple[K, V]]:
+        for chunk, a, b in self._iter_slices(left_bound, right_bound, reverse):
+            keys = chunk.keys[a:b]
+            vals = [n.value for n in chunk.nodes[a:b]]
+            if reverse:
+                keys.reverse()
+                vals.reverse()
+            yield from zip(keys, vals)
+
+    def keys(
+        self,
+        left_bound: Optional[K] = None,
+        right_bound: Optional[K] = None,
+        reverse: bool = False,
+    ) -> Iterator[K]:
+        for chunk, a, b in self._iter_slices(left_bound, right_bound, reverse):
+            if reverse:
+                yield from reversed(chunk.keys[a:b])
+            else:
+                yield from chunk.keys[a:b]
+
+    def values(
+        self,
+        left_bound: Optional[K] = None,
+        right_bound: Optional[K] = None,
+        reverse: bool = False,
+    ) -> Iterator[V]:
+        for chunk, a, b in self._iter_slices(left_bound, right_bound, reverse):
+            if reverse:
+                for node in reversed(chunk.nodes[a:b]):
+                    yield node.value
+            else:
+                for node in chunk.nodes[a:b]:
+                    yield node.value
+
+    def keys_list(
+        self, left_bound: Optional[K] = None, right_bound: Optional[K] = None
+    ) -> List[K]:
+        """Retrieve all keys in the range [left_bound, right_bound) as a list.
+
+        This copies whole chunk slices at once, so it is much faster than
+        building a list from `keys()`.
+        """
+        ret = []
+        for chunk, a, b in self._iter_slices(left_bound, right_bound, False):
+            ret.extend(chunk.keys[a:b])
+        return ret
+
+    def values_list(
+        self, left_bound: Optional[K] = None, right_bound: Optional[K] = None
+    ) -> List[V]:
+        """Retrieve all values with keys in the range [left_bound, right_bound)
+        as a list.
+        """
+        ret = []
+        for chunk, a, b in self._iter_slices(left_bound, right_bound, False):
+            ret.extend([node.value for node in chunk.nodes[a:b]])
+        return ret
+
+    def keys_array(
+        self,
+        left_bound: Optional[K] = None,
+        right_bound: Optional[K] = None,
+        dtype: Any = None,
+    ) -> np.ndarray:
+        """Retrieve all keys in the range [left_bound, right_bound) as a numpy
+        array, for vectorized processing.
+        """
+        return np.array(self.keys_list(left_bound, right_bound), dtype=dtype)
+
+    def print(self) -> str:
+        if len(self._chunks) > 0:
+            return "\n".join(" ".join(map(str, c.keys)) for c in self._chunks) + "\n"
+        else:
+            return "<empty list>"
+
+    def __getitem__(self, key: K) -> V:
+        return self.get_node(key).value
+
+    def __setitem__(self, key: K, val: V):
+        self.insert(key, val)
+
+    def __delitem__(self, key: K):
+        self.delete_node(self.get_node(key))
+
+    def __contains__(self, key: K) -> bool:
+        try:
+            self.get_node(key)
+            return True
+        except KeyError:
+            return False
+
+    def __iter__(self) -> Iterator[K]:
+        return self.keys()
+
+    def __reversed__(self) -> Iterator[K]:
+        return self.keys(reverse=True)
+
+    def __len__(self) -> int:
+        return self._len
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from abc import ABC, abstractmethod
 from typing import Union
 
 from . import base
@@ -11,12 +12,32 @@ class SentinelNode(object):
         self._next = self
 
 
-class TreeIter(object):
+class TreeIter(ABC):
+    """Iterator over a range of tree nodes.
+
+    Constructing a `TreeIter` gives an instance of one of the specialized
+    subclasses below, which implement `__next__` for a given mode and
+    direction.
+    """
+
     KEYS = 0
     VALS = 1
     ITEMS = 2
     NODES = 3
 
+    def __new__(
+        cls,
+        mode: int,
+        lower: Union[SentinelNode, base.TreeNode],
+        upper: Union[SentinelNode, base.TreeNode],
+        rev: bool,
+    ):
+        # Dispatch to an iterator class specialized for the given mode and
+        # direction, so that __next__ doesn't need to check either per step:
+        if cls is TreeIter:
+            cls = _ITER_CLASSES[mode][bool(rev)]
+        return super().__new__(cls)
+
     def __init__(
         self,
         mode: int,
@@ -29,7 +50,7 @@ class TreeIter(object):
         self._cur: Union[None, SentinelNode, base.TreeNode] = None
         self._end: Union[None, SentinelNode, base.TreeNode] = None
 
-        if lower._prev != upper:
+        if lower._prev is not upper:
             if not rev:
                 self._cur = lower
                 self._end = upper
@@ -43,26 +64,115 @@ class TreeIter(object):
     def __reversed__(self) -> TreeIter:
         return TreeIter(self._mode, self._end, self._cur, not self._rev)
 
+    @abstractmethod
+    def __next__(self):
+        """Return the next key, value, item or node in the range."""
+
+
+# Specialized iterators. Each one steps in a single direction and returns a
+# single kind of result.
+
+
+class _ForwardKeyIter(TreeIter):
     def __next__(self):
-        if self._cur is None:
+        cur = self._cur
+        if cur is None:
             raise StopIteration()
+        elif cur is self._end:
+            self._cur = self._end = None
+        else:
+            self._cur = cur._next
+        return cur._key
 
-        cur_node = self._cur
 
-        if self._cur != self._end:
-            if not self._rev:
-                self._cur = self._cur._next
-            else:
-                self._cur = self._cur._prev
+class _ReverseKeyIter(TreeIter):
+    def __next__(self):
+        cur = self._cur
+        if cur is None:
+            raise StopIteration()
+        elif cur is self._end:
+            self._cur = self._end = None
+        else:
+            self._cur = cur._prev
+        return cur._key
+
+
+class _ForwardValueIter(TreeIter):
+    def __next__(self):
+        cur = self._cur
+        if cur is None:
+            raise StopIteration()
+        elif cur is self._end:
+            self._cur = self._end = None
         else:
-            self._cur = None
-            self._end = None
-
-        if self._mode == TreeIter.KEYS:
-            return cur_node.key
-        elif self._mode == TreeIter.VALS:
-            return cur_node.value
-        elif self._mode == TreeIter.ITEMS:
-            return (cur_node.key, cur_node.value)
-        elif self._mode == TreeIter.NODES:
-            return cur_node
+            self._cur = cur._next
+        return cur.value
+
+
+class _ReverseValueIter(TreeIter):
+    def __next__(self):
+        cur = self._cur
+        if cur is None:
+            raise StopIteration()
+        elif cur is self._end:
+            self._cur = self._end = None
+        else:
+            self._cur = cur._prev
+        return cur.value
+
+
+class _ForwardItemIter(TreeIter):
+    def __next__(self):
+        cur = self._cur
+        if cur is None:
+            raise StopIteration()
+        elif cur is self._end:
+            self._cur = self._end = None
+        else:
+            self._cur = cur._next
+        return (cur._key, cur.value)
+
+
+class _ReverseItemIter(TreeIter):
+    def __next__(self):
+        cur = self._cur
+        if cur is None:
+            raise StopIteration()
+        elif cur is self._end:
+            self._cur = self._end = None
+        else:
+            self._cur = cur._prev
+        return (cur._key, cur.value)
+
+
+class _ForwardNodeIter(TreeIter):
+    def __next__(self):
+        cur = self._cur
+        if cur is None:
+            raise StopIteration()
+        elif cur is self._end:
+            self._cur = self._end = None
+        else:
+            self._cur = cur._next
+        return cur
+
+
+class _ReverseNodeIter(TreeIter):
+    def __next__(self):
+        cur = self._cur
+        if cur is None:
+            raise StopIteration()
+        elif cur is self._end:
+            self._cur = self._end = None
+        else:
+            self._cur = cur._prev
+        return cur
+
+
+# Indexed by mode, then by whether the iterator runs in reverse:
+_ITER_CLASSES = {
+    TreeIter.KEYS: (_ForwardKeyIter, _ReverseKeyIter),
+    TreeIter.VALS: (_ForwardValueIter, _ReverseValueIter),
+    TreeIter.ITEMS: (_ForwardItemIter, _ReverseItemIter),
+    TreeIter.NODES: (_ForwardNodeIter, _ReverseNodeIter),
+}
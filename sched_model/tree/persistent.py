@@ -0,0 +1,473 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any, Generic, TypeVar, Optional, Iterator, Iterable, List, Tuple
+
+import numpy as np
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class PersistentNode(Generic[K, V]):
+    """An immutable AVL tree node.
+
+    Nodes are never modified once created, so any number of tree versions can
+    share them.
+    """
+
+    __slots__ = ("key", "value", "left", "right", "height", "size")
+
+    def __init__(
+        self,
+        key: K,
+        value: V,
+        left: Optional[PersistentNode[K, V]],
+        right: Optional[PersistentNode[K, V]],
+    ):
+        self.key: K = key
+        self.value: V = value
+        self.left: Optional[PersistentNode[K, V]] = left
+        self.right: Optional[PersistentNode[K, V]] = right
+        self.height: int = max(_height(left), _height(right)) + 1
+        self.size: int = _size(left) + _size(right) + 1
+
+
+def _height(node: Optional[PersistentNode]) -> int:
+    return node.height if node is not None else 0
+
+
+def _size(node: Optional[PersistentNode]) -> int:
+    return node.size if node is not None else 0
+
+
+def _balance(
+    left: Optional[PersistentNode[K, V]],
+    key: K,
+    value: V,
+    right: Optional[PersistentNode[K, V]],
+) -> PersistentNode[K, V]:
+    """Build a node from subtrees whose heights differ by at most 2,
+    rotating as needed to restore the AVL balance constraint.
+    """
+    lh = _height(left)
+    rh = _height(right)
+
+    if lh > rh + 1:
+        if _height(left.left) >= _height(left.right):
+            return PersistentNode(
+                left.key,
+                left.value,
+                left.left,
+                PersistentNode(key, value, left.right, right),
+            )
+        else:
+            lr = left.right
+            return PersistentNode(
+                lr.key,
+                lr.value,
+                PersistentNode(left.key, left.value, left.left, lr.left),
+                PersistentNode(key, value, lr.right, right),
+            )
+    elif rh > lh + 1:
+        if _height(right.right) >= _height(right.left):
+            return PersistentNode(
+                right.key,
+                right.value,
+                PersistentNode(key, value, left, right.left),
+                right.right,
+            )
+        else:
+            rl = right.left
+            return PersistentNode(
+                rl.key,
+                rl.value,
+                PersistentNode(key, value, left, rl.left),
+                PersistentNode(right.key, right.value, rl.right, right.right),
+            )
+
+    return PersistentNode(key, value, left, right)
+
+
+def _join3(
+    left: Optional[PersistentNode[K, V]],
+    key: K,
+    value: V,
+    right: Optional[PersistentNode[K, V]],
+) -> PersistentNode[K, V]:
+    """Join two trees of any height with a middle item, where all keys in
+    `left` are less than `key` and all keys in `right` are greater.
+    """
+    lh = _height(left)
+    rh = _height(right)
+    if lh > rh + 1:
+        return _balance(
+            left.left, left.key, left.value, _join3(left.right, key, value, right)
+        )
+    elif rh > lh + 1:
+        return _balance(
+            _join3(left, key, value, right.left), right.key, right.value, right.right
+        )
+    return PersistentNode(key, value, left, right)
+
+
+def _pop_min(
+    node: PersistentNode[K, V],
+) -> Tuple[PersistentNode[K, V], Optional[PersistentNode[K, V]]]:
+    """Returns the minimum node and the rest of the tree."""
+    if node.left is None:
+        return (node, node.right)
+    min_node, rest = _pop_min(node.left)
+    return (min_node, _balance(rest, node.key, node.value, node.right))
+
+
+def _join2(
+    left: Optional[PersistentNode[K, V]], right: Optional[PersistentNode[K, V]]
+) -> Optional[PersistentNode[K, V]]:
+    if right is None:
+        return left
+    mid, right = _pop_min(right)
+    return _join3(left, mid.key, mid.value, right)
+
+
+def _split(
+    node: Optional[PersistentNode[K, V]], key: K
+) -> Tuple[Optional[PersistentNode[K, V]], Optional[PersistentNode[K, V]]]:
+    """Split a tree into trees with keys less than and greater than or equal to
+    `key`, respectively.
+    """
+    if node is None:
+        return (None, None)
+    elif key <= node.key:
+        left, right = _split(node.left, key)
+        return (left, _join3(right, node.key, node.value, node.right))
+    else:
+        left, right = _split(node.right, key)
+        return (_join3(node.left, node.key, node.value, left), right)
+
+
+def _insert(
+    node: Optional[PersistentNode[K, V]], key: K, value: V
+) -> PersistentNode[K, V]:
+    if node is None:
+        return PersistentNode(key, value, None, None)
+    elif key == node.key:
+        return PersistentNode(key, value, node.left, node.right)
+    elif key < node.key:
+        return _balance(
+            _insert(node.left, key, value), node.key, node.value, node.right
+        )
+    else:
+        return _balance(
+            node.left, node.key, node.value, _insert(node.right, key, value)
+        )
+
+
+def _delete(node: Optional[PersistentNode[K, V]], key: K) -> Optional[PersistentNode]:
+    if node is None:
+        raise KeyError(key)
+    elif key == node.key:
+        return _join2(node.left, node.right)
+    elif key < node.key:
+        return _balance(_delete(node.left, key), node.key, node.value, node.right)
+    else:
+        return _balance(node.left, node.key, node.value, _delete(node.right, key))
+
+
+def _build(items: List[Tuple[K, V]], lo: int, hi: int) -> Optional[PersistentNode]:
+    if lo >= hi:
+        return None
+    mid = (lo + hi) // 2
+    key, value = items[mid]
+    return PersistentNode(
+        key, value, _build(items, lo, mid), _build(items, mid + 1, hi)
+    )
+
+
+class PersistentTree(Generic[K, V], Mapping):
+    """An immutable ordered map, implemented as a path-copying AVL tree.
+
+    Operations that would modify the tree instead return a new version of it,
+    copying only the O(log n) nodes on the paths they touch; all other nodes are
+    shared with the original tree. This makes it cheap to keep many versions
+    of a tree alive at once, for instance to evaluate several alternatives that
+    start from the same state.
+
+    Values are shared between versions as-is: storing mutable values and
+    modifying them in place would change every version that contains them.
+
+    This is a standalone data structure: it isn't one of the
+    `TIMELINE_BACKENDS`, and neither `Timeline` nor `System.fork` uses it.
+    Timelines modify their events in place and keep handles to the nodes
+    holding them, neither of which survives path copying, so they copy
+    their ordered map in one pass when forked instead.
+    """
+
+    __slots__ = ("_root",)
+
+    def __init__(self, root: Optional[PersistentNode[K, V]] = None):
+        self._root: Optional[PersistentNode[K, V]] = root
+
+    @classmethod
+    def from_sorted(cls, items: Iterable[Tuple[K, V]]) -> PersistentTree[K, V]:
+        """Build a new tree from items with strictly increasing keys, in O(n)
+        time.
+        """
+        items = list(items)
+        for i in range(1, len(items)):
+            if not (items[i - 1][0] < items[i][0]):
+                raise ValueError("keys must be strictly increasing")
+        return cls(_build(items, 0, len(items)))
+
+    def insert(self, key: K, val: V) -> PersistentTree[K, V]:
+        """Return a version of this tree with `key` set to `val`."""
+        return self.__class__(_insert(self._root, key, val))
+
+    def delete(self, key: K) -> PersistentTree[K, V]:
+        """Return a version of this tree without `key`.
+
+        Raises KeyError if the tree does not contain the given key.
+        """
+        return self.__class__(_delete(self._root, key))
+
+    def delete_range(self, lo: K, hi: K) -> PersistentTree[K, V]:
+        """Return a version of this tree without any keys in the range [lo, hi).
+
+        This runs in O(log n) time.
+        """
+        if not (lo < hi):
+            return self
+        left, rest = _split(self._root, lo)
+        _, right = _split(rest, hi)
+        return self.__class__(_join2(left, right))
+
+    def split(self, key: K) -> Tuple[PersistentTree[K, V], PersistentTree[K, V]]:
+        """Split this tree into trees with keys less than and greater than or
+        equal to `key`, respectively, in O(log n) time.
+        """
+        left, right = _split(self._root, key)
+        return (self.__class__(left), self.__class__(right))
+
+    def join(self, other: PersistentTree[K, V]) -> PersistentTree[K, V]:
+        """Concatenate this tree with `other`, whose keys must all be greater
+        than the keys in this tree, in O(log n) time.
+        """
+        if self._root is not None and other._root is not None:
+            if not (self.max()[0] < other.min()[0]):
+                raise ValueError("keys in joined tree must be greater than all keys")
+        return self.__class__(_join2(self._root, other._root))
+
+    def _find_node(self, key: K) -> Optional[PersistentNode[K, V]]:
+        node = self._root
+        while node is not None:
+            if key == node.key:
+                return node
+            elif key < node.key:
+                node = node.left
+            else:
+                node = node.right
+        return None
+
+    def min(self) -> Tuple[K, V]:
+        node = self._root
+        if node is None:
+            raise IndexError("Tree is empty")
+        while node.left is not None:
+            node = node.left
+        return (node.key, node.value)
+
+    def max(self) -> Tuple[K, V]:
+        node = self._root
+        if node is None:
+            raise IndexError("Tree is empty")
+        while node.right is not None:
+            node = node.right
+        return (node.key, node.value)
+
+    def upper_bound(self, bound: K) -> Optional[Tuple[K, V]]:
+        """Find the item with the greatest key strictly less than `bound`."""
+        ret = None
+        node = self._root
+        while node is not None:
+            if node.key < bound:
+                ret = node
+                node = node.right
+            else:
+                node = node.left
+
+        if ret is None:
+            return None
+        return (ret.key, ret.value)
+
+    def lower_bound(self, bound: K) -> Optional[Tuple[K, V]]:
+        """Find the item with the least key greater than or equal to `bound`."""
+        ret = None
+        node = self._root
+        while node is not None:
+            if node.key < bound:
+                node = node.right
+            else:
+                ret = node
+                node = node.left
+
+        if ret is None:
+            return None
+        return (ret.key, ret.value)
+
+    def select(self, index: int) -> Tuple[K, V]:
+        """Retrieve the item at the given position in key order.
+
+        Negative indices count from the end of the tree, as with lists. This
+        runs in O(log n) time.
+        """
+        n = len(self)
+        if index < 0:
+            index += n
+        if not (0 <= index < n):
+            raise IndexError("tree index out of range")
+
+        node = self._root
+        while True:
+            left_size = _size(node.left)
+            if index < left_size:
+                node = node.left
+            elif index == left_size:
+                return (node.key, node.value)
+            else:
+                index -= left_size + 1
+                node = node.right
+
+    def rank(self, key: K) -> int:
+        """Count the items with keys strictly less than `key`, in O(log n)
+        time.
+        """
+        ret = 0
+        node = self._root
+        while node is not None:
+            if node.key < key:
+                ret += _size(node.left) + 1
+                node = node.right
+            else:
+                node = node.left
+        return ret
+
+    def _iter_nodes(
+        self, left_bound: Optional[K], right_bound: Optional[K], reverse: bool
+    ) -> Iterator[PersistentNode[K, V]]:
+        if (
+            left_bound is not None
+            and right_bound is not None
+            and (left_bound > right_bound)
+        ):
+            left_bound, right_bound = right_bound, left_bound
+
+        # Without parent or thread pointers, iterate using an explicit stack
+        # of ancestors:
+        stack = []
+        node = self._root
+        if not reverse:
+            while node is not None:
+                if left_bound is not None and node.key < left_bound:
+                    node = node.right
+                else:
+                    stack.append(node)
+                    node = node.left
+
+            while len(stack) > 0:
+                node = stack.pop()
+                if right_bound is not None and not (node.key < right_bound):
+                    return
+                yield node
+
+                node = node.right
+                while node is not None:
+                    stack.append(node)
+                    node = node.left
+        else:
+            while node is not None:
+                if right_bound is not None and not (node.key < right_bound):
+                    node = node.left
+                else:
+                    stack.append(node)
+                    node = node.right
+
+            while len(stack) > 0:
+                node = stack.pop()
+                if left_bound is not None and node.key < left_bound:
+                    return
+                yield node
+
+                node = node.left
+                while node is not None:
+                    stack.append(node)
+                    node = node.right
+
+    def items(
+        self,
+        left_bound: Optional[K] = None,
+        right_bound: Optional[K] = None,
+        reverse: bool = False,
+    ) -> Iterator[Tuple[K, V]]:
+        for node in self._iter_nodes(left_bound, right_bound, reverse):
+            yield (node.key, node.value)
+
+    def keys(
+        self,
+        left_bound: Optional[K] = None,
+        right_bound: Optional[K] = None,
+        reverse: bool = False,
+    ) -> Iterator[K]:
+        for node in self._iter_nodes(left_bound, right_bound, reverse):
+            yield node.key
+
+    def values(
+        self,
+        left_bound: Optional[K] = None,
+        right_bound: Optional[K] = None,
+        reverse: bool = False,
+    ) -> Iterator[V]:
+        for node in self._iter_nodes(left_bound, right_bound, reverse):
+            yield node.value
+
+    def keys_list(
+        self, left_bound: Optional[K] = None, right_bound: Optional[K] = None
+    ) -> List[K]:
+        """Retrieve all keys in the range [left_bound, right_bound) as a list."""
+        return list(self.keys(left_bound, right_bound))
+
+    def values_list(
+        self, left_bound: Optional[K] = None, right_bound: Optional[K] = None
+    ) -> List[V]:
+        """Retrieve all values with keys in the range [left_bound, right_bound)
+        as a list.
+        """
+        return list(self.values(left_bound, right_bound))
+
+    def keys_array(
+        self,
+        left_bound: Optional[K] = None,
+        right_bound: Optional[K] = None,
+        dtype: Any = None,
+    ) -> np.ndarray:
+        """Retrieve all keys in the range [left_bound, right_bound) as a numpy
+        array, for vectorized processing.
+        """
+        return np.array(self.keys_list(left_bound, right_bound), dtype=dtype)
+
+    def __getitem__(self, key: K) -> V:
+        node = self._find_node(key)
+        if node is None:
+            raise KeyError(key)
+        return node.value
+
+    def __contains__(self, key: K) -> bool:
+        return self._find_node(key) is not None
+
+    def __iter__(self) -> Iterator[K]:
+        return self.keys()
+
+    def __reversed__(self) -> Iterator[K]:
+        return self.keys(reverse=True)
+
+    def __len__(self) -> int:
+        return _size(self._root)
@@ -1,16 +1,118 @@
 from __future__ import annotations
 
-from typing import TypeVar, Optional
+from typing import Any, TypeVar, Optional, Tuple
 
-from .base import Tree, TreeNode
+from .base import Aggregate, Tree, TreeNode
 
 K = TypeVar("K")
 V = TypeVar("V")
 
 
 class RBTree(Tree):
-    def __init__(self):
-        super().__init__(RBNode)
+    def __init__(
+        self,
+        aggregate: Optional[Aggregate[K, V, Any]] = None,
+        order_stats: bool = False,
+    ):
+        super().__init__(RBNode, aggregate, order_stats)
+
+    # For red-black trees, the rank of a subtree is its black height (the
+    # number of black nodes on any path from its root down to a leaf).
+
+    def _rank(self, node: Optional[RBNode[K, V]]) -> int:
+        rank = 0
+        while node is not None:
+            if not node._red:
+                rank += 1
+            node = node._left
+        return rank
+
+    def _child_rank(self, node: RBNode[K, V], rank: int, left: bool) -> int:
+        if node._red:
+            return rank
+        return rank - 1
+
+    def _init_built_node(
+        self,
+        node: RBNode[K, V],
+        depth: int,
+        max_depth: int,
+        left_height: int,
+        right_height: int,
+    ):
+        # All levels above the last (possibly incomplete) level are full, so
+        # coloring only the last level red keeps all black heights equal:
+        node._red = (depth == max_depth) and (depth > 0)
+
+    def _set_root(self, node: Optional[RBNode[K, V]]):
+        super()._set_root(node)
+        if node is not None:
+            node._red = False
+
+    def _join3(
+        self,
+        left: Optional[RBNode[K, V]],
+        left_rank: int,
+        mid: RBNode[K, V],
+        right: Optional[RBNode[K, V]],
+        right_rank: int,
+    ) -> Tuple[RBNode[K, V], int]:
+        if left is not None and left._red:
+            left._red = False
+            left_rank += 1
+
+        if right is not None and right._red:
+            right._red = False
+            right_rank += 1
+
+        if left_rank == right_rank:
+            mid._red = False
+            mid._set_left_child(left)
+            mid._set_right_child(right)
+            if mid._aug is not None:
+                mid._refresh()
+            return (mid, left_rank + 1)
+
+        # Attach the middle node (as a red node) to the taller tree, in place of
+        # a black node along its inner spine with the same black height as the
+        # shorter tree, then fix up the tree as if the middle node was inserted:
+        mid._red = True
+        if left_rank > right_rank:
+            root = left
+            parent = None
+            cur = left
+            cur_rank = left_rank
+            while cur_rank != right_rank or (cur is not None and cur._red):
+                if not cur._red:
+                    cur_rank -= 1
+                parent = cur
+                cur = cur._right
+
+            mid._set_left_child(cur)
+            mid._set_right_child(right)
+            parent._set_right_child(mid)
+        else:
+            root = right
+            parent = None
+            cur = right
+            cur_rank = right_rank
+            while cur_rank != left_rank or (cur is not None and cur._red):
+                if not cur._red:
+                    cur_rank -= 1
+                parent = cur
+                cur = cur._left
+
+            mid._set_left_child(left)
+            mid._set_right_child(cur)
+            parent._set_left_child(mid)
+
+        if mid._aug is not None:
+            mid._refresh_path()
+        grew = mid._repair_insert()
+        while root._parent is not None:
+            root = root._parent
+
+        return (root, max(left_rank, right_rank) + (1 if grew else 0))
 
 
 class RBNode(TreeNode):
@@ -18,14 +120,19 @@ class RBNode(TreeNode):
         super().__init__(*args, **kwargs)
         self._red = self._parent is not None
 
-    def _repair_insert(self):
+    def _repair_insert(self) -> bool:
+        """Restore red-black properties after this (red) node was inserted.
+
+        Returns whether the black height of the whole tree increased.
+        """
         if self._parent is None:
+            grew = self._red
             self._red = False
-            return
+            return grew
 
         parent: RBNode[K, V] = self._parent
         if not parent._red:
-            return
+            return False
 
         uncle: RBNode[K, V] = parent._sibling()
         grandparent: RBNode[K, V] = parent._parent
@@ -42,6 +149,7 @@ class RBNode(TreeNode):
         parent._rotate()
         parent._red = False
         grandparent._red = True
+        return False
 
     def _delete_single_child(self):
         replace_with = None
@@ -54,7 +162,10 @@ class RBNode(TreeNode):
                 self._right._red = False
             else:
                 self._repair_delete()
-        self._unlink(replace_with)
+        return self._unlink(replace_with)
+
+    def _swap_balance(self, other: RBNode[K, V]):
+        self._red, other._red = other._red, self._red
 
     def _repair_delete(self):
         if self._parent is None:
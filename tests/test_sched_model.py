@@ -1,4 +1,5 @@
 from hypothesis import given, note, assume, strategies as st
+import pytest
 
 from sched_model import (
     System,
@@ -7,12 +8,39 @@ from sched_model import (
     easy_backfill,
     conservative_backfill,
     hybrid_backfill,
+    SchedPolicy,
+    DenseTimeline,
+    ProfileTimeline,
 )
+from sched_model.checkpoint import (
+    load_checkpoint,
+    run_with_checkpoints,
+    save_checkpoint,
+)
+from sched_model.batch import can_run_batch, run_batch
+from sched_model.fastsim import can_run_fcfs
+from sched_model.hierarchy import HierarchicalModel, steal_from_longest_queue
+from sched_model.replication import confidence_interval, replicate, t_critical
+from sched_model.system import (
+    JobHistory,
+    profile_resource_time,
+    select_timeline_backend,
+)
+from sched_model.tree import SortedChunkList
+import functools
+import io
+import os
+import tempfile
 import numpy as np
 
 job_val = st.integers(min_value=1, max_value=np.iinfo(np.int).max)
 job_strategy = st.lists(st.tuples(job_val, job_val))
 
+# Dense timelines need bounded time limits:
+short_job_strategy = st.lists(
+    st.tuples(st.integers(min_value=1, max_value=50), job_val)
+)
+
 
 def setup_system(jobs):
     system_resources = max((j[1] for j in jobs), default=1)
@@ -64,3 +92,835 @@ def test_conservative(jobs):
 def test_hybrid(jobs, max_backfill):
     run_system(setup_system(jobs), hybrid_backfill(max_backfill))
 
+
+class RecordingPolicy(SchedPolicy):
+    def __init__(self, inner):
+        self.inner = inner
+        self.events = []
+        self.pending = set()
+
+    def __call__(self, system: System):
+        self.inner(system)
+
+    def on_enqueue(self, system, job):
+        self.events.append(("enqueue", job.job_id))
+        self.pending.add(job.job_id)
+
+    def on_start(self, system, job):
+        self.events.append(("start", job.job_id))
+        self.pending.discard(job.job_id)
+
+    def on_end(self, system, job):
+        self.events.append(("end", job.job_id))
+
+    def on_reserve(self, system, job):
+        self.events.append(("reserve", job.job_id))
+
+    def on_reserve_invalidated(self, system, job):
+        self.events.append(("invalidate", job.job_id))
+
+    def on_withdraw(self, system, job):
+        self.events.append(("withdraw", job.job_id))
+        self.pending.discard(job.job_id)
+
+
+@given(job_strategy)
+def test_policy_hooks(jobs):
+    system = setup_system(jobs)
+    policy = RecordingPolicy(conservative_backfill)
+    system.run(policy)
+
+    assert system.policy is policy
+    assert len(policy.pending) == 0
+    assert [e for e in policy.events if e[0] == "enqueue"] == [
+        ("enqueue", i) for i in range(len(jobs))
+    ]
+    assert sorted(e[1] for e in policy.events if e[0] == "start") == list(
+        range(len(jobs))
+    )
+    assert sorted(e[1] for e in policy.events if e[0] == "end") == list(
+        range(len(jobs))
+    )
+
+    # Each reservation must be resolved by exactly one start or invalidation
+    # before the job is reserved or started again:
+    for job_id in range(len(jobs)):
+        job_events = [
+            e[0]
+            for e in policy.events
+            if e[1] == job_id and e[0] in ("reserve", "start", "invalidate")
+        ]
+        assert job_events[-1] == "start"
+        assert job_events.count("start") == 1
+        for cur, nxt in zip(job_events, job_events[1:]):
+            if cur == "reserve":
+                assert nxt in ("start", "invalidate")
+            else:
+                assert nxt == "reserve"
+
+
+@pytest.mark.parametrize("backend", ["avl", "chunked", "array", "auto"])
+@given(job_strategy)
+def test_timeline_backends(backend, jobs):
+    def run_with(backend):
+        system_resources = max((j[1] for j in jobs), default=1)
+        system = System(
+            np.array([system_resources]),
+            timeline_backend=backend,
+            expected_queue_depth=len(jobs),
+        )
+        for tm, resources in jobs:
+            system.enqueue_job(Job(tm, np.array([resources])))
+        system.run(conservative_backfill)
+
+        return (
+            [(j.start_time, j.end_time) for j in system.finished_jobs],
+            [(t, tuple(d.resources)) for t, d in system.iter_timeline()],
+        )
+
+    assert run_with(backend) == run_with("rb")
+
+
+def test_timeline_backend_selection():
+    assert select_timeline_backend(None, 1) == "rb"
+    assert select_timeline_backend(1, 1) == "rb"
+    assert select_timeline_backend(100000, 1) == "chunked"
+    assert select_timeline_backend(32, 1) == "chunked"
+    assert select_timeline_backend(32, 16) == "rb"
+
+    system = System(np.array([1]), timeline_backend=SortedChunkList)
+    assert isinstance(system._timeline._tree, SortedChunkList)
+
+    with pytest.raises(ValueError):
+        System(np.array([1]), timeline_backend="nonexistent")
+
+    # A timeline type can't be combined with the options for Timeline:
+    with pytest.raises(ValueError):
+        System(np.array([1]), timeline_backend="avl", timeline=DenseTimeline)
+    with pytest.raises(ValueError):
+        System(np.array([1]), expected_queue_depth=100, timeline=DenseTimeline)
+
+
+@given(job_strategy, st.one_of(st.none(), st.integers(min_value=0, max_value=10)))
+def test_history_truncation(jobs, history_window):
+    def setup(history_window):
+        system_resources = max((j[1] for j in jobs), default=1)
+        system = System(np.array([system_resources]), history_window=history_window)
+        for tm, resources in jobs:
+            system.enqueue_job(Job(tm, np.array([resources])))
+        return system
+
+    full = setup(None)
+    compacted = setup(history_window)
+
+    while True:
+        more = full.tick(easy_backfill)
+        assert compacted.tick(easy_backfill) == more
+        assert compacted.cur_time == full.cur_time
+
+        # The retained part of the timeline must be unaffected by compaction:
+        cutoff = compacted.cur_time - (history_window or 0)
+        expected = [
+            (t, tuple(d.resources))
+            for t, d in full._timeline.iter_resources(cutoff, copy=False)
+        ]
+        actual = [
+            (t, tuple(d.resources))
+            for t, d in compacted._timeline.iter_resources(cutoff, copy=False)
+        ]
+        assert actual == expected
+
+        if history_window is not None:
+            assert all(t >= cutoff for t, _ in compacted.iter_timeline())
+        if not more:
+            break
+
+    assert [(j.start_time, j.end_time) for j in compacted.finished_jobs] == [
+        (j.start_time, j.end_time) for j in full.finished_jobs
+    ]
+
+
+@given(short_job_strategy, st.integers(min_value=1, max_value=64))
+def test_dense_timeline(jobs, horizon):
+    def run_with(**kwargs):
+        system_resources = max((j[1] for j in jobs), default=1)
+        system = System(np.array([system_resources]), **kwargs)
+        for tm, resources in jobs:
+            system.enqueue_job(Job(tm, np.array([resources])))
+        system.run(conservative_backfill)
+
+        return [(j.start_time, j.end_time) for j in system.finished_jobs]
+
+    dense = functools.partial(DenseTimeline, horizon=horizon)
+    assert run_with(timeline=dense) == run_with()
+    assert run_with(timeline=dense, history_window=None) == run_with()
+
+
+@given(
+    st.lists(
+        st.tuples(st.integers(min_value=1, max_value=np.iinfo(np.int32).max), job_val)
+    ),
+    st.integers(min_value=2, max_value=16),
+    st.sampled_from([easy_backfill, conservative_backfill]),
+)
+def test_profile_timeline(jobs, capacity, policy):
+    def run_with(**kwargs):
+        system_resources = max((j[1] for j in jobs), default=1)
+        system = System(np.array([system_resources]), history_window=None, **kwargs)
+        for tm, resources in jobs:
+            system.enqueue_job(Job(tm, np.array([resources])))
+        system.run(policy)
+
+        return (
+            [(j.start_time, j.end_time) for j in system.finished_jobs],
+            [(t, tuple(d.resources)) for t, d in system.iter_timeline()],
+        )
+
+    profile = functools.partial(ProfileTimeline, capacity=capacity)
+    assert run_with(timeline=profile) == run_with()
+
+
+@given(
+    st.lists(
+        st.tuples(
+            st.integers(min_value=1, max_value=50),
+            st.integers(min_value=1, max_value=50),
+            st.integers(min_value=1, max_value=10),
+        )
+    ),
+    st.integers(min_value=2, max_value=8),
+    st.sampled_from([fcfs, easy_backfill, conservative_backfill]),
+)
+def test_dense_timeline_quantum(jobs, quantum, policy):
+    class RuntimeJob(Job):
+        def __init__(self, timelimit, runtime, resources):
+            super().__init__(timelimit, resources)
+            self.runtime = runtime
+
+        def compute_actual_runtime(self, system):
+            return self.runtime
+
+    system = System(
+        np.array([10]), timeline=functools.partial(DenseTimeline, quantum=quantum)
+    )
+    for tm, runtime, resources in jobs:
+        system.enqueue_job(RuntimeJob(tm, runtime, np.array([resources])))
+    system.run(policy)
+
+    finished = list(system.finished_jobs)
+    assert len(finished) == len(jobs)
+
+    for t in set(j.start_time for j in finished):
+        used = sum(
+            j.resources.resources[0] for j in finished if j.start_time <= t < j.end_time
+        )
+        assert used <= 10
+
+
+@given(
+    short_job_strategy,
+    st.sampled_from(
+        [
+            None,
+            ProfileTimeline,
+            DenseTimeline,
+            functools.partial(DenseTimeline, quantum=3),
+        ]
+    ),
+)
+def test_earliest_start_times(jobs, timeline):
+    system_resources = max((j[1] for j in jobs), default=1)
+    system = System(np.array([system_resources]), timeline=timeline)
+    for tm, resources in jobs:
+        system.enqueue_job(Job(tm, np.array([resources])))
+
+    while True:
+        pending = list(system.pending_jobs)
+        expected = [
+            system._timeline.find_schedulable_time(j, system.cur_time, True)
+            for j in pending
+        ]
+        assert (
+            system.find_earliest_start_times(
+                (j.resources, j.timelimit) for j in pending
+            )
+            == expected
+        )
+
+        if not system.tick(easy_backfill):
+            break
+
+
+@given(
+    st.lists(
+        st.tuples(
+            st.integers(min_value=1, max_value=50),
+            st.integers(min_value=1, max_value=1000),
+        )
+    ),
+    st.sampled_from([None, ProfileTimeline, DenseTimeline]),
+    st.one_of(st.none(), st.integers(min_value=0, max_value=10)),
+    st.lists(st.tuples(st.integers(0, 500), st.integers(0, 500))),
+)
+def test_resource_time(jobs, timeline, history_window, windows):
+    system_resources = max((j[1] for j in jobs), default=1)
+    system = System(
+        np.array([system_resources]), history_window=history_window, timeline=timeline
+    )
+    for tm, resources in jobs:
+        system.enqueue_job(Job(tm, np.array([resources])))
+    system.run(easy_backfill)
+
+    def expected_used(t0, t1):
+        return sum(
+            j.resources.resources[0]
+            * max(min(j.end_time, t1) - max(j.start_time, t0), 0)
+            for j in system.finished_jobs
+        )
+
+    for t0, t1 in [(0, system.cur_time)] + windows:
+        used = expected_used(t0, t1)
+        assert system.used_resource_time(t0, t1)[0] == used
+        assert system.free_resource_time(t0, t1)[0] == (
+            system_resources * max(t1 - t0, 0) - used
+        )
+        if t1 > t0:
+            assert system.utilization(t0, t1)[0] == pytest.approx(
+                used / (system_resources * (t1 - t0))
+            )
+
+
+@given(
+    st.lists(
+        st.tuples(
+            st.integers(min_value=1, max_value=50),
+            st.integers(min_value=1, max_value=1000),
+        ),
+        max_size=30,
+    ),
+    st.sampled_from(["rb", "avl", "chunked", "array"]),
+    st.lists(st.tuples(st.integers(0, 500), st.integers(0, 500)), min_size=1),
+)
+def test_resource_time_during_run(jobs, backend, windows):
+    # Query the usage between scheduling passes, so that what is read from the
+    # timeline is invalidated by later reservations:
+    system_resources = max((j[1] for j in jobs), default=1)
+    system = System(
+        np.array([system_resources]), timeline_backend=backend, history_window=None
+    )
+    for tm, resources in jobs:
+        system.enqueue_job(Job(tm, np.array([resources])))
+
+    while True:
+        profile = system.export_profile()
+        used = system_resources - profile.free
+        for t0, t1 in windows:
+            expected = profile_resource_time(profile.times, used, t0, t1)
+            assert system.used_resource_time(t0, t1)[0] == expected[0]
+
+        if not system.tick(easy_backfill):
+            break
+
+
+@given(
+    short_job_strategy,
+    st.sampled_from([None, ProfileTimeline, DenseTimeline]),
+    st.one_of(st.none(), st.integers(min_value=0, max_value=10)),
+)
+def test_export(jobs, timeline, history_window):
+    system_resources = max((j[1] for j in jobs), default=1)
+    system = System(
+        np.array([system_resources]), history_window=history_window, timeline=timeline
+    )
+    all_jobs = [Job(tm, np.array([resources])) for tm, resources in jobs]
+    for job in all_jobs:
+        system.enqueue_job(job)
+
+    while True:
+        profile = system.export_profile()
+        events = list(system.iter_timeline())
+        assert profile.times.tolist() == [t for t, _ in events]
+        assert profile.free.tolist() == [list(d.resources) for _, d in events]
+        assert profile.n_start.tolist() == [len(d.start) for _, d in events]
+        assert profile.n_end.tolist() == [len(d.end) for _, d in events]
+        assert profile.n_expired.tolist() == [len(d.expired) for _, d in events]
+
+        # Exporting from the current time on starts at the last breakpoint at
+        # or before it:
+        first = max(np.searchsorted(profile.times, system.cur_time, "right") - 1, 0)
+        partial = system.export_profile(system.cur_time)
+        for full, part in zip(profile, partial):
+            assert np.array_equal(full[first:], part)
+
+        table = system.export_jobs()
+        assert table.job_id.tolist() == list(range(len(all_jobs)))
+        for i, job in enumerate(all_jobs):
+            assert table.state[i] == job.state
+            assert table.start_time[i] == (
+                -1 if job.start_time is None else job.start_time
+            )
+            assert table.end_time[i] == (-1 if job.end_time is None else job.end_time)
+            assert table.deadline[i] == (-1 if job.deadline is None else job.deadline)
+            assert table.timelimit[i] == job.timelimit
+            assert table.resources[i].tolist() == job.resources.resources.tolist()
+
+        if not system.tick(conservative_backfill):
+            break
+
+
+@given(
+    short_job_strategy,
+    st.sampled_from([None, ProfileTimeline, DenseTimeline, "chunked", "array"]),
+    st.integers(min_value=0, max_value=20),
+)
+def test_fork(jobs, timeline, n_ticks):
+    def setup():
+        system_resources = max((j[1] for j in jobs), default=1)
+        if isinstance(timeline, str):
+            system = System(np.array([system_resources]), timeline_backend=timeline)
+        else:
+            system = System(np.array([system_resources]), timeline=timeline)
+        for tm, resources in jobs:
+            system.enqueue_job(Job(tm, np.array([resources])))
+        return system
+
+    def snapshot(system):
+        return (
+            system.cur_time,
+            [a.tolist() for a in system.export_jobs()],
+            [a.tolist() for a in system.export_profile()],
+        )
+
+    def results(system):
+        return sorted(
+            (j.job_id, j.start_time, j.end_time) for j in system.finished_jobs
+        )
+
+    reference = setup()
+    reference.run(conservative_backfill)
+
+    system = setup()
+    for _ in range(n_ticks):
+        system.tick(conservative_backfill)
+
+    before = snapshot(system)
+    fork = system.fork()
+    assert snapshot(fork) == before
+
+    fork.run(conservative_backfill)
+    assert snapshot(system) == before
+    assert results(fork) == results(reference)
+
+    system.run(conservative_backfill)
+    assert results(system) == results(reference)
+
+
+@given(st.lists(st.tuples(st.booleans(), st.integers(min_value=0))))
+def test_job_history(ops):
+    # Check histories and their forks against plain lists. Histories only ever
+    # hold jobs, but any object will do here:
+    histories = [JobHistory()]
+    expected = [[]]
+    for i, (fork, target) in enumerate(ops):
+        target %= len(histories)
+        if fork:
+            histories.append(histories[target].fork())
+            expected.append(list(expected[target]))
+        else:
+            histories[target].append(i)
+            expected[target].append(i)
+
+    for history, items in zip(histories, expected):
+        assert len(history) == len(items)
+        assert list(history) == items
+        assert list(reversed(history)) == items[::-1]
+        assert [history[i] for i in range(-len(items), len(items))] == items * 2
+        assert history[1:-1] == items[1:-1]
+        with pytest.raises(IndexError):
+            history[len(items)]
+
+
+class RuntimeJob(Job):
+    def __init__(self, timelimit, runtime, resources):
+        super().__init__(timelimit, resources)
+        self.runtime = runtime
+
+    def compute_actual_runtime(self, system):
+        return self.runtime
+
+
+runtime_job_strategy = st.lists(
+    st.tuples(
+        st.integers(min_value=1, max_value=50),
+        st.integers(min_value=1, max_value=50),
+        st.integers(min_value=1, max_value=10),
+    )
+)
+
+
+@given(
+    runtime_job_strategy,
+    st.sampled_from(
+        [None, ProfileTimeline, functools.partial(DenseTimeline, quantum=3)]
+    ),
+    st.one_of(st.none(), st.integers(min_value=0, max_value=10)),
+    st.integers(min_value=0, max_value=20),
+    st.booleans(),
+)
+def test_checkpoint(jobs, timeline, history_window, n_ticks, keep_finished):
+    def setup():
+        system = System(
+            np.array([10]), history_window=history_window, timeline=timeline
+        )
+        for tm, runtime, resources in jobs:
+            system.enqueue_job(RuntimeJob(tm, runtime, np.array([resources])))
+        return system
+
+    def results(system):
+        return {j.job_id: (j.start_time, j.end_time) for j in system.finished_jobs}
+
+    reference = setup()
+    reference.run(easy_backfill)
+
+    system = setup()
+    for _ in range(n_ticks):
+        system.tick(easy_backfill)
+
+    rng = np.random.default_rng(0)
+    f = io.BytesIO()
+    save_checkpoint(system, f, rng, keep_finished=keep_finished)
+    expected_draw = rng.random()
+
+    f.seek(0)
+    rng = np.random.default_rng(1)
+    restored = load_checkpoint(f, rng, timeline=timeline)
+    assert rng.random() == expected_draw
+
+    assert restored.cur_time == system.cur_time
+    assert [j.job_id for j in restored.pending_jobs] == [
+        j.job_id for j in system.pending_jobs
+    ]
+    assert [j.job_id for j in restored.reserved_jobs] == [
+        j.job_id for j in system.reserved_jobs
+    ]
+    if keep_finished:
+        assert results(restored) == results(system)
+    else:
+        assert len(restored.finished_jobs) == 0
+
+    finished_before = results(system)
+    restored.run(easy_backfill)
+    assert restored.cur_time == reference.cur_time
+    expected = results(reference)
+    for job_id, times in results(restored).items():
+        assert times == expected[job_id]
+    assert len(results(restored)) + (
+        0 if keep_finished else len(finished_before)
+    ) == len(jobs)
+
+
+def test_run_with_checkpoints():
+    def setup():
+        system = System(np.array([10]))
+        for i in range(50):
+            system.enqueue_job(RuntimeJob(10 + i % 7, 3 + i % 5, np.array([1 + i % 4])))
+        return system
+
+    reference = setup()
+    reference.run(conservative_backfill)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "checkpoint.npz")
+
+        # Simulate a run that is interrupted after a checkpoint:
+        system = setup()
+        for _ in range(20):
+            system.tick(conservative_backfill)
+        save_checkpoint(system, path, keep_finished=True)
+
+        restored = load_checkpoint(path)
+        run_with_checkpoints(restored, path, conservative_backfill, interval=0)
+        assert os.listdir(tmp_dir) == ["checkpoint.npz"]
+
+        # Jobs finished before the interruption must not be lost:
+        expected = {
+            j.job_id: (j.start_time, j.end_time) for j in reference.finished_jobs
+        }
+        assert {
+            j.job_id: (j.start_time, j.end_time) for j in restored.finished_jobs
+        } == expected
+        assert restored.cur_time == reference.cur_time
+
+        final = load_checkpoint(path)
+        assert final.cur_time == reference.cur_time
+        assert len(final.pending_jobs) == 0
+        assert {
+            j.job_id: (j.start_time, j.end_time) for j in final.finished_jobs
+        } == expected
+
+
+@given(
+    runtime_job_strategy,
+    st.sampled_from([None, ProfileTimeline, DenseTimeline]),
+    st.integers(min_value=0, max_value=10),
+)
+def test_fast_fcfs(jobs, timeline, history_window):
+    def setup():
+        system = System(
+            np.array([10]), history_window=history_window, timeline=timeline
+        )
+        for tm, runtime, resources in jobs:
+            system.enqueue_job(RuntimeJob(tm, runtime, np.array([resources])))
+        return system
+
+    def snapshot(system):
+        return (
+            system.cur_time,
+            [(j.job_id, j.start_time, j.end_time) for j in system.finished_jobs],
+            system.utilization().tolist(),
+        )
+
+    reference = setup()
+    while reference.tick(fcfs):
+        pass
+
+    system = setup()
+    assert can_run_fcfs(system, fcfs) == (len(jobs) > 0)
+    system.run(fcfs)
+    assert snapshot(system) == snapshot(reference)
+    assert all(j.is_finished for j in system.finished_jobs)
+    assert len(system.running_jobs) == 0
+
+
+@given(
+    st.lists(runtime_job_strategy, min_size=1, max_size=5),
+    st.sampled_from([fcfs, easy_backfill]),
+    st.sampled_from([None, ProfileTimeline, DenseTimeline]),
+)
+def test_batch(job_lists, policy, timeline):
+    def setup():
+        systems = []
+        for jobs in job_lists:
+            system = System(np.array([10]), timeline=timeline)
+            for tm, runtime, resources in jobs:
+                system.enqueue_job(RuntimeJob(tm, runtime, np.array([resources])))
+            systems.append(system)
+        return systems
+
+    def snapshot(system):
+        return (
+            system.cur_time,
+            [(j.job_id, j.start_time, j.end_time) for j in system.finished_jobs],
+            system.utilization().tolist(),
+            len(system.pending_jobs),
+        )
+
+    reference = setup()
+    for system in reference:
+        while system.tick(policy):
+            pass
+
+    systems = setup()
+    assert can_run_batch(systems, policy)
+    run_batch(systems, policy)
+    assert [snapshot(s) for s in systems] == [snapshot(s) for s in reference]
+
+
+@given(
+    st.lists(
+        st.tuples(
+            st.integers(min_value=1, max_value=50),
+            st.integers(min_value=1, max_value=50),
+            st.integers(min_value=1, max_value=10),
+            st.integers(min_value=0, max_value=100),
+        )
+    ),
+    st.lists(st.integers(min_value=1, max_value=3), min_size=1, max_size=3),
+    st.integers(min_value=0, max_value=5),
+    st.sampled_from([fcfs, easy_backfill]),
+)
+def test_hierarchy(jobs, topology, delay, policy):
+    model = HierarchicalModel.from_topology(
+        tuple(topology), lambda: System(np.array([10])), delay=delay
+    )
+    for tm, runtime, resources, submit_time in sorted(jobs, key=lambda j: j[3]):
+        model.submit(RuntimeJob(tm, runtime, np.array([resources])), submit_time)
+    model.run(policy)
+
+    depth = len(topology)
+    assert len(model.leaves) == functools.reduce(lambda a, b: a * b, topology)
+    finished = [j for leaf in model.leaves.values() for j in leaf.finished_jobs]
+    assert len(finished) == len(jobs)
+    assert all(j.start_time >= j.submit_time + depth * delay for j in finished)
+    assert model.makespan == max((j.end_time for j in finished), default=0)
+
+    # With everything submitted up front, each leaf runs exactly as it would on
+    # its own:
+    if delay == 0 and all(j[3] == 0 for j in jobs):
+        for leaf in model.leaves.values():
+            # Job IDs are assigned in the order jobs are enqueued:
+            reference = System(np.array([10]))
+            for j in sorted(leaf.finished_jobs, key=lambda j: j.job_id):
+                reference.enqueue_job(
+                    RuntimeJob(j.timelimit, j.runtime, j.resources.resources)
+                )
+            while reference.tick(policy):
+                pass
+            assert sorted(
+                (j.job_id, j.start_time, j.end_time) for j in leaf.finished_jobs
+            ) == sorted(
+                (j.job_id, j.start_time, j.end_time) for j in reference.finished_jobs
+            )
+
+
+@given(
+    runtime_job_strategy,
+    st.integers(min_value=0, max_value=20),
+    st.data(),
+)
+def test_withdraw(jobs, n_ticks, data):
+    system = System(np.array([10]))
+    policy = RecordingPolicy(conservative_backfill)
+    system.attach_policy(policy)
+    for tm, runtime, resources in jobs:
+        system.enqueue_job(RuntimeJob(tm, runtime, np.array([resources])))
+    for _ in range(n_ticks):
+        system.tick(policy)
+
+    waiting = list(system.pending_jobs) + system.reserved_jobs
+    withdrawn = [
+        waiting[i]
+        for i in data.draw(
+            st.lists(st.integers(min_value=0, max_value=len(waiting)), unique=True)
+        )
+        if i < len(waiting)
+    ]
+    for job in withdrawn:
+        job_id = job.job_id
+        system.withdraw_job(job)
+        assert job.is_new
+        assert policy.events[-1] == ("withdraw", job_id)
+
+    system.run(policy)
+    assert len(system.finished_jobs) + len(withdrawn) == len(jobs)
+
+    # Withdrawn jobs can be enqueued and run again:
+    for job in withdrawn:
+        system.enqueue_job(job)
+    system.run(policy)
+    assert len(system.finished_jobs) == len(jobs)
+    assert all(j.is_finished for j in system.finished_jobs)
+
+
+@given(
+    runtime_job_strategy,
+    st.integers(min_value=2, max_value=4),
+    st.integers(min_value=0, max_value=5),
+    st.sampled_from([fcfs, easy_backfill]),
+)
+def test_work_stealing(jobs, n_leaves, steal_delay, policy):
+    def setup(steal):
+        model = HierarchicalModel.from_topology(
+            (n_leaves,),
+            lambda: System(np.array([10])),
+            steal=steal,
+            steal_delay=steal_delay,
+        )
+        # Submit everything to a single leaf, leaving the others idle:
+        for tm, runtime, resources in jobs:
+            model.submit(RuntimeJob(tm, runtime, np.array([resources])), 0, "tree.1")
+        model.run(policy)
+        return model
+
+    static = setup(None)
+    stealing = setup(steal_from_longest_queue)
+
+    finished = [j for leaf in stealing.leaves.values() for j in leaf.finished_jobs]
+    assert len(finished) == len(jobs)
+    assert all(j.submit_time == 0 for j in finished)
+    if stealing.n_steals == 0:
+        assert stealing.makespan == static.makespan
+    else:
+        assert any(
+            len(leaf.finished_jobs) > 0
+            for leaf_id, leaf in stealing.leaves.items()
+            if leaf_id != "tree.1"
+        )
+        assert all(
+            j.start_time >= steal_delay
+            for leaf_id, leaf in stealing.leaves.items()
+            if leaf_id != "tree.1"
+            for j in leaf.finished_jobs
+        )
+
+
+def test_t_critical():
+    # Values from a table of Student's t distribution:
+    for confidence, df, expected in [
+        (0.95, 1, 12.706),
+        (0.95, 2, 4.303),
+        (0.95, 5, 2.571),
+        (0.95, 30, 2.042),
+        (0.99, 10, 3.169),
+        (0.90, 7, 1.895),
+    ]:
+        assert t_critical(confidence, df) == pytest.approx(expected, abs=1e-3)
+
+    with pytest.raises(ValueError):
+        t_critical(1.0, 5)
+    with pytest.raises(ValueError):
+        t_critical(0.95, 0)
+
+
+@given(
+    st.lists(st.floats(min_value=-1e6, max_value=1e6), min_size=2, max_size=50),
+    st.sampled_from([0.9, 0.95, 0.99]),
+)
+def test_confidence_interval(samples, confidence):
+    estimate = confidence_interval(samples, confidence)
+    assert estimate.n == len(samples)
+    assert estimate.mean == pytest.approx(np.mean(samples))
+    assert estimate.half_width >= 0
+    assert estimate.low <= estimate.mean <= estimate.high
+
+
+@given(
+    st.integers(min_value=0, max_value=2**32 - 1),
+    st.integers(min_value=2, max_value=10),
+    st.integers(min_value=10, max_value=30),
+)
+def test_replicate(seed, min_replications, max_replications):
+    def run(rng):
+        return {"x": rng.normal(100, 10), "constant": 1.0}
+
+    # Without any tolerance, replication runs until it's out of replications,
+    # and each run's samples are a prefix of the next's:
+    short, full = (
+        replicate(run, rel_tol=0, min_replications=2, max_replications=n, seed=seed)
+        for n in (min_replications, max_replications)
+    )
+    assert full.n_replications == max_replications
+    assert not full.converged
+    assert np.array_equal(full.samples["x"][:min_replications], short.samples["x"])
+    assert full.estimates["x"].n == max_replications
+    assert full.estimates["constant"] == (1.0, 0.0, max_replications)
+
+    # A loose tolerance is met as soon as possible:
+    loose = replicate(run, rel_tol=10, min_replications=min_replications, seed=seed)
+    assert loose.converged
+    assert loose.n_replications == min_replications
+
+    # Stopping early must only happen once every estimate is precise enough:
+    result = replicate(
+        run,
+        rel_tol=0.05,
+        min_replications=min_replications,
+        max_replications=max_replications,
+        seed=seed,
+    )
+    if result.converged:
+        assert all(
+            e.half_width <= 0.05 * abs(e.mean) for e in result.estimates.values()
+        )
+    else:
+        assert result.n_replications == max_replications
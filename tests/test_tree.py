@@ -1,10 +1,15 @@
 from hypothesis import given, strategies as st
 from hypothesis.stateful import Bundle, RuleBasedStateMachine, rule, invariant
+import numpy as np
 import pytest
 
-from sched_model.tree.base import Tree
+from sched_model.tree.base import Aggregate, Tree
 from sched_model.tree.rb import RBTree, RBNode
 from sched_model.tree.avl import AVLTree, AVLNode
+from sched_model.tree.chunked import SortedChunkList
+from sched_model.tree.arraytree import ArrayRBTree, NIL
+from sched_model.tree.iter import SentinelNode, TreeIter
+from sched_model.tree.persistent import PersistentTree, _size
 
 
 @st.composite
@@ -121,9 +126,71 @@ def verify_avl_integrity(cur: AVLNode, seen_keys: dict) -> int:
     return max(right_height, left_height) + 1
 
 
+def verify_chunk_integrity(lst: SortedChunkList, seen_keys: dict):
+    prev_chunk = None
+    prev_key = None
+    assert len(lst._chunks) == len(lst._maxes)
+
+    for chunk, max_key in zip(lst._chunks, lst._maxes):
+        assert chunk.owner is lst
+        assert len(chunk.keys) > 0, "encountered empty chunk"
+        assert len(chunk.keys) == len(chunk.nodes)
+        assert len(chunk.keys) <= lst._load * 2, "chunk was not split"
+        assert chunk.keys[-1] == max_key, "chunk maximum is out of date"
+        assert chunk.prev is prev_chunk, "chunk links broken"
+        if prev_chunk is not None:
+            assert prev_chunk.next is chunk, "chunk links broken"
+
+        for k, node in zip(chunk.keys, chunk.nodes):
+            assert prev_key is None or prev_key < k, "chunk keys are not sorted"
+            assert node.key == k
+            assert node._chunk is chunk, "node has incorrect chunk pointer"
+            seen_keys[k] = node.value
+            prev_key = k
+
+        prev_chunk = chunk
+
+    if prev_chunk is not None:
+        assert prev_chunk.next is None, "chunk links broken"
+
+
+def verify_array_rb_integrity(tree: ArrayRBTree, idx: int, seen_keys: dict) -> int:
+    key = tree._keys[idx]
+    assert key not in seen_keys, "encountered loop in tree links at node " + str(key)
+    seen_keys[key] = tree._vals[idx]
+
+    blk_heights = []
+    for child in (tree._left[idx], tree._right[idx]):
+        if child != NIL:
+            assert not (
+                tree._red[idx] and tree._red[child]
+            ), "Red node {} has red child {}".format(str(key), str(tree._keys[child]))
+            assert (
+                tree._parent[child] == idx
+            ), "parent <> child link broken at node " + str(key)
+            blk_heights.append(verify_array_rb_integrity(tree, child, seen_keys))
+        else:
+            blk_heights.append(1)
+
+    assert (
+        blk_heights[0] == blk_heights[1]
+    ), "Left and right subtrees have different black heights ({} != {})".format(
+        *blk_heights
+    )
+    return blk_heights[0] + (0 if tree._red[idx] else 1)
+
+
 def verify_tree_integrity(tree: AVLTree, items: dict):
     seen_keys = {}
-    if tree._root is not None:
+    if isinstance(tree, SortedChunkList):
+        verify_chunk_integrity(tree, seen_keys)
+    elif isinstance(tree, ArrayRBTree):
+        assert not tree._red[NIL], "nil node is red"
+        if tree._root != NIL:
+            assert not tree._red[tree._root], "ArrayRBTree root is not black"
+            assert tree._parent[tree._root] == NIL
+            verify_array_rb_integrity(tree, tree._root, seen_keys)
+    elif tree._root is not None:
         if isinstance(tree._root, AVLNode):
             verify_avl_integrity(tree._root, seen_keys)
         elif isinstance(tree._root, RBNode):
@@ -273,8 +340,169 @@ class RBTreeStateMachine(TreeStateMachine):
         self.tree = RBTree()
 
 
+class ArrayRBTreeStateMachine(TreeStateMachine):
+    def __init__(self):
+        super().__init__()
+        self.tree = ArrayRBTree(capacity=1)
+
+    @rule()
+    def snapshot(self):
+        snapshot = self.tree.copy()
+        verify_tree_integrity(snapshot, self.model)
+
+        # The snapshot is independent of the original tree:
+        for k in list(snapshot.keys()):
+            del snapshot[k]
+        snapshot[0] = None
+        assert list(self.tree.items()) == sorted(self.model.items())
+
+
+class SmallChunkList(SortedChunkList):
+    """A chunked list with tiny chunks, to exercise chunk splits and merges."""
+
+    def __init__(self, load: int = 4):
+        super().__init__(load)
+
+
+class ChunkListStateMachine(TreeStateMachine):
+    def __init__(self):
+        super().__init__()
+        self.tree = SmallChunkList()
+
+    @rule(lo=st.integers(), hi=st.integers(), reverse=st.booleans())
+    def items_range(self, lo, hi, reverse):
+        expected = sorted(
+            (k, v) for k, v in self.model.items() if min(lo, hi) <= k < max(lo, hi)
+        )
+        if reverse:
+            expected.reverse()
+        assert list(self.tree.items(lo, hi, reverse)) == expected
+
+    @rule(lo=st.integers(), hi=st.integers())
+    def delete_range(self, lo, hi):
+        removed = [k for k in self.model.keys() if lo <= k < hi]
+        assert self.tree.delete_range(lo, hi) == len(removed)
+        for k in removed:
+            del self.model[k]
+
+    @rule(k=TreeStateMachine.keys)
+    def neighbors(self, k):
+        if k in self.model:
+            node = self.tree.get_node(k)
+            keys = sorted(self.model.keys())
+            i = keys.index(k)
+
+            expected_prev = keys[i - 1] if i > 0 else None
+            expected_next = keys[i + 1] if i + 1 < len(keys) else None
+            assert (node.prev.key if node.prev else None) == expected_prev
+            assert (node.next.key if node.next else None) == expected_next
+
+
+def verify_augmentation(cur, aggregate) -> tuple:
+    size = 1
+    agg = aggregate.project(cur.key, cur.value)
+
+    if cur._left is not None:
+        left_size, left_agg = verify_augmentation(cur._left, aggregate)
+        size += left_size
+        agg = aggregate.combine(left_agg, agg)
+
+    if cur._right is not None:
+        right_size, right_agg = verify_augmentation(cur._right, aggregate)
+        size += right_size
+        agg = aggregate.combine(agg, right_agg)
+
+    assert cur._size == size, "incorrect subtree size at node " + str(cur.key)
+    assert cur._agg == agg, "incorrect subtree aggregate at node " + str(cur.key)
+    return (size, agg)
+
+
+class AugmentedTreeStateMachine(TreeStateMachine):
+    # sums of keys, and the list of keys in order
+    aggregate = Aggregate(
+        lambda k, v: (k, (k,)), lambda a, b: (a[0] + b[0], a[1] + b[1]), (0, ())
+    )
+
+    @invariant()
+    def check_augmentation(self):
+        if self.tree._root is not None:
+            verify_augmentation(self.tree._root, self.aggregate)
+
+    @rule(lo=st.integers(), hi=st.integers())
+    def aggregate_range(self, lo, hi):
+        keys = tuple(k for k in sorted(self.model.keys()) if lo <= k < hi)
+        assert self.tree.aggregate(lo, hi) == (sum(keys), keys)
+
+        keys = tuple(k for k in sorted(self.model.keys()) if lo <= k)
+        assert self.tree.aggregate(lo, None) == (sum(keys), keys)
+
+    @rule(i=st.integers(-10, 10))
+    def select(self, i):
+        keys = sorted(self.model.keys())
+        if -len(keys) <= i < len(keys):
+            assert self.tree.select(i) == (keys[i], self.model[keys[i]])
+        else:
+            with pytest.raises(IndexError):
+                self.tree.select(i)
+
+    @rule(k=st.integers())
+    def rank(self, k):
+        assert self.tree.rank(k) == sum(1 for k2 in self.model.keys() if k2 < k)
+
+    @rule(k=st.integers())
+    def split_and_join(self, k):
+        upper = self.tree.split(k)
+        assert len(upper) == sum(1 for k2 in self.model.keys() if k2 >= k)
+        self.tree.join(upper)
+
+
+class AugmentedAVLTreeStateMachine(AugmentedTreeStateMachine):
+    def __init__(self):
+        super().__init__()
+        self.tree = AVLTree(self.aggregate)
+
+
+class AugmentedRBTreeStateMachine(AugmentedTreeStateMachine):
+    def __init__(self):
+        super().__init__()
+        self.tree = RBTree(self.aggregate)
+
+
+@given(
+    st.lists(
+        st.tuples(
+            st.integers(-(2**63), 2**63 - 1),
+            st.one_of(st.none(), st.floats(allow_nan=False)),
+        )
+    )
+)
+def test_array_tree_typed(ops):
+    # Keys and values stored unboxed in typed arrays; a None value deletes:
+    tree = ArrayRBTree(capacity=1, key_typecode="q", value_typecode="d")
+    items = {}
+    for k, v in ops:
+        if v is None:
+            if k in items:
+                assert tree.pop(k) == items.pop(k)
+        else:
+            tree[k] = v
+            items[k] = v
+
+    verify_tree_integrity(tree, items)
+    assert list(tree.items()) == sorted(items.items())
+
+    snapshot = tree.copy()
+    tree.delete_range(-(2**63), 2**63 - 1)
+    verify_tree_integrity(snapshot, items)
+    assert len(tree) == len([k for k in items if k == 2**63 - 1])
+
+
 TestAVLTreeStateMachine = AVLTreeStateMachine.TestCase
 TestRBTreeStateMachine = RBTreeStateMachine.TestCase
+TestChunkListStateMachine = ChunkListStateMachine.TestCase
+TestArrayRBTreeStateMachine = ArrayRBTreeStateMachine.TestCase
+TestAugmentedAVLTreeStateMachine = AugmentedAVLTreeStateMachine.TestCase
+TestAugmentedRBTreeStateMachine = AugmentedRBTreeStateMachine.TestCase
 
 
 @pytest.mark.parametrize("tree_type", [AVLTree, RBTree])
@@ -375,6 +603,20 @@ def test_iter_reverse(tree_type, items):
         assert items[k1] == kv[1]
 
 
+def test_iter_abstract():
+    class KeyIter(TreeIter):
+        pass
+
+    empty = SentinelNode()
+    with pytest.raises(TypeError):
+        KeyIter(TreeIter.KEYS, empty, empty, False)
+
+    # The base class dispatches to a concrete iterator instead:
+    it = TreeIter(TreeIter.KEYS, empty, empty, False)
+    assert type(it) is not TreeIter
+    assert list(it) == []
+
+
 @given(dict_and_subset())  # pylint: disable=no-value-for-parameter
 @pytest.mark.parametrize("tree_type", [AVLTree, RBTree])
 def test_iter_bounds(tree_type, givens):
@@ -409,3 +651,424 @@ def test_iter_bounds_reverse(tree_type, givens):
     for k1, kv in zip(reversed(subset), ret):
         assert k1 == kv[0]
         assert items[k1] == kv[1]
+
+
+@pytest.mark.parametrize("tree_type", [AVLTree, RBTree, SmallChunkList, ArrayRBTree])
+@given(st.dictionaries(st.integers(), st.uuids(), min_size=1), st.data())
+def test_stable_handles(tree_type, items, data):
+    tree = tree_type()
+    for k, v in items.items():
+        tree[k] = v
+
+    handles = dict((k, tree.get_node(k)) for k in items.keys())
+    to_delete = data.draw(st.lists(st.sampled_from(sorted(items.keys())), unique=True))
+
+    for k in to_delete:
+        tree.delete_node(handles.pop(k))
+        del items[k]
+
+        for k2, node in handles.items():
+            assert node.key == k2
+            assert node.value == items[k2]
+            assert tree.get_node(k2) is node
+
+    verify_tree_integrity(tree, items)
+
+
+@pytest.mark.parametrize("tree_type", [AVLTree, RBTree, SmallChunkList, ArrayRBTree])
+@given(
+    st.dictionaries(st.integers(-100, 100), st.uuids(), min_size=1),
+    st.lists(st.integers(-110, 110), min_size=1),
+    st.data(),
+)
+def test_hinted_search(tree_type, items, queries, data):
+    tree = tree_type()
+    for k, v in items.items():
+        tree[k] = v
+
+    for q in queries:
+        hint = tree.get_node(data.draw(st.sampled_from(sorted(items.keys()))))
+        keys = sorted(items.keys())
+
+        lb = [k for k in keys if k >= q]
+        expected = (lb[0], items[lb[0]]) if len(lb) > 0 else None
+        assert tree.lower_bound(q, hint) == expected
+
+        ub = [k for k in keys if k < q]
+        expected = (ub[-1], items[ub[-1]]) if len(ub) > 0 else None
+        assert tree.upper_bound(q, hint) == expected
+
+        created, node = tree.get_or_insert_node(q, hint)
+        assert created == (q not in items)
+        assert node.key == q
+        if created:
+            node.value = data.draw(st.uuids())
+        items[q] = node.value
+
+    verify_tree_integrity(tree, items)
+
+
+class CountingKey(object):
+    """An integer key that counts how often it's compared."""
+
+    comparisons = 0
+
+    def __init__(self, k: int):
+        self.k = k
+
+    def _compare(self, op, other) -> bool:
+        CountingKey.comparisons += 1
+        return op(self.k, other.k)
+
+    def __eq__(self, other):
+        return self._compare(int.__eq__, other)
+
+    def __lt__(self, other):
+        return self._compare(int.__lt__, other)
+
+    def __le__(self, other):
+        return self._compare(int.__le__, other)
+
+    def __gt__(self, other):
+        return self._compare(int.__gt__, other)
+
+    def __ge__(self, other):
+        return self._compare(int.__ge__, other)
+
+    def __hash__(self):
+        return hash(self.k)
+
+
+@pytest.mark.parametrize("tree_type", [AVLTree, RBTree, ArrayRBTree])
+@pytest.mark.parametrize("stride", [1, 2, 3, 50])
+def test_hinted_insert_cost(tree_type, stride):
+    # Insert keys in order, each `stride` existing keys after the last one,
+    # passing the previously inserted node as the hint. Hints within a few
+    # nodes of the key must make searches cheaper, and faraway hints must cost
+    # no more than a few extra comparisons over a search from the root:
+    n = 1000
+    counts = []
+    for hinted in (False, True):
+        tree = tree_type.from_sorted((CountingKey(2 * i), i) for i in range(n))
+        hint = None
+        CountingKey.comparisons = 0
+        for i in range(0, n, stride):
+            _, node = tree.get_or_insert_node(CountingKey(2 * i + 1), hint)
+            if hinted:
+                hint = node
+        counts.append(CountingKey.comparisons)
+
+    # Looking through each of the 4 neighbors a hint is checked against takes
+    # at most 2 comparisons, plus one to tell which way to look:
+    root, hinted = counts
+    if stride <= 3:
+        assert hinted < root
+    else:
+        assert hinted <= root + 9 * len(range(0, n, stride))
+
+
+@pytest.mark.parametrize("tree_type", [AVLTree, RBTree])
+@given(
+    st.dictionaries(st.integers(0, 100), st.uuids(), min_size=1),
+    st.dictionaries(st.integers(101, 200), st.uuids(), min_size=1),
+    st.data(),
+)
+def test_foreign_handles(tree_type, items_a, items_b, data):
+    a = tree_type()
+    b = tree_type()
+    for k, v in items_a.items():
+        a[k] = v
+    for k, v in items_b.items():
+        b[k] = v
+
+    foreign = b.get_node(data.draw(st.sampled_from(sorted(items_b.keys()))))
+    with pytest.raises(ValueError):
+        a.delete_node(foreign)
+    with pytest.raises(ValueError):
+        a.get_or_insert_node(50, hint=foreign)
+    with pytest.raises(ValueError):
+        a.lower_bound(50, hint=foreign)
+
+    # nodes that moved to another tree via split() belong to that tree now:
+    upper = b.split(foreign.key)
+    with pytest.raises(ValueError):
+        b.delete_node(foreign)
+    upper.delete_node(foreign)
+    with pytest.raises(ValueError):
+        upper.delete_node(foreign)
+    del items_b[foreign.key]
+
+    b.join(upper)
+    verify_tree_integrity(a, items_a)
+    verify_tree_integrity(b, items_b)
+
+
+# For map types without split() and join():
+@pytest.mark.parametrize("tree_type", [SmallChunkList, ArrayRBTree])
+@given(
+    st.dictionaries(st.integers(0, 100), st.uuids(), min_size=1),
+    st.dictionaries(st.integers(101, 200), st.uuids(), min_size=1),
+    st.data(),
+)
+def test_foreign_handles_unsplittable(tree_type, items_a, items_b, data):
+    a = tree_type.from_sorted(sorted(items_a.items()))
+    b = tree_type.from_sorted(sorted(items_b.items()))
+
+    foreign = b.get_node(data.draw(st.sampled_from(sorted(items_b.keys()))))
+    with pytest.raises(ValueError):
+        a.delete_node(foreign)
+    with pytest.raises(ValueError):
+        a.get_or_insert_node(50, hint=foreign)
+
+    b.delete_node(foreign)
+    with pytest.raises(ValueError):
+        b.delete_node(foreign)
+    del items_b[foreign.key]
+
+    verify_tree_integrity(a, items_a)
+    verify_tree_integrity(b, items_b)
+
+
+def verify_thread(tree, items: dict):
+    keys = sorted(items.keys())
+    assert list(tree.keys()) == keys
+    assert list(tree.keys(reverse=True)) == keys[::-1]
+    assert len(tree) == len(keys)
+
+
+@pytest.mark.parametrize("tree_type", [AVLTree, RBTree])
+@given(st.dictionaries(st.integers(-100, 100), st.uuids()), st.integers(-110, 110))
+def test_split(tree_type, items, key):
+    tree = tree_type()
+    for k, v in items.items():
+        tree[k] = v
+    handles = dict((k, tree.get_node(k)) for k in items.keys())
+
+    upper = tree.split(key)
+    lower_items = dict((k, v) for k, v in items.items() if k < key)
+    upper_items = dict((k, v) for k, v in items.items() if k >= key)
+
+    assert type(upper) is tree_type
+    for t, expected in ((tree, lower_items), (upper, upper_items)):
+        verify_tree_integrity(t, expected)
+        verify_thread(t, expected)
+        for k in expected:
+            assert t.get_node(k) is handles[k]
+
+
+@pytest.mark.parametrize("tree_type", [AVLTree, RBTree])
+@given(
+    st.dictionaries(st.integers(-100, 100), st.uuids()),
+    st.dictionaries(st.integers(101, 300), st.uuids()),
+)
+def test_join(tree_type, lower_items, upper_items):
+    lower = tree_type()
+    for k, v in lower_items.items():
+        lower[k] = v
+
+    upper = tree_type()
+    for k, v in upper_items.items():
+        upper[k] = v
+
+    lower.join(upper)
+    items = dict(lower_items)
+    items.update(upper_items)
+
+    verify_tree_integrity(lower, items)
+    verify_thread(lower, items)
+    verify_tree_integrity(upper, {})
+    verify_thread(upper, {})
+
+    if len(items) > 0:
+        overlapping = tree_type()
+        overlapping[min(items.keys())] = None
+        with pytest.raises(ValueError):
+            lower.join(overlapping)
+
+
+@pytest.mark.parametrize("tree_type", [AVLTree, RBTree, SmallChunkList, ArrayRBTree])
+@given(
+    st.dictionaries(st.integers(-100, 100), st.uuids()),
+    st.integers(-110, 110),
+    st.integers(-110, 110),
+)
+def test_delete_range(tree_type, items, lo, hi):
+    tree = tree_type()
+    for k, v in items.items():
+        tree[k] = v
+
+    removed = [k for k in items.keys() if lo <= k < hi]
+    assert tree.delete_range(lo, hi) == len(removed)
+    for k in removed:
+        del items[k]
+
+    verify_tree_integrity(tree, items)
+    verify_thread(tree, items)
+
+    # the tree should still be usable afterwards:
+    for k in range(lo, hi, 7):
+        tree[k] = k
+        items[k] = k
+    verify_tree_integrity(tree, items)
+    verify_thread(tree, items)
+
+
+@pytest.mark.parametrize("tree_type", [AVLTree, RBTree, SmallChunkList, ArrayRBTree])
+@given(st.dictionaries(st.integers(), st.uuids()))
+def test_from_sorted(tree_type, items):
+    tree = tree_type.from_sorted(sorted(items.items()))
+
+    assert type(tree) is tree_type
+    verify_tree_integrity(tree, items)
+    verify_thread(tree, items)
+
+    with pytest.raises(ValueError):
+        tree_type.from_sorted([(1, None), (1, None)])
+
+
+@pytest.mark.parametrize("tree_type", [AVLTree, RBTree, SmallChunkList, ArrayRBTree])
+@given(
+    st.dictionaries(st.integers(-1000, 1000), st.uuids()),
+    st.dictionaries(st.integers(-1000, 1000), st.uuids()),
+)
+def test_insert_many(tree_type, items, batch):
+    tree = tree_type()
+    for k, v in items.items():
+        tree[k] = v
+    handles = dict((k, tree.get_node(k)) for k in items.keys())
+
+    tree.insert_many(sorted(batch.items()))
+    items.update(batch)
+
+    verify_tree_integrity(tree, items)
+    verify_thread(tree, items)
+    for k, node in handles.items():
+        assert tree.get_node(k) is node
+
+
+def verify_persistent_integrity(tree: PersistentTree, items: dict):
+    def verify_node(node, lo, hi) -> int:
+        if node is None:
+            return 0
+        assert (lo is None or lo < node.key) and (hi is None or node.key < hi)
+        lh = verify_node(node.left, lo, node.key)
+        rh = verify_node(node.right, node.key, hi)
+        assert abs(lh - rh) <= 1, "balance constraint violated at node " + str(node.key)
+        assert node.height == max(lh, rh) + 1
+        assert node.size == _size(node.left) + _size(node.right) + 1
+        return node.height
+
+    verify_node(tree._root, None, None)
+    assert len(tree) == len(items)
+    assert list(tree.items()) == sorted(items.items())
+    assert list(tree.keys(reverse=True)) == sorted(items.keys(), reverse=True)
+
+
+class PersistentTreeStateMachine(RuleBasedStateMachine):
+    def __init__(self):
+        super().__init__()
+        # Every version created so far, along with its expected contents:
+        self.versions = [(PersistentTree(), {})]
+
+    keys = Bundle("keys")
+    versions_idx = st.integers(min_value=0)
+
+    def version(self, i):
+        return self.versions[i % len(self.versions)]
+
+    @invariant()
+    def check_all_versions(self):
+        for tree, model in self.versions:
+            verify_persistent_integrity(tree, model)
+
+    @rule(target=keys, k=st.integers(-100, 100))
+    def add_key(self, k):
+        return k
+
+    @rule(i=versions_idx, k=keys, v=st.uuids())
+    def insert(self, i, k, v):
+        tree, model = self.version(i)
+        model = dict(model)
+        model[k] = v
+        self.versions.append((tree.insert(k, v), model))
+
+    @rule(i=versions_idx, k=keys)
+    def delete(self, i, k):
+        tree, model = self.version(i)
+        if k not in model:
+            with pytest.raises(KeyError):
+                tree.delete(k)
+        else:
+            model = dict(model)
+            del model[k]
+            self.versions.append((tree.delete(k), model))
+
+    @rule(i=versions_idx, lo=st.integers(-110, 110), hi=st.integers(-110, 110))
+    def delete_range(self, i, lo, hi):
+        tree, model = self.version(i)
+        model = dict((k, v) for k, v in model.items() if not (lo <= k < hi))
+        self.versions.append((tree.delete_range(lo, hi), model))
+
+    @rule(i=versions_idx, k=st.integers(-110, 110))
+    def split_and_join(self, i, k):
+        tree, model = self.version(i)
+        lower, upper = tree.split(k)
+        verify_persistent_integrity(
+            lower, dict((k2, v) for k2, v in model.items() if k2 < k)
+        )
+        verify_persistent_integrity(
+            upper, dict((k2, v) for k2, v in model.items() if k2 >= k)
+        )
+        self.versions.append((lower.join(upper), model))
+
+    @rule(i=versions_idx, k=st.integers(-110, 110))
+    def queries(self, i, k):
+        tree, model = self.version(i)
+        keys = sorted(model.keys())
+
+        lb = [k2 for k2 in keys if k2 >= k]
+        assert tree.lower_bound(k) == ((lb[0], model[lb[0]]) if lb else None)
+        ub = [k2 for k2 in keys if k2 < k]
+        assert tree.upper_bound(k) == ((ub[-1], model[ub[-1]]) if ub else None)
+        assert tree.rank(k) == len(ub)
+        if len(lb) > 0:
+            assert tree.select(len(ub)) == (lb[0], model[lb[0]])
+        assert (k in tree) == (k in model)
+        assert tree.get(k) == model.get(k)
+
+
+TestPersistentTreeStateMachine = PersistentTreeStateMachine.TestCase
+
+
+@given(st.dictionaries(st.integers(), st.uuids()))
+def test_persistent_from_sorted(items):
+    verify_persistent_integrity(
+        PersistentTree.from_sorted(sorted(items.items())), items
+    )
+
+    with pytest.raises(ValueError):
+        PersistentTree.from_sorted([(1, None), (1, None)])
+
+
+@pytest.mark.parametrize(
+    "tree_type", [AVLTree, RBTree, SmallChunkList, ArrayRBTree, PersistentTree]
+)
+@given(
+    st.dictionaries(st.integers(-100, 100), st.integers()),
+    st.one_of(st.none(), st.integers(-110, 110)),
+    st.one_of(st.none(), st.integers(-110, 110)),
+)
+def test_bulk_extraction(tree_type, items, lo, hi):
+    tree = tree_type.from_sorted(sorted(items.items()))
+
+    expected = list(tree.items(lo, hi))
+    assert tree.keys_list(lo, hi) == [k for k, _ in expected]
+    assert tree.values_list(lo, hi) == [v for _, v in expected]
+
+    arr = tree.keys_array(lo, hi, dtype=np.int64)
+    assert arr.dtype == np.int64
+    assert arr.tolist() == [k for k, _ in expected]
+
+    # reversed iterators are specialized separately:
+    assert list(tree.items(lo, hi, reverse=True)) == expected[::-1]
+    assert list(tree.values(lo, hi, reverse=True)) == [v for _, v in expected[::-1]]
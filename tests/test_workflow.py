@@ -0,0 +1,55 @@
+from hypothesis import given, strategies as st
+
+import workflow
+from workflow import ExperimentJob, LeastLoadedDispatcher
+
+topology_strategy = st.lists(
+    st.integers(min_value=1, max_value=4), min_size=1, max_size=3
+).map(tuple)
+experiment_job_strategy = st.lists(
+    st.tuples(st.integers(min_value=1, max_value=64), st.sampled_from([120, 720]))
+).map(
+    lambda jobs: [
+        ExperimentJob(i, [], cores, timelimit)
+        for i, (cores, timelimit) in enumerate(jobs)
+    ]
+)
+
+
+@given(topology_strategy, experiment_job_strategy)
+def test_least_loaded(topo, jobs):
+    leaves = workflow.distribute_least_loaded(topo, jobs)
+    assert list(leaves.keys()) == list(workflow.get_leaf_ids(topo))
+
+    # Check against a linear scan for the least-loaded leaf:
+    loads = dict((leaf_id, 0) for leaf_id in leaves)
+    expected = dict((leaf_id, []) for leaf_id in leaves)
+    for j in jobs:
+        leaf_id = min(loads, key=lambda k: loads[k])
+        loads[leaf_id] += j.cores * j.timelimit
+        expected[leaf_id].append(j)
+
+    assert leaves == expected
+
+
+@given(topology_strategy, experiment_job_strategy)
+def test_least_loaded_unit_load(topo, jobs):
+    assert workflow.distribute_least_loaded(
+        topo, jobs, load=lambda j: 1
+    ) == workflow.distribute_rr(topo, jobs)
+
+
+@given(topology_strategy, experiment_job_strategy)
+def test_least_loaded_release(topo, jobs):
+    dispatcher = LeastLoadedDispatcher(workflow.get_leaf_ids(topo))
+    assigned = [(dispatcher.assign(j), j) for j in jobs]
+
+    for leaf_id, j in assigned:
+        dispatcher.release(leaf_id, j)
+
+        # The tree must keep track of the least-loaded leaf as loads drop:
+        least = dispatcher.loads[dispatcher.leaf_ids.index(dispatcher.least_loaded())]
+        assert least == min(dispatcher.loads)
+
+    assert dispatcher.loads == [0] * len(dispatcher.loads)
+    assert dispatcher.least_loaded() == dispatcher.leaf_ids[0]
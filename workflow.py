@@ -4,7 +4,7 @@ from io import TextIOBase
 from itertools import cycle, product, groupby
 import json
 from pathlib import Path
-from typing import Optional, Tuple, Dict, List, Iterator, Iterable
+from typing import Callable, Optional, Tuple, Dict, List, Iterator, Iterable
 
 import numpy as np
 from numpy import random
@@ -131,6 +131,95 @@ def distribute_by_utilization(
     return ret
 
 
+def core_seconds(job: ExperimentJob) -> int:
+    return job.cores * job.timelimit
+
+
+class LeastLoadedDispatcher(object):
+    """Online dispatcher that assigns each job to the leaf with the least
+    outstanding load, as jobs arrive.
+
+    The load of a job is given by `load` (core-seconds by default). A job's
+    load counts towards its leaf from when it is assigned until it is
+    released (normally, when it finishes). Leaves are kept in a tournament
+    tree keyed by load, so assigning or releasing a job takes O(log L) time
+    for L leaves. Ties go to the leaf that comes first, so when every job has
+    the same load, jobs are assigned round-robin just like `distribute_rr`.
+    """
+
+    def __init__(
+        self,
+        leaf_ids: Iterable[str],
+        load: Callable[[ExperimentJob], float] = core_seconds,
+    ):
+        self.leaf_ids: List[str] = list(leaf_ids)
+        self.load: Callable[[ExperimentJob], float] = load
+        self.loads: List[float] = [0] * len(self.leaf_ids)
+        self._leaf_index: Dict[str, int] = dict(
+            (leaf_id, i) for i, leaf_id in enumerate(self.leaf_ids)
+        )
+
+        # Each node of the tree holds the index of the least-loaded leaf below
+        # it (-1 for padding past the last leaf); the root is at index 1.
+        size = 1
+        while size < len(self.leaf_ids):
+            size *= 2
+        self._size: int = size
+        self._winners: List[int] = [-1] * (2 * size)
+        self._winners[size : size + len(self.leaf_ids)] = range(len(self.leaf_ids))
+        for node in range(size - 1, 0, -1):
+            self._winners[node] = self._winner(
+                self._winners[2 * node], self._winners[2 * node + 1]
+            )
+
+    def _winner(self, a: int, b: int) -> int:
+        if a < 0 or (b >= 0 and self.loads[b] < self.loads[a]):
+            return b
+        return a
+
+    def _update(self, i: int):
+        node = (self._size + i) // 2
+        while node > 0:
+            self._winners[node] = self._winner(
+                self._winners[2 * node], self._winners[2 * node + 1]
+            )
+            node //= 2
+
+    def least_loaded(self) -> str:
+        """Get the ID of the leaf with the least outstanding load."""
+        return self.leaf_ids[self._winners[1]]
+
+    def assign(self, job: ExperimentJob) -> str:
+        """Assign a job to the least-loaded leaf, returning the leaf's ID."""
+        i = self._winners[1]
+        self.loads[i] += self.load(job)
+        self._update(i)
+        return self.leaf_ids[i]
+
+    def release(self, leaf_id: str, job: ExperimentJob):
+        """Remove the load of a job previously assigned to a leaf, once it no
+        longer counts towards that leaf (such as when it finishes)."""
+        i = self._leaf_index[leaf_id]
+        self.loads[i] -= self.load(job)
+        self._update(i)
+
+
+def distribute_least_loaded(
+    topo: Tuple[int, ...],
+    jobs: Iterable[ExperimentJob],
+    load: Callable[[ExperimentJob], float] = core_seconds,
+) -> Dict[str, List[ExperimentJob]]:
+    """Distribute jobs with a `LeastLoadedDispatcher`, as if they all arrived
+    at once in order (so no job is released)."""
+    leaves = dict((leaf_id, []) for leaf_id in get_leaf_ids(topo))
+    dispatcher = LeastLoadedDispatcher(leaves.keys(), load)
+
+    for j in jobs:
+        leaves[dispatcher.assign(j)].append(j)
+
+    return leaves
+
+
 def dump_distribution(outdir: Path, leaves: Dict[str, List[ExperimentJob]]):
     outdir = Path(outdir)
 